@@ -1,24 +1,119 @@
-from passlib.context import CryptContext
-from datetime import datetime, timedelta
-from jose import jwt
+import os
+import time
+import logging
+import secrets
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+import bcrypt
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
 
-SECRET_KEY = "your-secret-key"
+logger = logging.getLogger(__name__)
+
+# Without BUILDER_JWT_SECRET every process signs with its own random key: tokens do not survive a restart and are
+# only accepted by the worker that issued them
+SECRET_KEY = os.environ.get("BUILDER_JWT_SECRET") or secrets.token_urlsafe(32)
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("BUILDER_TOKEN_EXPIRE_MINUTES", 30))
+AUTH_ENABLED = os.environ.get("BUILDER_AUTH_ENABLED", "true").lower() not in ("false", "0", "no")
+TOKEN_CACHE_SIZE = int(os.environ.get("BUILDER_TOKEN_CACHE_SIZE", 10000))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+if not os.environ.get("BUILDER_JWT_SECRET"):
+    logger.warning("BUILDER_JWT_SECRET is not set, using a random per-process signing key")
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    # bcrypt only uses the first 72 bytes of a password
+    return bcrypt.hashpw(password.encode("utf-8")[:72], bcrypt.gensalt()).decode("utf-8")
 
 
 def verify_password(plain_password, hashed_password) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return bcrypt.checkpw(plain_password.encode("utf-8")[:72], hashed_password.encode("utf-8"))
+    except ValueError:
+        return False
+
+
+@lru_cache(maxsize=1)
+def dummy_hash() -> str:
+    # Checked when the user does not exist, so a missing user takes as long as a wrong password
+    return hash_password(secrets.token_urlsafe(16))
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
-    expire = datetime.now() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+class TokenCache:
+    """
+    Claims of verified tokens, kept until the token expires.
+
+    A bounded LRU: a token seen before is accepted with one dict lookup instead of a signature check and a JSON
+    decode. Entries expire with the token's "exp", so the cache never extends a token's life.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # token -> (claims, expires at epoch seconds)
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry[0]
+
+    def put(self, token: str, claims: dict) -> None:
+        with self._lock:
+            self._entries[token] = (claims, float(claims["exp"]))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def decode_token(token: str) -> dict:
+    """Claims of a valid, unexpired token with a subject; raises JWTError otherwise."""
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    if not claims.get("sub") or "exp" not in claims:
+        raise JWTError("Token has no subject or expiry")
+    token_cache.put(token, claims)
+    return claims
+
+
+async def require_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> Optional[str]:
+    """
+    Router dependency: the username of the bearer token, or None while BUILDER_AUTH_ENABLED is false.
+    Async on purpose, so checking a cached token never leaves the event loop.
+    """
+    if not AUTH_ENABLED:
+        return None
+    if credentials is None or credentials.scheme.lower() != "bearer":
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return decode_token(credentials.credentials)["sub"]
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"})
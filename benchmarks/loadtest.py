@@ -0,0 +1,388 @@
+"""
+Load test: concurrent mixed traffic against a local server whose database holds a production-sized build history.
+
+    python benchmarks/loadtest.py [--apps 10000] [--steps 500000] [--database history.db] [--concurrency 16]
+                                  [--duration 30] [--mix status=80,environment=15,build=5] [--output results.json]
+                                  [--max-p99-ms 1000] [--json]
+
+The database gets --apps Application records spread over --components components, with --steps Step rows between
+them, e.g. --apps 10000 --steps 5000000 for a busy production node. A --database that already holds records is
+used as it is, so a large history only has to be generated once. The server is uvicorn on a free local port with
+authentication off. Workers on --concurrency threads, each with its own keep-alive connection, send requests for
+--duration seconds, picking each one from --mix:
+
+  status       GET /status/ of a component of the history
+  environment  GET /environment/ of a load test component
+  build        POST /build/ of a load test component, one task of two steps whose scripts call a stub `aws`
+
+The report has latency percentiles and HTTP statuses per request kind and the overall throughput. It also has the
+server's database write and commit times. SQLite serialises writers on one file lock, so the tail of these times is
+time spent waiting for the lock; SQLAlchemy "database is locked" errors are counted as well. With --max-p99-ms the
+script exits 1 when any request kind's p99 latency is over the budget.
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from orchestration import AWS_STUB, TASK, git_commit, write, write_fixtures  # noqa: E402
+from startup import free_port  # noqa: E402
+
+KINDS = ("status", "environment", "build")
+SEED_BATCH = 20000
+STEP_NAMES = ("package", "deploy", "verify")
+STEP_TYPES = ("cloudformation", "terraform", "shell")
+
+
+def percentile(samples: list, p: float) -> float:
+    """Nearest-rank percentile of sorted samples."""
+    return samples[max(0, math.ceil(p / 100.0 * len(samples)) - 1)]
+
+
+def distribution(samples: list) -> dict:
+    samples = sorted(samples)
+    if not samples:
+        return {"count": 0}
+    return {"count": len(samples), "p50_ms": round(percentile(samples, 50), 2),
+            "p90_ms": round(percentile(samples, 90), 2), "p99_ms": round(percentile(samples, 99), 2),
+            "max_ms": round(samples[-1], 2), "total_s": round(sum(samples) / 1000.0, 3)}
+
+
+def seed(url: str, apps: int, steps: int, components: int, days: int, seed_value: int = 7) -> dict:
+    """Fills an empty database with a build history; returns the record counts and the seconds it took."""
+    from sqlalchemy import create_engine, func, select
+    from database import migrate
+    from models import Application, Step
+
+    engine = create_engine(url)
+    started = time.perf_counter()
+    migrate(engine)
+    with engine.connect() as connection:
+        existing = connection.execute(select(func.count()).select_from(Application)).scalar()
+    if existing:
+        with engine.connect() as connection:
+            count = connection.execute(select(func.count()).select_from(Step)).scalar()
+        engine.dispose()
+        return {"applications": existing, "steps": count, "seeded": False, "seconds": 0.0}
+
+    rng = random.Random(seed_value)
+    now = datetime.now()
+    names = [f"comp-{index:04d}" for index in range(components)]
+    applications, step_rows = [], []
+    with engine.begin() as connection:
+        for index in range(apps):
+            build_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            timestamp = now - timedelta(seconds=rng.uniform(0, days * 86400))
+            status = "failed" if rng.random() < 0.05 else "success"
+            applications.append({"uuid": build_id, "application_name": names[index % components],
+                                 "action": "unbuild" if rng.random() < 0.1 else "build", "status": status,
+                                 "timestamp": timestamp, "run_started_at": timestamp, "tasks_built": []})
+            # Spread the steps evenly, the first records taking the remainder
+            for number in range(steps // apps + (index < steps % apps)):
+                step_rows.append({
+                    "task_name": f"task-{number // 3}", "step_name": STEP_NAMES[number % 3],
+                    "status": {"resource": f"res-{number // 3}", "status": "success",
+                               "message": f"Stack {build_id[:8]}-{number} {STEP_TYPES[number % 3]} complete"},
+                    "uuid": build_id, "timestamp": timestamp + timedelta(seconds=number * 30),
+                    "step_type": STEP_TYPES[number % 3], "duration": round(rng.uniform(1, 120), 3)})
+            if len(step_rows) >= SEED_BATCH or index == apps - 1:
+                connection.execute(Application.__table__.insert(), applications)
+                if step_rows:
+                    connection.execute(Step.__table__.insert(), step_rows)
+                applications, step_rows = [], []
+                print(f"\rSeeded {index + 1}/{apps} application records", end="", file=sys.stderr)
+    print(file=sys.stderr)
+    engine.dispose()
+    return {"applications": apps, "steps": steps, "seeded": True, "seconds": round(time.perf_counter() - started, 1)}
+
+
+class LockWaits:
+    """
+    Times, in the server, every write statement and commit of an engine, and counts "database is locked" errors.
+    Waiting for another writer (or, on SQLite, for readers to let go before a commit) happens inside these calls.
+    """
+
+    def __init__(self, threshold_ms: float):
+        self.threshold_ms = threshold_ms
+        self.samples = {"write": [], "commit": []}
+        self.locked_errors = 0
+
+    def install(self, engine) -> None:
+        from sqlalchemy import event
+
+        event.listen(engine, "before_cursor_execute", self.before_execute)
+        event.listen(engine, "after_cursor_execute", self.after_execute)
+        event.listen(engine, "handle_error", self.on_error)
+        do_commit = engine.dialect.do_commit
+
+        def timed_commit(dbapi_connection):
+            started = time.perf_counter()
+            try:
+                do_commit(dbapi_connection)
+            finally:
+                self.samples["commit"].append((time.perf_counter() - started) * 1000.0)
+
+        engine.dialect.do_commit = timed_commit
+
+    def before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("loadtest_started", []).append(time.perf_counter())
+
+    def after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = (time.perf_counter() - conn.info["loadtest_started"].pop()) * 1000.0
+        if statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+            self.samples["write"].append(elapsed)
+
+    def on_error(self, context):
+        started = context.connection.info.get("loadtest_started") if context.connection is not None else None
+        if started:
+            started.pop()
+        if "locked" in str(context.original_exception).lower():
+            self.locked_errors += 1
+
+    def summary(self) -> dict:
+        result = {"threshold_ms": self.threshold_ms, "locked_errors": self.locked_errors}
+        for kind, samples in self.samples.items():
+            result[kind] = dict(distribution(samples), over_threshold=sum(ms >= self.threshold_ms for ms in samples))
+        return result
+
+
+def serve(port: int, stats_path: str, threshold_ms: float) -> None:
+    """The server process: the API on port, its lock waits written to stats_path when it is interrupted."""
+    import uvicorn
+    from database import engine
+
+    lock_waits = LockWaits(threshold_ms)
+    lock_waits.install(engine)
+    try:
+        uvicorn.run("main:app", host="127.0.0.1", port=port, log_level="warning")
+    except KeyboardInterrupt:
+        pass  # uvicorn raises the SIGINT it handled again once it has shut down
+    finally:
+        with open(stats_path, "w") as f:
+            json.dump(lock_waits.summary(), f)
+
+
+def start_server(workdir: str, folder: str, url: str, threshold_ms: float, timeout: float = 60.0) -> tuple:
+    """(process, port, stats file) of a server that answers GET / with 200."""
+    port = free_port()
+    stats_path = os.path.join(workdir, "lock-waits.json")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])),
+               PATH=os.pathsep.join([os.path.join(workdir, "bin"), os.environ.get("PATH", "")]),
+               BUILDER_DATABASE_URL=url, BUILDER_AUTH_ENABLED="false", BUILDER_LOG_DIR=os.path.join(workdir, "logs"),
+               BUILDER_LOG_FILE=os.path.join(workdir, "app.log"))
+    env.setdefault("BUILDER_LOG_LEVEL", "WARNING")
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(port), "--stats", stats_path,
+                               "--lock-threshold-ms", str(threshold_ms)], cwd=folder, env=env)
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        if server.poll() is not None:
+            raise RuntimeError(f"The server exited with {server.returncode}")
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+        try:
+            connection.request("GET", "/")
+            if connection.getresponse().status == 200:
+                return server, port, stats_path
+        except OSError:
+            time.sleep(0.05)
+        finally:
+            connection.close()
+    stop_server(server)
+    raise RuntimeError(f"No response from the server within {timeout}s")
+
+
+def stop_server(server) -> None:
+    server.send_signal(signal.SIGINT)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+class Traffic:
+    """Closed-loop workers: each sends its next request as soon as the previous one has been answered."""
+
+    def __init__(self, port: int, folder: str, components: list, build_components: list, mix: dict):
+        self.port = port
+        self.folder = folder
+        self.components = components
+        self.build_components = build_components
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.results = []  # (kind, ms, status)
+
+    def request(self, connection, kind: str, rng: random.Random) -> str:
+        if kind == "status":
+            connection.request("GET", "/status/?" + urlencode({"application_name": rng.choice(self.components)}))
+        elif kind == "environment":
+            connection.request("GET", "/environment/?" + urlencode({
+                "component": rng.choice(self.build_components), "env_path": self.folder,
+                "resource_path": self.folder, "task_path": self.folder}))
+        else:
+            body = json.dumps({"component": rng.choice(self.build_components), "env_path": self.folder,
+                               "resource_path": self.folder, "task_path": self.folder})
+            connection.request("POST", "/build/", body=body, headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        payload = response.read()
+        if kind == "build" and response.status == 200:
+            # A build of a component that is already building is refused in the body
+            return f"200 {json.loads(payload).get('status')}"
+        return str(response.status)
+
+    def worker(self, index: int, deadline: float) -> None:
+        rng = random.Random(index)
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+        try:
+            while time.monotonic() < deadline:
+                kind = rng.choices(self.kinds, self.weights)[0]
+                started = time.perf_counter()
+                try:
+                    status = self.request(connection, kind, rng)
+                except (OSError, http.client.HTTPException) as e:
+                    status = type(e).__name__
+                    connection.close()
+                    connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+                self.results.append((kind, (time.perf_counter() - started) * 1000.0, status))
+        finally:
+            connection.close()
+
+    def run(self, concurrency: int, duration: float) -> float:
+        """Runs the workers for duration seconds; returns the seconds until the last one finished."""
+        started = time.monotonic()
+        workers = [threading.Thread(target=self.worker, args=(index, started + duration), daemon=True)
+                   for index in range(concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return time.monotonic() - started
+
+    def report(self, elapsed: float) -> dict:
+        by_kind = {}
+        for kind in self.kinds:
+            results = [result for result in self.results if result[0] == kind]
+            statuses = {}
+            for _, _, status in results:
+                statuses[status] = statuses.get(status, 0) + 1
+            by_kind[kind] = dict(distribution([ms for _, ms, _ in results]),
+                                 rps=round(len(results) / elapsed, 1), statuses=statuses)
+        return {"requests": len(self.results), "elapsed_s": round(elapsed, 2),
+                "throughput_rps": round(len(self.results) / elapsed, 1), "by_kind": by_kind}
+
+
+def write_build_components(folder: str, count: int) -> list:
+    """count components of one task each under folder; returns their names."""
+    resources = write_fixtures(folder, count)
+    names = []
+    for index, resource in enumerate(resources):
+        names.append(f"lt-{index:02d}")
+        write(os.path.join(folder, "tasks", f"{names[-1]}.yml"), "---\n" + TASK.format(index=index, resource=resource))
+    return names
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in KINDS:
+            raise argparse.ArgumentTypeError(f"unknown request kind '{kind}', expected one of {', '.join(KINDS)}")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--apps", type=int, default=10000)
+    parser.add_argument("--steps", type=int, default=500000)
+    parser.add_argument("--components", type=int, default=200, help="Components the history is spread over")
+    parser.add_argument("--days", type=int, default=90, help="Days the history is spread over")
+    parser.add_argument("--database", help="SQLite file to use; a temporary one is created by default")
+    parser.add_argument("--build-components", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("status=80,environment=15,build=5"))
+    parser.add_argument("--lock-threshold-ms", type=float, default=10.0,
+                        help="Writes and commits slower than this count as waiting for the lock")
+    parser.add_argument("--max-p99-ms", type=float, default=None)
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--stats", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.stats, args.lock_threshold_ms)
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+        database = os.path.abspath(args.database) if args.database else os.path.join(workdir, "history.db")
+        url = f"sqlite:///{database}"
+        history = seed(url, args.apps, args.steps, args.components, args.days)
+        write(os.path.join(workdir, "bin", "aws"), AWS_STUB)
+        os.chmod(os.path.join(workdir, "bin", "aws"), 0o755)
+        folder = os.path.join(workdir, "fixtures")
+        build_components = write_build_components(folder, args.build_components)
+
+        server, port, stats_path = start_server(workdir, folder, url, args.lock_threshold_ms)
+        try:
+            traffic = Traffic(port, folder, [f"comp-{index:04d}" for index in range(args.components)],
+                              build_components, args.mix)
+            elapsed = traffic.run(args.concurrency, args.duration)
+        finally:
+            stop_server(server)
+        with open(stats_path) as f:
+            lock_waits = json.load(f)
+
+    report = dict({
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "database": dict(history, file=database if args.database else None),
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+    }, **traffic.report(elapsed), lock_waits=lock_waits)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{history['applications']} application records, {history['steps']} steps; {args.concurrency} workers "
+              f"for {report['elapsed_s']} s: {report['requests']} requests, {report['throughput_rps']} req/s")
+        for kind, entry in report["by_kind"].items():
+            if entry["count"]:
+                print(f"  {kind:12s} {entry['count']:7d} req {entry['rps']:8.1f} req/s  p50 {entry['p50_ms']:8.1f}  "
+                      f"p90 {entry['p90_ms']:8.1f}  p99 {entry['p99_ms']:8.1f}  max {entry['max_ms']:8.1f} ms  "
+                      f"{entry['statuses']}")
+        for kind in ("write", "commit"):
+            entry = lock_waits[kind]
+            if entry["count"]:
+                print(f"  db {kind:9s} {entry['count']:7d} x  p50 {entry['p50_ms']:8.1f}  p99 {entry['p99_ms']:8.1f}  "
+                      f"max {entry['max_ms']:8.1f} ms  total {entry['total_s']} s  "
+                      f"{entry['over_threshold']} over {lock_waits['threshold_ms']:.0f} ms")
+        print(f"  database is locked errors: {lock_waits['locked_errors']}")
+
+    over = [kind for kind, entry in report["by_kind"].items()
+            if args.max_p99_ms is not None and entry["count"] and entry["p99_ms"] > args.max_p99_ms]
+    if over:
+        print(f"p99 latency over {args.max_p99_ms:.0f} ms for: {', '.join(over)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""
+Orchestration benchmark: time the service hot paths against synthetic components of 1 to 1,000 tasks.
+
+    python benchmarks/orchestration.py [--sizes 1,10,100,1000] [--runs 5] [--cases build,unbuild,...]
+                                       [--output results.json] [--baseline results.json] [--max-regression 0.25]
+                                       [--json]
+
+Every size gets its own fixture folder (environments/, resources/, tasks/bench.yml) in a temporary directory.
+Every task has its own resource, with a custom-cloudformation "deploy" step that renders a script and a template,
+and a shell "outputs" step. The scripts call `aws`, which resolves to a stub on PATH that only echoes. Steps are
+marked `throttled: false`, so the rate governor does not pace them and only orchestration overhead is measured.
+The database is a fresh, migrated sqlite file in the same directory.
+
+Cases, each timed over the whole component (per_task_ms divides by the number of tasks):
+
+  load_yaml              BaseService.load_yaml of the task file, parsed from disk (cache cleared first)
+  load_yaml_cached       the same file served from the YAML cache
+  render_template        BaseService.render_template of every task's deploy script
+  render_and_merge_envs  every task's environment merged with its rendered resource config
+  get_environment        EnvironmentService.get_environment of the component
+  build                  BuildService.build of the component, running every step script
+  scripts                the rendered step scripts alone, i.e. what build spends in subprocesses
+  get_status             StatusService.get_status of the component after a build
+  unbuild                UnbuildService.unbuild of the component, running every destroy script
+
+Results are JSON (commit, Python version, and per case and size the median, min and per task ms). With --baseline
+the script exits 1 when a case's median is more than --max-regression (a fraction) slower than in the baseline.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+COMPONENT = "bench"
+CASES = ("load_yaml", "load_yaml_cached", "render_template", "render_and_merge_envs", "get_environment",
+         "build", "scripts", "get_status", "unbuild")
+SUBPROCESS_CASES = {"build", "scripts", "unbuild"}  # Slow at 1,000 tasks: timed over --process-runs runs
+
+AWS_STUB = """#!/bin/sh
+# Stands in for the AWS CLI: answers every command at once
+case "$1 $2" in
+  "ssm get-parameter") echo "ami-0123456789abcdef0" ;;
+  *) echo '{"StackId": "arn:aws:cloudformation:ap-southeast-2:123456789012:stack/'"$4"'/0"}' ;;
+esac
+"""
+
+GLOBAL_ENV = """aws_region: "ap-southeast-2"
+project: "bench"
+hosted_zone_name: "bench.example.com"
+tooling_vpc_id: "vpc-0000000000123456"
+tooling_subnet_1: "subnet-0000000000123456"
+tooling_subnet_2: "subnet-0000000000223456"
+"""
+
+RESOURCE_ENV = """stack_name: "{resource}"
+instance_type: "t3.micro"
+key_pair: "bench-key"
+security_group_id: "sg-{index:016x}"
+"""
+
+RESOURCE_CONFIG = """bucket_name: "{{{{ project }}}}-{resource}"
+dns_name: "{resource}.{{{{ hosted_zone_name }}}}"
+subnet: "{{{{ tooling_subnet_1 }}}}"
+policy: "!Sub arn:aws:s3:::${{AWS::StackName}}-{{{{ project }}}}"
+versioning: "Enabled"
+"""
+
+DEPLOY_SCRIPT = """#!/bin/bash
+set -e
+export AWS_DEFAULT_REGION={{ aws_region }}
+SCRIPT_DIR=$(dirname "$0")
+ec2_ami=$(aws ssm get-parameter --name /golden-ami/latest --query "Parameter.Value" --output text)
+echo "Deploying {{ stack_name }} in {{ aws_region }}"
+aws cloudformation deploy --stack-name {{ stack_name }} --template-file "$SCRIPT_DIR/cfn.yml" \\
+  --parameter-overrides EC2AMI="${ec2_ami}" --no-fail-on-empty-changeset
+"""
+
+OUTPUTS_SCRIPT = """#!/bin/bash
+set -e
+aws cloudformation describe-stacks --stack-name {{ stack_name }} --output text
+"""
+
+DESTROY_SCRIPT = """#!/bin/bash
+set -e
+export AWS_DEFAULT_REGION={{ aws_region }}
+aws cloudformation delete-stack --stack-name {{ stack_name }}
+aws cloudformation wait stack-delete-complete --stack-name {{ stack_name }}
+"""
+
+TEMPLATE = """AWSTemplateFormatVersion: 2010-09-09
+Description: {{ stack_name }}
+Resources:
+{% for subnet in [tooling_subnet_1, tooling_subnet_2] %}
+  Instance{{ loop.index }}:
+    Type: 'AWS::EC2::Instance'
+    Properties:
+      InstanceType: {{ instance_type }}
+      KeyName: {{ key_pair }}
+      SubnetId: {{ subnet }}
+      SecurityGroupIds:
+        - {{ security_group_id }}
+      Tags:
+        - Key: Name
+          Value: !Sub '${AWS::StackName}-{{ loop.index }}'
+{% endfor %}
+"""
+
+TASK = """- name: "task-{index:04d}"
+  resource: "{resource}"
+  group: "bench"
+  type: "infrastructure"
+  account: "bench-np"
+  environment: "np"
+  steps:
+    - name: "deploy"
+      type: "custom-cloudformation"
+      action_script: "deploy_cfn.sh"
+      throttled: false
+    - name: "outputs"
+      type: "shell"
+      action_script: "outputs.sh"
+"""
+
+
+def write(path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def write_fixtures(folder: str, tasks: int) -> list:
+    """Writes a component of `tasks` tasks under folder; returns the resource names."""
+    write(os.path.join(folder, "environments", "np.yml"), GLOBAL_ENV)
+    resources = [f"res-{index:04d}" for index in range(tasks)]
+    for index, resource in enumerate(resources):
+        write(os.path.join(folder, "environments", resource, "np.yml"),
+              RESOURCE_ENV.format(resource=resource, index=index))
+        resource_folder = os.path.join(folder, "resources", resource)
+        write(os.path.join(resource_folder, "deploy_cfn.sh.j2"), DEPLOY_SCRIPT)
+        write(os.path.join(resource_folder, "cfn.yml.j2"), TEMPLATE)
+        write(os.path.join(resource_folder, "outputs.sh.j2"), OUTPUTS_SCRIPT)
+        write(os.path.join(resource_folder, "destroy.sh.j2"), DESTROY_SCRIPT)
+        write(os.path.join(resource_folder, "configs.yml"), RESOURCE_CONFIG.format(resource=resource))
+    write(os.path.join(folder, "tasks", f"{COMPONENT}.yml"),
+          "---\n" + "\n".join(TASK.format(index=index, resource=resource) for index, resource in enumerate(resources)))
+    return resources
+
+
+def prepare(workdir: str) -> None:
+    """Points the database, step logs and `aws` at workdir; must run before the project modules are imported."""
+    write(os.path.join(workdir, "bin", "aws"), AWS_STUB)
+    os.chmod(os.path.join(workdir, "bin", "aws"), 0o755)
+    os.environ["PATH"] = os.pathsep.join([os.path.join(workdir, "bin"), os.environ.get("PATH", "")])
+    os.environ["BUILDER_DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["BUILDER_LOG_DIR"] = os.path.join(workdir, "logs")
+    os.chdir(workdir)
+    logging.basicConfig(level=logging.ERROR)
+
+
+def timed(function, runs: int, setup=None) -> list:
+    """Milliseconds per call over runs calls, after one warm-up call; setup runs untimed before each call."""
+    samples = []
+    for run in range(runs + 1):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        function()
+        if run:
+            samples.append((time.perf_counter() - started) * 1000.0)
+    return samples
+
+
+def checked(response, results: int = None):
+    """The response, or RuntimeError when the run failed or did not run every step."""
+    if response.status != "success" or (results is not None and len(response.results) != results):
+        raise RuntimeError(f"{type(response).__name__} ended '{response.status}' with {len(response.results)} "
+                           f"result(s): {response.message}")
+    return response
+
+
+def benchmark(folder: str, resources: list, cases: list, runs: int, process_runs: int) -> dict:
+    """{case: [ms, ...]} for the component under folder."""
+    from database import SessionLocal
+    from services.base_service import BaseService
+    from services.build_service import BuildService
+    from services.environment_service import EnvironmentService
+    from services.file_cache import yaml_cache
+    from services.status_service import StatusService
+    from services.unbuild_service import UnbuildService
+
+    # An unbuild only gets the tasks folder, it reads environments/ and resources/ from the working directory
+    os.chdir(folder)
+    steps = 2 * len(resources)
+    service = BaseService()
+    service.configure_folders(folder, folder, folder)
+    task_file = os.path.join(service.TASKS_FOLDER, f"{COMPONENT}.yml")
+    resource_folders = [os.path.join(service.RESOURCES_FOLDER, resource) for resource in resources]
+    envs = [service.load_config(task) for task in service.load_yaml(task_file)]
+    configs = [service.load_yaml(os.path.join(path, "configs.yml")) for path in resource_folders]
+
+    def render_templates():
+        for path, env in zip(resource_folders, envs):
+            service.render_template(os.path.join(path, "deploy_cfn.sh.j2"), env)
+
+    def merge_envs():
+        for env, config in zip(envs, configs):
+            service.render_and_merge_envs(service, dict(env), dict(config))
+
+    def run_scripts():
+        for resource, path in zip(resources, resource_folders):
+            for script in ("deploy_cfn.sh", "outputs.sh"):
+                result = service.call_subprocess(resource, os.path.join(path, script))
+                if result["status"] != "success":
+                    raise RuntimeError(f"{script} of {resource} failed: {result['message']}")
+
+    db = SessionLocal()
+    try:
+        functions = {
+            "load_yaml": (lambda: service.load_yaml(task_file), yaml_cache.clear),
+            "load_yaml_cached": (lambda: service.load_yaml(task_file), None),
+            "render_template": (render_templates, None),
+            "render_and_merge_envs": (merge_envs, None),
+            "get_environment": (lambda: checked(EnvironmentService().get_environment(COMPONENT, folder, folder, folder)),
+                                None),
+            "build": (lambda: checked(BuildService().build(COMPONENT, folder, folder, folder, db), steps), None),
+            "scripts": (run_scripts, None),
+            "get_status": (lambda: StatusService.get_status(COMPONENT, db), db.expire_all),
+            "unbuild": (lambda: checked(UnbuildService().unbuild(COMPONENT, folder, False, db), steps),
+                        None),
+        }
+        if {"scripts", "get_status"} & set(cases) and "build" not in cases:
+            # Both need the rendered scripts and a build record
+            checked(BuildService().build(COMPONENT, folder, folder, folder, db), steps)
+        samples = {}
+        for case in CASES:
+            if case in cases:
+                function, setup = functions[case]
+                samples[case] = timed(function, process_runs if case in SUBPROCESS_CASES else runs, setup)
+        return samples
+    finally:
+        db.close()
+
+
+def summarise(samples: list, tasks: int) -> dict:
+    median = statistics.median(samples)
+    return {"median_ms": round(median, 3), "min_ms": round(min(samples), 3), "per_task_ms": round(median / tasks, 4),
+            "runs": len(samples)}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(results: dict, baseline: dict, max_regression: float) -> list:
+    """Cases and sizes whose median is more than max_regression slower than in the baseline."""
+    slower = []
+    for case, sizes in results["results"].items():
+        for size, entry in sizes.items():
+            before = baseline.get("results", {}).get(case, {}).get(size)
+            if before and entry["median_ms"] > before["median_ms"] * (1 + max_regression):
+                slower.append(f"{case} at {size} task(s): {before['median_ms']:.2f} ms -> {entry['median_ms']:.2f} ms")
+    return slower
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1,10,100,1000", help="Comma separated numbers of tasks")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--process-runs", type=int, default=3, help="Runs of the cases that start subprocesses")
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma separated cases to run")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--baseline", help="Results JSON of an earlier commit to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    parser.add_argument("--keep", action="store_true", help="Keep the fixture folder")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    cases = [case for case in args.cases.split(",") if case]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="orchestration-bench-")
+    cwd = os.getcwd()
+    try:
+        prepare(workdir)
+        from database import migrate
+        migrate()
+        results = {}
+        for size in sizes:
+            folder = os.path.join(workdir, f"tasks-{size}")
+            resources = write_fixtures(folder, size)
+            for case, samples in benchmark(folder, resources, cases, args.runs, args.process_runs).items():
+                results.setdefault(case, {})[str(size)] = summarise(samples, size)
+    finally:
+        os.chdir(cwd)
+        if args.keep:
+            print(f"Fixtures kept in {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "sizes": sizes,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Python {report['python']}, commit {(report['commit'] or 'unknown')[:12]}, median ms (per task)")
+        print(f"  {'case':22s}" + "".join(f"{size:>22d}" for size in sizes))
+        for case, entries in results.items():
+            cells = [entries.get(str(size)) for size in sizes]
+            print(f"  {case:22s}" + "".join(
+                f"{cell['median_ms']:>11.2f} ({cell['per_task_ms']:>7.3f})" if cell else f"{'-':>22s}" for cell in cells))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(report, json.load(f), args.max_regression)
+        for line in slower:
+            print(f"Regression: {line}", file=sys.stderr)
+        if slower:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Serialization benchmark: time to turn a realistic /status payload into response bytes, and what compression buys.
+
+    python benchmarks/serialization.py [--steps 200] [--message-bytes 8000] [--runs 50] [--min-speedup 1.5] [--json]
+
+The payload is what StatusService.status_payload builds for a build with --steps steps, each carrying
+--message-bytes of CloudFormation/Terraform style output. Paths compared, per response:
+
+  validated   StatusResponse(**payload), then the response model's pydantic-core dump_json (the response_model path)
+  encoder     jsonable_encoder + json.dumps (FastAPI's path for routes without a response model)
+  orjson      FastJSONResponse.render(payload), what GET /status/ sends now
+
+Compression is measured on the JSON body with the levels CompressionMiddleware uses. With --min-speedup the
+script exits 1 when orjson is less than that many times faster than the validated path.
+"""
+import os
+import sys
+import json
+import gzip
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from responses import CompressionMiddleware, FastJSONResponse, brotli  # noqa: E402
+from schemas import StatusResponse  # noqa: E402
+
+EVENTS = ("CREATE_IN_PROGRESS", "CREATE_COMPLETE", "UPDATE_IN_PROGRESS", "UPDATE_COMPLETE")
+TYPES = ("AWS::EC2::SecurityGroup", "AWS::IAM::Role", "AWS::Lambda::Function", "AWS::S3::Bucket")
+
+
+def step_output(rng: random.Random, size: int) -> str:
+    lines, total = [], 0
+    while total < size:
+        line = (f"2024-06-01 12:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d} {rng.choice(EVENTS)} "
+                f"{rng.choice(TYPES)} res-{rng.getrandbits(48):012x} "
+                f"arn:aws:cloudformation:eu-west-1:{rng.randint(10 ** 11, 10 ** 12 - 1)}:stack/app/{rng.getrandbits(64):016x}")
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)[:size]
+
+
+def status_payload(steps: int, message_bytes: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    return {
+        "uuid": "5f0c8f5e-2d0e-4c39-9d59-0d0b7f0ef001",
+        "application_name": "test-infra",
+        "action": "build",
+        "status": "started",
+        "message": "started",
+        "steps": [{
+            "id": i + 1,
+            "task_name": f"task-{i // 3}",
+            "step_name": ("package", "deploy", "verify")[i % 3],
+            "status": {"status": "success", "return_code": 0, "message": step_output(rng, message_bytes)},
+            "uuid": "5f0c8f5e-2d0e-4c39-9d59-0d0b7f0ef001",
+            "log_ref": None,
+            "log_size": None,
+            "step_type": "cloudformation",
+            "duration": round(rng.uniform(1, 300), 3),
+        } for i in range(steps)],
+        "change_token": 42,
+        "progress_percent": 61.5,
+        "eta_seconds": 120.0,
+    }
+
+
+def timed(function, runs: int) -> float:
+    """Median milliseconds per call."""
+    function()
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--message-bytes", type=int, default=8000)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--min-speedup", type=float, default=None)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    payload = status_payload(args.steps, args.message_bytes)
+    adapter = TypeAdapter(StatusResponse)
+    response = FastJSONResponse(payload)
+    body = response.render(payload)
+    serialization = {
+        "validated": timed(lambda: adapter.dump_json(StatusResponse(**payload)), args.runs),
+        "encoder": timed(lambda: json.dumps(jsonable_encoder(payload)).encode("utf-8"), args.runs),
+        "orjson": timed(lambda: response.render(payload), args.runs),
+    }
+    assert json.loads(body) == json.loads(adapter.dump_json(StatusResponse(**payload)))
+
+    middleware = CompressionMiddleware(None)
+    compression = {"gzip": {"level": middleware.GZIP_LEVEL}}
+    if brotli is not None:
+        compression["br"] = {"quality": middleware.BROTLI_QUALITY}
+    for coding, entry in compression.items():
+        compressed = middleware.compress(coding, body)
+        entry.update(bytes=len(compressed), ratio=round(len(body) / len(compressed), 1),
+                     ms=timed(lambda: middleware.compress(coding, body), max(args.runs // 5, 3)))
+    assert gzip.decompress(middleware.compress("gzip", body)) == body
+
+    result = {
+        "python": sys.version.split()[0],
+        "steps": args.steps,
+        "body_bytes": len(body),
+        "serialization_ms": serialization,
+        "speedup": round(serialization["validated"] / serialization["orjson"], 2),
+        "compression": compression,
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"Python {result['python']}, {args.steps} steps, {len(body) / 1024:.0f} KiB of JSON, "
+              f"median of {args.runs} runs")
+        for name, value in serialization.items():
+            print(f"  {name:10s} {value:8.2f} ms")
+        print(f"  orjson is {result['speedup']}x faster than the validated path")
+        for coding, entry in compression.items():
+            print(f"  {coding:10s} {entry['ms']:8.2f} ms  {entry['bytes'] / 1024:8.0f} KiB  ({entry['ratio']}x smaller)")
+
+    if args.min_speedup is not None and result["speedup"] < args.min_speedup:
+        print(f"orjson is less than {args.min_speedup}x faster than the validated path", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
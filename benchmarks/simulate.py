@@ -0,0 +1,223 @@
+"""
+Build simulation: hundreds of concurrent builds, their step scripts replayed from a bundle instead of run.
+
+    python benchmarks/simulate.py [--builds 200] [--speed 60] [--max-running 8] [--interval 0]
+                                  [--path FOLDER --component NAME --bundle replay.jsonl]
+                                  [--tasks 5 --step-seconds 30] [--output results.json] [--json]
+
+Record a bundle by running real builds with BUILDER_EXECUTION=record (and BUILDER_REPLAY_BUNDLE=replay.jsonl),
+then pass --path (the folder holding environments/, resources/ and tasks/), --component and --bundle. Without
+them the simulation generates a component of --tasks tasks (see orchestration.py) and a bundle whose steps take
+--step-seconds on average.
+
+The builds arrive --interval simulated seconds apart (0: all at once) and go through an admission controller
+with --max-running slots, --max-queued places and --queue-timeout, like POST /build/. Each build runs the whole
+orchestration: rendering, database records, the rate governor. Only the scripts are replayed, --speed times faster
+than recorded; the governor's rates and delays are scaled by the same factor. All times in the report are
+simulated seconds:
+
+  makespan        first arrival to last build finished
+  utilisation     replayed step time over the running slots' capacity during the makespan
+  overhead        per build, run time minus the recorded time of its steps, i.e. scheduling and orchestration
+  queue/run       percentiles of the admission wait and of the build run time
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from loadtest import percentile  # noqa: E402
+from orchestration import COMPONENT, git_commit, prepare, write, write_fixtures  # noqa: E402
+
+GOVERNOR_RATES = ("INITIAL_RATE", "MIN_RATE", "MAX_RATE", "ADDITIVE_INCREASE")
+GOVERNOR_DELAYS = ("DECREASE_COOLDOWN", "BACKOFF_BASE", "BACKOFF_CAP")
+
+
+def synthetic_bundle(path: str, resources: list, step_seconds: float, seed: int = 7) -> None:
+    """Three recorded runs of every script of the generated component, around step_seconds each."""
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for resource in resources:
+            for script in ("deploy_cfn.sh", "outputs.sh", "destroy.sh"):
+                for _ in range(3):
+                    f.write(json.dumps({"resource": resource, "script": script, "returncode": 0,
+                                        "stdout": f"{script} of {resource} complete\n", "stderr": "",
+                                        "duration": round(rng.uniform(0.5, 1.5) * step_seconds, 3)}) + "\n")
+
+
+def summary(values: list) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {"count": len(values), "p50": round(percentile(values, 50), 2), "p90": round(percentile(values, 90), 2),
+            "p99": round(percentile(values, 99), 2), "max": round(values[-1], 2)}
+
+
+class Simulation:
+    def __init__(self, path: str, component: str, task_path: str, speed: float, admission):
+        self.path = path
+        self.component = component
+        self.task_path = task_path
+        self.speed = speed
+        self.admission = admission
+        self.builds = []  # {"queued", "run", "status"} in simulated seconds
+        self._lock = threading.Lock()
+
+    def build(self, index: int, arrival: float) -> None:
+        from database import SessionLocal
+        from services.admission import AdmissionRejected
+        from services.build_service import BuildService
+
+        time.sleep(max(0.0, arrival - time.monotonic()))
+        queued = time.monotonic()
+        try:
+            self.admission.acquire()
+        except AdmissionRejected:
+            with self._lock:
+                self.builds.append({"queued": (time.monotonic() - queued) * self.speed, "status": "rejected"})
+            return
+        started = time.monotonic()
+        db = SessionLocal()
+        try:
+            response = BuildService().build(f"{self.component}-{index:04d}", self.path, self.path, self.task_path, db)
+            status = response.status
+        except Exception as e:
+            status = f"error: {e}"
+        finally:
+            db.close()
+            self.admission.release(time.monotonic() - started)
+        finished = time.monotonic()
+        with self._lock:
+            self.builds.append({"queued": (started - queued) * self.speed, "run": (finished - started) * self.speed,
+                                "finished": finished, "status": status})
+
+    def run(self, builds: int, interval: float) -> float:
+        """Starts the builds and waits for all of them; returns the makespan in simulated seconds."""
+        started = time.monotonic()
+        threads = [threading.Thread(target=self.build, args=(index, started + index * interval / self.speed),
+                                    daemon=True) for index in range(builds)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        finished = max([build["finished"] for build in self.builds if "finished" in build], default=started)
+        return (finished - started) * self.speed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--builds", type=int, default=200)
+    parser.add_argument("--speed", type=float, default=60.0, help="Replay this many times faster than recorded")
+    parser.add_argument("--interval", type=float, default=0.0, help="Simulated seconds between build arrivals")
+    parser.add_argument("--max-running", type=int, default=8)
+    parser.add_argument("--max-queued", type=int, default=1000)
+    parser.add_argument("--queue-timeout", type=float, default=math.inf, help="Simulated seconds")
+    parser.add_argument("--path", help="Folder holding environments/, resources/ and tasks/")
+    parser.add_argument("--component")
+    parser.add_argument("--bundle", help="Replay bundle recorded with BUILDER_EXECUTION=record")
+    parser.add_argument("--tasks", type=int, default=5, help="Tasks of the generated component")
+    parser.add_argument("--step-seconds", type=float, default=30.0, help="Mean step time of the generated bundle")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+    if any((args.path, args.component, args.bundle)) and not all((args.path, args.component, args.bundle)):
+        parser.error("--path, --component and --bundle go together")
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    workdir = tempfile.mkdtemp(prefix="simulation-")
+    cwd = os.getcwd()
+    try:
+        if args.path:
+            path, component, bundle = os.path.abspath(args.path), args.component, os.path.abspath(args.bundle)
+        else:
+            path, component, bundle = os.path.join(workdir, "fixtures"), COMPONENT, os.path.join(workdir, "replay.jsonl")
+            synthetic_bundle(bundle, write_fixtures(path, args.tasks), args.step_seconds)
+        # Every build gets a component of its own, or the build locker would turn all but one away
+        with open(os.path.join(path, "tasks", f"{component}.yml")) as f:
+            task_file = f.read()
+        task_path = os.path.join(workdir, "simulated")
+        for index in range(args.builds):
+            write(os.path.join(task_path, "tasks", f"{component}-{index:04d}.yml"), task_file)
+
+        os.environ.update(BUILDER_EXECUTION="replay", BUILDER_REPLAY_BUNDLE=bundle, BUILDER_REPLAY_SPEED=str(args.speed))
+        prepare(workdir)
+        from database import migrate
+        from services.admission import AdmissionController
+        from services.rate_governor import governor
+        from services.step_executor import step_executor
+
+        migrate()
+        for name in GOVERNOR_RATES:
+            setattr(governor, name, getattr(governor, name) * args.speed)
+        for name in GOVERNOR_DELAYS:
+            setattr(governor, name, getattr(governor, name) / args.speed)
+        admission = AdmissionController(max_running=args.max_running, max_queued=args.max_queued,
+                                        queue_timeout=args.queue_timeout / args.speed, adaptive=False,
+                                        threadpool_size=math.inf)  # The builds run on threads of their own
+
+        simulation = Simulation(path, component, task_path, args.speed, admission)
+        started = time.monotonic()
+        makespan = simulation.run(args.builds, args.interval)
+        wall = time.monotonic() - started
+        executor = step_executor.stats()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    ran = [build for build in simulation.builds if "run" in build]
+    statuses = {}
+    for build in simulation.builds:
+        statuses[build["status"]] = statuses.get(build["status"], 0) + 1
+    run_time = sum(build["run"] for build in ran)
+    report = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "builds": args.builds,
+        "speed": args.speed,
+        "max_running": args.max_running,
+        "interval_s": args.interval,
+        "wall_s": round(wall, 2),
+        "makespan_s": round(makespan, 1),
+        "statuses": statuses,
+        "replayed_steps": executor["replayed"],
+        "replayed_step_s": executor["replayed_seconds"],
+        "mismatched_steps": executor["mismatched"],
+        "utilisation": round(executor["replayed_seconds"] / (makespan * args.max_running), 3) if makespan else None,
+        "overhead_per_build_s": round((run_time - executor["replayed_seconds"]) / len(ran), 2) if ran else None,
+        "queue_s": summary([build["queued"] for build in simulation.builds]),
+        "run_s": summary([build["run"] for build in ran]),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{args.builds} builds, {args.max_running} slots, replayed {args.speed:g}x faster in {report['wall_s']} s")
+        print(f"  makespan     {report['makespan_s']:10.1f} s   statuses {statuses}")
+        print(f"  steps        {report['replayed_steps']:10d}     {report['replayed_step_s']:.1f} s recorded, "
+              f"{report['mismatched_steps']} of changed scripts")
+        if ran:
+            print(f"  utilisation  {report['utilisation']:10.1%}")
+            print(f"  overhead     {report['overhead_per_build_s']:10.2f} s per build")
+        for name in ("queue_s", "run_s"):
+            entry = report[name]
+            if entry["count"]:
+                print(f"  {name[:-2]:12s} p50 {entry['p50']:8.1f}  p90 {entry['p90']:8.1f}  p99 {entry['p99']:8.1f}  "
+                      f"max {entry['max']:8.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Cold start benchmark: import time of every module and time to first response of the API.
+
+    python benchmarks/startup.py [--runs 5] [--fresh-db|--existing-db] [--max-ready-ms 1500] [--json]
+
+Every run is a new interpreter, started like a CI container would start the API. Import times come from
+`python -X importtime -c "import main"`; time to first response is measured from spawning uvicorn to the first
+200 from GET / (lifespan hooks, i.e. logging and migrations, included). Runs happen in a temporary folder, so
+--fresh-db (the default) measures creating the schema and --existing-db a database that is already migrated.
+With --max-ready-ms the script exits 1 when the median time to first response is over the budget.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import http.client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_PREFIXES = ("main", "database", "models", "schemas", "auth", "routes", "services")
+THIRD_PARTY = ("fastapi", "starlette", "pydantic", "sqlalchemy", "jinja2", "yaml", "alembic", "uvicorn")
+
+
+def environment() -> dict:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    env.setdefault("BUILDER_LOG_LEVEL", "WARNING")
+    return env
+
+
+def import_times(runs: int) -> dict:
+    """{module: median cumulative import time in ms} over runs fresh interpreters."""
+    samples = {}
+    for _ in range(runs + 1):  # The first run only warms the bytecode and file system caches
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT,
+                                 env=environment(), capture_output=True, text=True, check=True)
+        run = {}
+        for line in process.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                run[name.strip()] = int(cumulative) / 1000.0
+        for name, value in run.items():
+            samples.setdefault(name, []).append(value)
+    return {name: statistics.median(values[1:] or values) for name, values in samples.items()}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def first_response(workdir: str, timeout: float = 30.0) -> float:
+    """Milliseconds from spawning uvicorn to the first 200 from GET /."""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level",
+                               "warning"], cwd=workdir, env=environment(), stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {server.returncode}")
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            try:
+                connection.request("GET", "/")
+                if connection.getresponse().status == 200:
+                    return (time.perf_counter() - started) * 1000.0
+            except OSError:
+                time.sleep(0.005)
+            finally:
+                connection.close()
+        raise RuntimeError(f"No response within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def ready_times(runs: int, fresh_db: bool) -> list:
+    with tempfile.TemporaryDirectory() as workdir:
+        first_response(workdir)  # Warm up, and leaves a migrated database for --existing-db
+        times = []
+        for _ in range(runs):
+            if fresh_db and os.path.exists(os.path.join(workdir, "test.db")):
+                os.remove(os.path.join(workdir, "test.db"))
+            times.append(first_response(workdir))
+        return times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    database = parser.add_mutually_exclusive_group()
+    database.add_argument("--fresh-db", dest="fresh_db", action="store_true", default=True)
+    database.add_argument("--existing-db", dest="fresh_db", action="store_false")
+    parser.add_argument("--max-ready-ms", type=float, default=None)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    imports = import_times(args.runs)
+    modules = {name: value for name, value in imports.items()
+               if name.split(".")[0] in PROJECT_PREFIXES or name in THIRD_PARTY}
+    ready = ready_times(args.runs, args.fresh_db)
+    result = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "database": "fresh" if args.fresh_db else "existing",
+        "import_main_ms": imports.get("main"),
+        "first_response_ms": {"median": statistics.median(ready), "min": min(ready), "max": max(ready)},
+        "modules_ms": dict(sorted(modules.items(), key=lambda item: item[1], reverse=True)),
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"Python {result['python']}, {args.runs} runs, {result['database']} database")
+        print(f"import main            {result['import_main_ms']:8.1f} ms")
+        print("first response         {median:8.1f} ms (min {min:.1f}, max {max:.1f})".format(
+            **result["first_response_ms"]))
+        print("\nCumulative import time per module (median, ms):")
+        for name, value in result["modules_ms"].items():
+            print(f"  {value:8.1f}  {name}")
+
+    if args.max_ready_ms is not None and result["first_response_ms"]["median"] > args.max_ready_ms:
+        print(f"Median time to first response is over the {args.max_ready_ms:.0f} ms budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,25 @@
-from sqlalchemy import create_engine
+import os
+from functools import lru_cache
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-DATABASE_URL = "sqlite:///./test.db"
+DATABASE_URL = os.environ.get("BUILDER_DATABASE_URL", "sqlite:///./test.db")
+# asyncio drivers used for the read paths, per backend of DATABASE_URL
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+connect_args = {"check_same_thread": False} if make_url(DATABASE_URL).get_backend_name() == "sqlite" else {}
+engine = create_engine(DATABASE_URL, connect_args=connect_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Newest revision under migrations/versions; migrate() skips alembic entirely when the database is at it
+HEAD_REVISION = "0004"
+BASELINE_REVISION = "0001"
+MIGRATIONS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
 
 # Dependency to get a database session
 def get_db():
@@ -17,3 +28,74 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def async_url(url: str) -> str:
+    """The asyncio driver URL for the same database as a sync URL, e.g. sqlite:///x.db -> sqlite+aiosqlite:///x.db."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver known for '{backend}', set BUILDER_ASYNC_DATABASE_URL")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+@lru_cache(maxsize=1)
+def async_session_factory():
+    """
+    Sessions of the asyncio engine, created on first use (the driver is only imported by processes that need it).
+    Sessions only check out a connection while a query runs, so requests waiting on something else hold none.
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(os.environ.get("BUILDER_ASYNC_DATABASE_URL") or async_url(DATABASE_URL))
+    return async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+# Dependency to get an asyncio database session, for read paths that should not hold a worker thread
+async def get_async_db():
+    async with async_session_factory()() as db:
+        yield db
+
+
+async def dispose_async_engine() -> None:
+    if async_session_factory.cache_info().currsize:
+        await async_session_factory().kw["bind"].dispose()
+
+
+def migrate(bind=None) -> str:
+    """
+    Upgrades the schema to HEAD_REVISION and returns the revision.
+    Databases created by Base.metadata.create_all before migrations existed are stamped with the baseline first;
+    an empty database is created from the models directly.
+    """
+    bind = bind if bind is not None else engine
+    with bind.connect() as connection:
+        tables = set(inspect(connection).get_table_names())
+        if "alembic_version" in tables:
+            current = connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+            if current == HEAD_REVISION:
+                return current
+
+    if not tables:
+        # An empty database gets the models' schema (identical to the migrations at head) and the head stamp
+        import models  # noqa: F401  (registers the tables on Base.metadata)
+
+        with bind.begin() as connection:
+            Base.metadata.create_all(bind=connection)
+            connection.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)"))
+            connection.execute(text("INSERT INTO alembic_version (version_num) VALUES (:revision)"),
+                               {"revision": HEAD_REVISION})
+        return HEAD_REVISION
+
+    # Only pay for importing alembic when there is something to do
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_FOLDER)
+    with bind.begin() as connection:
+        config.attributes["connection"] = connection
+        if "alembic_version" not in tables and "applications" in tables:
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
+    return HEAD_REVISION
@@ -1,29 +1,95 @@
-from fastapi import FastAPI
-from routes import environment, resources, build, unbuild, status
-from database import Base, engine
-import logging
+from contextlib import asynccontextmanager
+from anyio import to_thread
+from fastapi import Depends, FastAPI
+from routes import environment, resources, build, unbuild, status, batch, plan, components, retention, analytics
+from routes import auth as auth_routes
+from auth import require_user
+from database import SessionLocal, dispose_async_engine, migrate
+from responses import CompressionMiddleware
+from services.admission import AdmissionController
+from services.change_tracker import track_changes
+from services.log_pipeline import log_pipeline
+from services.notifier import notifier
+import os
+import threading
 
-logging.basicConfig(
-    level=logging.DEBUG,  # Set the minimum level to DEBUG; change to INFO or ERROR as needed.
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
 
-app = FastAPI(title="PY_Builder API Server", version="1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Logs are written off the request threads; BUILDER_LOG_LEVEL (default INFO) and BUILDER_LOG_FORMAT (json/text)
+    # set the level and format, a build/unbuild request can opt into DEBUG with "debug": true
+    log_pipeline.configure()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+    # Sync endpoints run on anyio's worker threads; admission keeps running and queued builds below this size
+    to_thread.current_default_thread_limiter().total_tokens = AdmissionController.THREADPOOL_SIZE
 
-# Include API routes
-app.include_router(environment.router, prefix="/environment", tags=["Environment"])
+    # Callback events are unsigned without BUILDER_CALLBACK_SECRET or a per-target secret
+    notifier.check_signing()
 
-app.include_router(resources.router, prefix="/resources", tags=["Resources"])
+    # Schema changes are alembic migrations (migrations/); a database already at head costs one query
+    migrate()
 
-app.include_router(build.router, prefix="/build", tags=["Build"])
+    # BUILDER_ADMIN_USERNAME/BUILDER_ADMIN_PASSWORD create the first user, who can then request tokens
+    admin_username = os.environ.get("BUILDER_ADMIN_USERNAME")
+    if admin_username and os.environ.get("BUILDER_ADMIN_PASSWORD"):
+        from services.user_service import UserService
+        db = SessionLocal()
+        try:
+            UserService.ensure_user(admin_username, os.environ["BUILDER_ADMIN_PASSWORD"], db)
+        finally:
+            db.close()
 
-app.include_router(unbuild.router, prefix="/unbuild", tags=["unbuild"])
+    # BUILDER_WARM_PATH is the base folder holding environments/, resources/ and tasks/
+    warm_path = os.environ.get("BUILDER_WARM_PATH")
+    if warm_path:
+        from services.environment_service import EnvironmentService
+        threading.Thread(target=EnvironmentService().warm, args=(warm_path, warm_path, warm_path),
+                         name="environment-warm", daemon=True).start()
 
-app.include_router(status.router, prefix="/status", tags=["status"])
+    # BUILDER_RETENTION_INTERVAL (seconds) enables periodic pruning of the build history
+    interval = float(os.environ.get("BUILDER_RETENTION_INTERVAL", 0))
+    if interval > 0:
+        from services.retention_service import RetentionService
+        threading.Thread(target=RetentionService().run_forever, args=(SessionLocal, interval),
+                         name="retention", daemon=True).start()
+
+    yield
+    await dispose_async_engine()
+    log_pipeline.stop()
+
+
+app = FastAPI(title="PY_Builder API Server", version="1.0", lifespan=lifespan)
+
+# Large responses (status and build results carry step output) are brotli/gzip compressed when the client accepts it
+app.add_middleware(CompressionMiddleware)
+
+# Committed record and step changes wake up long-polling /status requests
+track_changes(SessionLocal)
+
+# Include API routes; all of them need a bearer token from /auth/token (unless BUILDER_AUTH_ENABLED=false)
+authenticated = [Depends(require_user)]
+
+app.include_router(auth_routes.router, prefix="/auth", tags=["auth"])
+
+app.include_router(environment.router, prefix="/environment", tags=["Environment"], dependencies=authenticated)
+
+app.include_router(resources.router, prefix="/resources", tags=["Resources"], dependencies=authenticated)
+
+app.include_router(build.router, prefix="/build", tags=["Build"], dependencies=authenticated)
+
+app.include_router(unbuild.router, prefix="/unbuild", tags=["unbuild"], dependencies=authenticated)
+
+app.include_router(status.router, prefix="/status", tags=["status"], dependencies=authenticated)
+
+app.include_router(batch.router, prefix="/batch", tags=["batch"], dependencies=authenticated)
+
+app.include_router(plan.router, prefix="/plan", tags=["plan"], dependencies=authenticated)
+
+app.include_router(components.router, prefix="/components", tags=["components"], dependencies=authenticated)
+
+app.include_router(retention.router, prefix="/retention", tags=["retention"], dependencies=authenticated)
+
+app.include_router(analytics.router, prefix="/analytics", tags=["analytics"], dependencies=authenticated)
 
 
 # Root endpoint
@@ -0,0 +1,64 @@
+"""Baseline: the schema Base.metadata.create_all created before migrations
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "environments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+    )
+    op.create_index("ix_environments_id", "environments", ["id"])
+    op.create_index("ix_environments_name", "environments", ["name"], unique=True)
+
+    op.create_table(
+        "resources",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("application_name", sa.String(), nullable=False),
+        sa.Column("task_name", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("uuid", sa.String(), nullable=False),
+    )
+    op.create_index("ix_resources_id", "resources", ["id"])
+    op.create_index("ix_resources_task_name", "resources", ["task_name"], unique=True)
+    op.create_index("ix_resources_uuid", "resources", ["uuid"])
+
+    op.create_table(
+        "steps",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("task_name", sa.String(), nullable=False),
+        sa.Column("step_name", sa.String(), nullable=False),
+        sa.Column("status", sa.JSON(), nullable=False),
+        sa.Column("uuid", sa.String(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_steps_id", "steps", ["id"])
+    op.create_index("ix_steps_uuid", "steps", ["uuid"])
+
+    op.create_table(
+        "applications",
+        sa.Column("uuid", sa.String(), primary_key=True),
+        sa.Column("application_name", sa.String(), nullable=False),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.Column("tasks_built", sa.JSON(), nullable=True),
+    )
+    op.create_index("ix_applications_uuid", "applications", ["uuid"])
+
+
+def downgrade() -> None:
+    for table in ("applications", "steps", "resources", "environments"):
+        op.drop_table(table)
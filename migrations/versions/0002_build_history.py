@@ -0,0 +1,94 @@
+"""Build history: step fingerprints, log references and durations, matrix/run columns, retention tables
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Databases that were created with Base.metadata.create_all after these columns were added to the models already
+have some or all of them, so every column, table and index is only added when missing. Offline (--sql) scripts
+assume the baseline schema.
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def new_columns() -> dict:
+    # Fresh Column objects on every run, a Column can only ever belong to one table
+    return {
+        "steps": [
+            sa.Column("input_hash", sa.String(), nullable=True),
+            sa.Column("log_ref", sa.String(), nullable=True),
+            sa.Column("log_size", sa.Integer(), nullable=True),
+            sa.Column("step_type", sa.String(), nullable=True),
+            sa.Column("duration", sa.Float(), nullable=True),
+        ],
+        "applications": [
+            sa.Column("task_hash", sa.String(), nullable=True),
+            sa.Column("parent_uuid", sa.String(), nullable=True),
+            sa.Column("environment", sa.String(), nullable=True),
+            sa.Column("planned_steps", sa.JSON(), nullable=True),
+            sa.Column("run_started_at", sa.DateTime(), nullable=True),
+        ],
+    }
+
+
+NEW_INDEXES = [
+    ("ix_applications_parent_uuid", "applications", ["parent_uuid"]),
+    ("ix_build_rollups_uuid", "build_rollups", ["uuid"]),
+    ("ix_build_rollups_application_name", "build_rollups", ["application_name"]),
+]
+
+
+def upgrade() -> None:
+    inspector = None if context.is_offline_mode() else sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names()) if inspector else set()
+
+    for table, columns in new_columns().items():
+        existing = {column["name"] for column in inspector.get_columns(table)} if inspector else set()
+        missing = [column for column in columns if column.name not in existing]
+        if missing:
+            with op.batch_alter_table(table) as batch:
+                for column in missing:
+                    batch.add_column(column)
+
+    if "retention_policies" not in tables:
+        op.create_table(
+            "retention_policies",
+            sa.Column("application_name", sa.String(), primary_key=True),
+            sa.Column("keep_builds", sa.Integer(), nullable=True),
+            sa.Column("keep_days", sa.Integer(), nullable=True),
+        )
+    if "build_rollups" not in tables:
+        op.create_table(
+            "build_rollups",
+            sa.Column("uuid", sa.String(), primary_key=True),
+            sa.Column("application_name", sa.String(), nullable=False),
+            sa.Column("action", sa.String(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+            sa.Column("duration_seconds", sa.Float(), nullable=True),
+            sa.Column("step_count", sa.Integer(), nullable=False),
+            sa.Column("failed_steps", sa.Integer(), nullable=False),
+            sa.Column("archive", sa.String(), nullable=True),
+        )
+
+    inspector = None if context.is_offline_mode() else sa.inspect(op.get_bind())
+    for name, table, columns in NEW_INDEXES:
+        if not inspector or name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    op.drop_table("build_rollups")
+    op.drop_table("retention_policies")
+    op.drop_index("ix_applications_parent_uuid", "applications")
+    for table, columns in new_columns().items():
+        with op.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.drop_column(column.name)
@@ -0,0 +1,54 @@
+"""Resource inventory: replaces the unused resources table with one row per deployed task
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+The old table could not be written through the API (it had no "name" column), so it is dropped, not converted.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_table("resources")
+    op.create_table(
+        "resources",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("application_name", sa.String(), nullable=False),
+        sa.Column("task_name", sa.String(), nullable=False),
+        sa.Column("resource", sa.String(), nullable=False),
+        sa.Column("step_name", sa.String(), nullable=True),
+        sa.Column("step_type", sa.String(), nullable=True),
+        sa.Column("environment", sa.String(), nullable=True),
+        sa.Column("account", sa.String(), nullable=True),
+        sa.Column("region", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("uuid", sa.String(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("application_name", "task_name", name="uq_resources_application_task"),
+    )
+    op.create_index("ix_resources_id", "resources", ["id"])
+    op.create_index("ix_resources_status_account_region", "resources", ["status", "account", "region"])
+    op.create_index("ix_resources_status_environment", "resources", ["status", "environment"])
+    op.create_index("ix_resources_resource", "resources", ["resource"])
+
+
+def downgrade() -> None:
+    op.drop_table("resources")
+    op.create_table(
+        "resources",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("application_name", sa.String(), nullable=False),
+        sa.Column("task_name", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("uuid", sa.String(), nullable=False),
+    )
+    op.create_index("ix_resources_id", "resources", ["id"])
+    op.create_index("ix_resources_task_name", "resources", ["task_name"], unique=True)
+    op.create_index("ix_resources_uuid", "resources", ["uuid"])
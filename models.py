@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime
+from sqlalchemy import Boolean, Column, Integer, String, JSON, DateTime, Float, Index, UniqueConstraint
 from database import Base
 from datetime import datetime
 
@@ -12,13 +12,28 @@ class Environment(Base):
 
 
 class Resource(Base):
+    """Inventory: what each component has deployed, kept up to date by successful build and unbuild steps."""
     __tablename__ = "resources"
+    __table_args__ = (
+        UniqueConstraint("application_name", "task_name", name="uq_resources_application_task"),
+        # Fleet-wide "what exists where" filters; SQLite appends the id, so keyset pages stay on the index
+        Index("ix_resources_status_account_region", "status", "account", "region"),
+        Index("ix_resources_status_environment", "status", "environment"),
+        Index("ix_resources_resource", "resource"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    application_name = Column(String, nullable=False)
-    task_name = Column(String, unique=True, index=True, nullable=False)
-    status = Column(String, nullable=False)
-    uuid = Column(String, index=True, nullable=False)
+    application_name = Column(String, nullable=False)  # Component, or '<component>@<environment>' for matrix builds
+    task_name = Column(String, nullable=False)
+    resource = Column(String, nullable=False)  # Resource folder of the task
+    step_name = Column(String, nullable=True)  # Last successful step
+    step_type = Column(String, nullable=True)
+    environment = Column(String, nullable=True)
+    account = Column(String, nullable=True)
+    region = Column(String, nullable=True)
+    status = Column(String, nullable=False)  # "deployed" or "destroyed"
+    uuid = Column(String, nullable=True)  # Build/unbuild that last changed it, None when registered by hand
+    updated_at = Column(DateTime, default=datetime.now, nullable=False)
 
 
 class Step(Base):
@@ -29,6 +44,11 @@ class Step(Base):
     status = Column(JSON, nullable=False)  # Stores the full result dictionary as JSON
     uuid = Column(String, index=True, nullable=False)
     timestamp = Column(DateTime, default=datetime.now)  # New timestamp column
+    input_hash = Column(String, nullable=True)  # Fingerprint of the rendered script/template the step ran
+    log_ref = Column(String, nullable=True)  # Full output in the log store when the message was truncated
+    log_size = Column(Integer, nullable=True)  # Size in bytes of the full output
+    step_type = Column(String, nullable=True)  # Step "type" from the task file (cloudformation, terraform, ...)
+    duration = Column(Float, nullable=True)  # Seconds the step took, rendering and retries included
 
 
 class Application(Base):
@@ -37,5 +57,40 @@ class Application(Base):
     application_name = Column(String, nullable=False)
     action = Column(String, nullable=False)  # e.g., "build" or "unbuild"
     status = Column(String, nullable=False)  # e.g., "started", "failed", "success"
-    timestamp = Column(DateTime, default=datetime.now(), nullable=False)
+    timestamp = Column(DateTime, default=datetime.now, nullable=False)
     tasks_built = Column(JSON, nullable=True)  # New field: list of tasks (resource names)
+    task_hash = Column(String, nullable=True)  # Fingerprint of the task file the build started from
+    parent_uuid = Column(String, index=True, nullable=True)  # Set on the child builds of a matrix build
+    environment = Column(String, nullable=True)  # Environment override of a matrix child build
+    planned_steps = Column(JSON, nullable=True)  # Steps the current run will execute, see BaseService.plan_steps
+    run_started_at = Column(DateTime, nullable=True)  # Start of the current run (a resume or unbuild starts a new one)
+
+
+class RetentionPolicy(Base):
+    __tablename__ = "retention_policies"
+    application_name = Column(String, primary_key=True)  # "*" is the default for applications without a policy
+    keep_builds = Column(Integer, nullable=True)  # Newest builds to keep
+    keep_days = Column(Integer, nullable=True)  # Builds younger than this are kept
+
+
+class BuildRollup(Base):
+    __tablename__ = "build_rollups"
+    uuid = Column(String, primary_key=True, index=True)
+    application_name = Column(String, index=True, nullable=False)
+    action = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)  # Time of the last step
+    duration_seconds = Column(Float, nullable=True)
+    step_count = Column(Integer, nullable=False, default=0)
+    failed_steps = Column(Integer, nullable=False, default=0)
+    archive = Column(String, nullable=True)  # Archive file holding the record and its steps, once pruned
+
+
+class User(Base):
+    __tablename__ = "users"
+    id = Column(Integer, primary_key=True, index=True)
+    username = Column(String, unique=True, index=True, nullable=False)
+    hashed_password = Column(String, nullable=False)  # bcrypt
+    disabled = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
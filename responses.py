@@ -0,0 +1,128 @@
+import os
+import gzip
+import logging
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Optional: without it responses are only gzip compressed
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON rendered by orjson, for bodies the services already build as plain dicts and lists.
+
+    Returning one from a route bypasses the response_model (which still documents the route): the content is not
+    validated again, so it has to match the model field by field.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def accepted_encodings(accept_encoding: str) -> dict:
+    """{coding: q} from an Accept-Encoding header; a missing q is 1, malformed ones are 0."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding.strip():
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip()] = q
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Brotli or gzip, negotiated from Accept-Encoding, for responses of at least MIN_SIZE bytes.
+
+    Only complete bodies of compressible types are compressed; streamed responses, partial content (206, byte
+    ranges) and bodies that already carry a Content-Encoding pass through untouched. Bodies over OFFLOAD_SIZE are
+    compressed on a worker thread so the event loop keeps serving other requests.
+    """
+    MIN_SIZE = int(os.environ.get("BUILDER_COMPRESS_MIN_BYTES", 1024))
+    OFFLOAD_SIZE = 256 * 1024
+    GZIP_LEVEL = 6
+    BROTLI_QUALITY = 4  # Smaller output than gzip -6 on step output, and no slower
+    COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+    def __init__(self, app, min_size: int = None):
+        self.app = app
+        self.min_size = self.MIN_SIZE if min_size is None else min_size
+
+    def choose(self, accept_encoding: str):
+        """The coding to use ("br", "gzip") or None; brotli wins a tie when it is installed."""
+        accepted = accepted_encodings(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        candidates = (["br"] if brotli is not None else []) + ["gzip"]
+        best = max(candidates, key=lambda coding: accepted.get(coding, wildcard))
+        return best if accepted.get(best, wildcard) > 0 else None
+
+    def compress(self, coding: str, body: bytes) -> bytes:
+        if coding == "br":
+            return brotli.compress(body, quality=self.BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=self.GZIP_LEVEL)
+
+    def compressible(self, status: int, headers: Headers) -> bool:
+        return (status not in (204, 206, 304) and "content-encoding" not in headers
+                and "content-range" not in headers
+                and headers.get("content-type", "").startswith(self.COMPRESSIBLE_TYPES))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = self.choose(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough or start is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = Headers(raw=start["headers"])
+            if message.get("more_body", False) or len(body) < self.min_size or \
+                    not self.compressible(start["status"], headers):
+                # Streams are sent as they are produced; small and binary bodies are not worth it
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) > self.OFFLOAD_SIZE:
+                compressed = await run_in_threadpool(self.compress, coding, body)
+            else:
+                compressed = self.compress(coding, body)
+            response_headers = MutableHeaders(raw=start["headers"])
+            response_headers["Content-Encoding"] = coding
+            response_headers["Content-Length"] = str(len(compressed))
+            response_headers.add_vary_header("Accept-Encoding")
+            logger.debug("Compressed %d bytes to %d with %s", len(body), len(compressed), coding)
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,17 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from database import get_db
+from schemas import DurationStat
+from services.duration_stats import duration_stats
+
+router = APIRouter()
+
+
+@router.get("/slowest", response_model=List[DurationStat])
+def slowest(group_by: str = "task", metric: str = "p95", limit: int = 20, db: Session = Depends(get_db)):
+    if group_by not in ("task", "step"):
+        raise HTTPException(status_code=400, detail="group_by must be 'task' or 'step'")
+    if metric not in ("p50", "p95", "mean", "max"):
+        raise HTTPException(status_code=400, detail="metric must be one of p50, p95, mean, max")
+    return duration_stats.slowest(db, group_by=group_by, metric=metric, limit=min(max(limit, 1), 500))
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from auth import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token
+from database import get_db
+from schemas import TokenRequest, TokenResponse
+from services.user_service import UserService
+
+router = APIRouter()
+
+
+@router.post("/token", response_model=TokenResponse)
+async def issue_token(request: TokenRequest, db: Session = Depends(get_db)):
+    # bcrypt runs in the threadpool; the event loop keeps serving (cached) token checks meanwhile
+    user = await run_in_threadpool(UserService.authenticate, request.username, request.password, db)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Incorrect username or password",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return TokenResponse(access_token=create_access_token({"sub": user.username}),
+                         expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from database import get_db
+from schemas import BatchBuildRequest, BatchStatusResponse
+from services.batch_service import BatchBuildService
+
+router = APIRouter()
+batch_service = BatchBuildService()
+
+
+@router.post("/", response_model=BatchStatusResponse)
+def submit_batch(request: BatchBuildRequest, db: Session = Depends(get_db)):
+    result = batch_service.submit(request, db)
+    if not result.uuid:
+        raise HTTPException(status_code=400, detail=result.message)
+    return result
+
+
+@router.get("/{batch_id}", response_model=BatchStatusResponse)
+def get_batch_status(batch_id: str, db: Session = Depends(get_db)):
+    result = batch_service.status(batch_id, db)
+    if result.status == batch_service.FAILED_STATE and not result.builds:
+        raise HTTPException(status_code=404, detail=result.message)
+    return result
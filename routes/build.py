@@ -1,24 +1,116 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
-from schemas import BuildRequest, BuildResponse
+from schemas import BuildRequest, BuildResponse, ResumeRequest, MatrixBuildRequest, MatrixBuildResponse
+from services.admission import admission, AdmissionRejected
 from services.build_service import BuildService
+from services.log_pipeline import log_context
+from services.matrix_service import MatrixBuildService
+from services.notifier import notifier
+from services.plan_service import PlanService
+from services.step_stream import StepStream
 import logging
 
 router = APIRouter()
-build_service = BuildService()
 logger = logging.getLogger(__name__)
 
+# Services keep the request's folders on the instance, so every request gets its own instance:
+# builds run concurrently now that admission control lets several through.
+
 
 @router.post("/", response_model=BuildResponse)
 def trigger_build(request: BuildRequest, db: Session = Depends(get_db)):
     if not request.component:
         raise HTTPException(status_code=400, detail="Component name is required")
     try:
-        result = build_service.build(request.component, request.env_path, request.resource_path, request.task_path, db)
-        if not isinstance(result, BuildResponse):
-            raise HTTPException(status_code=500, detail="Invalid build response")
-        return result
+        notifier.validate(request.callbacks)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if request.stream:
+        return stream_build(request)
+    # Identical requests attach to the in-flight build before admission: only the build that runs takes a slot
+    service = PlanService() if request.plan_id else BuildService()
+    service.slot = admission.slot
+    try:
+        with log_context(debug=request.debug):
+            if request.plan_id:
+                result = service.build_plan(request.plan_id, request.component, db)
+            else:
+                result = service.build(request.component, request.env_path, request.resource_path,
+                                       request.task_path, db, selector=request.selector)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.exception("Unexpected error occurred during build: %s", str(e))
+        notifier.publish(request.callbacks, "build", BuildResponse(
+            component=request.component, status=BuildService.FAILED_STATE, message="Internal server error",
+            uuid="", results=[]))
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if not isinstance(result, BuildResponse):
+        raise HTTPException(status_code=500, detail="Invalid build response")
+    notifier.publish(request.callbacks, "build", result)
+    return result
+
+
+def stream_build(request: BuildRequest):
+    """The build as NDJSON step records and a summary; the slot is taken here so a full queue is still a 429."""
+    try:
+        admission.acquire()
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    def run(db, step_sink):
+        service = PlanService() if request.plan_id else BuildService()
+        service.step_sink = step_sink
+        try:
+            if request.plan_id:
+                result = service.build_plan(request.plan_id, request.component, db)
+            else:
+                result = service.build(request.component, request.env_path, request.resource_path,
+                                       request.task_path, db, selector=request.selector)
+        except Exception:
+            notifier.publish(request.callbacks, "build", BuildResponse(
+                component=request.component, status=BuildService.FAILED_STATE, message="Internal server error",
+                uuid="", results=[]))
+            raise
+        notifier.publish(request.callbacks, "build", result)
+        return result
+
+    return StepStream().start(run, debug=request.debug).response()
+
+
+@router.post("/resume", response_model=BuildResponse)
+def resume_build(request: ResumeRequest, db: Session = Depends(get_db)):
+    if not request.uuid:
+        raise HTTPException(status_code=400, detail="Build uuid is required")
+    try:
+        with admission.slot(), log_context(debug=request.debug):
+            result = BuildService().resume(request.uuid, request.env_path, request.resource_path,
+                                           request.task_path, db)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        logger.exception("Unexpected error occurred during build resume: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if not isinstance(result, BuildResponse):
+        raise HTTPException(status_code=500, detail="Invalid build response")
+    return result
+
+
+@router.post("/matrix", response_model=MatrixBuildResponse)
+def trigger_matrix_build(request: MatrixBuildRequest, db: Session = Depends(get_db)):
+    if not request.component:
+        raise HTTPException(status_code=400, detail="Component name is required")
+    if request.max_concurrency < 1:
+        raise HTTPException(status_code=400, detail="max_concurrency must be at least 1")
+    # Every child build takes an admission slot of its own while it runs; one not admitted in time fails alone
+    service = MatrixBuildService()
+    service.slot = admission.slot
+    try:
+        with log_context(debug=request.debug):
+            return service.matrix_build(request.component, request.environments, request.env_path,
+                                        request.resource_path, request.task_path, db,
+                                        max_concurrency=request.max_concurrency, selector=request.selector)
+    except Exception as e:
+        logger.exception("Unexpected error occurred during matrix build: %s", str(e))
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,14 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from schemas import ComponentsResponse
+from services.catalog_service import CatalogService
+
+router = APIRouter()
+
+
+@router.get("/", response_model=ComponentsResponse)
+def list_components(env_path: str, resource_path: str, task_path: str, component: Optional[str] = None):
+    result = CatalogService().components(env_path, resource_path, task_path, component=component)
+    if result.status == CatalogService.FAILED_STATE:
+        raise HTTPException(status_code=404, detail=result.message)
+    return result
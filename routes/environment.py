@@ -1,14 +1,27 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Response
 from schemas import EnvironmentResponse
 from services.environment_service import EnvironmentService
 
 router = APIRouter()
-service = EnvironmentService()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
 
 
 @router.get("/", response_model=EnvironmentResponse)
-def get_environment(component: str, env_path: str, resource_path: str, task_path: str):
-    result = service.get_environment(component, env_path, resource_path, task_path)
-    if "error" in result:
-        raise HTTPException(status_code=404, detail=result["error"])
+def get_environment(component: str, env_path: str, resource_path: str, task_path: str, response: Response,
+                    if_none_match: Optional[str] = Header(None)):
+    # A fresh service per request: it keeps the request's folders on the instance
+    result, etag = EnvironmentService().cached_environment(component, env_path, resource_path, task_path)
+    if etag is None:
+        raise HTTPException(status_code=404, detail=result.message)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
     return result
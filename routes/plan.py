@@ -0,0 +1,19 @@
+from fastapi import APIRouter, HTTPException
+from schemas import PlanRequest, PlanResponse
+from services.plan_service import PlanService
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.post("/", response_model=PlanResponse)
+def create_plan(request: PlanRequest):
+    if not request.component:
+        raise HTTPException(status_code=400, detail="Component name is required")
+    try:
+        return PlanService().plan(request.component, request.env_path, request.resource_path, request.task_path,
+                                  selector=request.selector)
+    except Exception as e:
+        logger.exception("Unexpected error occurred during planning: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
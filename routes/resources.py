@@ -1,32 +1,53 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_async_db, get_db
 from models import Resource
-from schemas import ResourceCreate, ResourceResponse
-from typing import List
+from schemas import ResourceBulkResponse, ResourceCreate, ResourcePage, ResourceResponse
+from services.resource_service import ResourceService
+from typing import Dict, List, Optional
 
 router = APIRouter()
 
 
-# Create a new resource
-@router.post("/", response_model=ResourceResponse)
-def create_resource(resource: ResourceCreate, db: Session = Depends(get_db)):
-    db_resource = db.query(Resource).filter(Resource.name == resource.name).first()
-    if db_resource:
-        raise HTTPException(status_code=400, detail="Resource name already exists")
+# Resources matching the filters, one keyset page at a time
+@router.get("/", response_model=ResourcePage)
+async def get_resources(application_name: Optional[str] = None, task_name: Optional[str] = None,
+                        resource: Optional[str] = None, environment: Optional[str] = None,
+                        account: Optional[str] = None, region: Optional[str] = None, status: Optional[str] = None,
+                        step_type: Optional[str] = None, limit: int = 100, after: Optional[int] = None,
+                        db: AsyncSession = Depends(get_async_db)):
+    filters = {"application_name": application_name, "task_name": task_name, "resource": resource,
+               "environment": environment, "account": account, "region": region, "status": status,
+               "step_type": step_type}
+    items, next_after = await db.run_sync(ResourceService.find, filters, limit, after)
+    return {"items": items, "next_after": next_after}
 
-    new_resource = Resource(name=resource.name, status=resource.status)
-    db.add(new_resource)
-    db.commit()
-    db.refresh(new_resource)
-    return new_resource
 
+# Resource counts grouped by comma separated columns, e.g. ?group_by=account,region
+@router.get("/summary", response_model=List[Dict])
+async def get_summary(group_by: str = "account,region", status: Optional[str] = ResourceService.DEPLOYED,
+                      db: AsyncSession = Depends(get_async_db)):
+    columns = [column.strip() for column in group_by.split(",") if column.strip()]
+    unknown = [column for column in columns if column not in ResourceService.SUMMARY_GROUPS]
+    if not columns or unknown:
+        raise HTTPException(status_code=400, detail=f"group_by must be a comma separated list of "
+                                                    f"{', '.join(ResourceService.SUMMARY_GROUPS)}")
+    return await db.run_sync(ResourceService.summary, columns, status or None)
 
-# Get all resources
-@router.get("/", response_model=List[ResourceResponse])
-def get_resources(db: Session = Depends(get_db)):
-    resources = db.query(Resource).all()
-    if not resources:
-        return []
 
-    return resources
+# Create or update a resource
+@router.post("/", response_model=ResourceResponse)
+def upsert_resource(resource: ResourceCreate, db: Session = Depends(get_db)):
+    ResourceService.upsert(db, [resource.model_dump()])
+    db.commit()
+    return db.query(Resource).filter(Resource.application_name == resource.application_name,
+                                     Resource.task_name == resource.task_name).one()
+
+
+# Create or update many resources in one statement
+@router.post("/bulk", response_model=ResourceBulkResponse)
+def upsert_resources(resources: List[ResourceCreate], db: Session = Depends(get_db)):
+    upserted = ResourceService.upsert(db, [resource.model_dump() for resource in resources])
+    db.commit()
+    return {"status": "success", "upserted": upserted}
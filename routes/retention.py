@@ -0,0 +1,50 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from database import get_async_db, get_db
+from models import BuildRollup, RetentionPolicy
+from schemas import BuildRollupResponse, RetentionPolicyRequest, RetentionPolicyResponse, RetentionReport
+from services.retention_service import RetentionService
+
+router = APIRouter()
+retention_service = RetentionService()
+
+
+@router.get("/policies", response_model=List[RetentionPolicyResponse])
+def list_policies(db: Session = Depends(get_db)):
+    return db.query(RetentionPolicy).order_by(RetentionPolicy.application_name).all()
+
+
+@router.put("/policies/{application_name}", response_model=RetentionPolicyResponse)
+def set_policy(application_name: str, request: RetentionPolicyRequest, db: Session = Depends(get_db)):
+    if request.keep_builds is not None and request.keep_builds < 1:
+        raise HTTPException(status_code=400, detail="keep_builds must be at least 1")
+    if request.keep_days is not None and request.keep_days < 0:
+        raise HTTPException(status_code=400, detail="keep_days must not be negative")
+    return retention_service.set_policy(application_name, request.keep_builds, request.keep_days, db)
+
+
+@router.delete("/policies/{application_name}")
+def delete_policy(application_name: str, db: Session = Depends(get_db)):
+    deleted = db.query(RetentionPolicy).filter(RetentionPolicy.application_name == application_name).delete()
+    db.commit()
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"No retention policy for '{application_name}'")
+    return {"message": f"Retention policy for '{application_name}' deleted"}
+
+
+@router.post("/run", response_model=RetentionReport)
+def run_retention(application_name: Optional[str] = None, db: Session = Depends(get_db)):
+    return retention_service.run(db, application_name=application_name)
+
+
+@router.get("/rollups", response_model=List[BuildRollupResponse])
+async def list_rollups(application_name: Optional[str] = None, limit: int = 100,
+                       db: AsyncSession = Depends(get_async_db)):
+    query = select(BuildRollup)
+    if application_name is not None:
+        query = query.where(BuildRollup.application_name == application_name)
+    query = query.order_by(BuildRollup.started_at.desc()).limit(min(max(limit, 1), 1000))
+    return (await db.execute(query)).scalars().all()
@@ -1,16 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+import re
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_async_db, get_db
+from responses import FastJSONResponse
 from schemas import StatusResponse  # Now this import will work
+from services.change_tracker import tracker
 from services.status_service import StatusService
 
 router = APIRouter()
 status_service = StatusService()
+MAX_WAIT_SECONDS = 60
+MAX_LOG_READ = 1024 * 1024  # bytes per log request
 
 
 @router.get("/", response_model=StatusResponse)
-def get_status(application_name: str, db: Session = Depends(get_db)):
-    result = status_service.get_status(application_name, db)
-    if "error" in result:
-        raise HTTPException(status_code=404, detail=result["error"])
-    return result
+async def get_status(application_name: str, wait_for_change: Optional[int] = None, timeout: float = 30,
+                     db: AsyncSession = Depends(get_async_db)):
+    if wait_for_change is not None:
+        # Held here without a thread or a database connection until the application changes or the timeout passes
+        await tracker.wait(application_name, wait_for_change, max(0.0, min(timeout, MAX_WAIT_SECONDS)))
+    # Step output makes this body large: it goes out as built, through orjson, without validating it again
+    payload = await status_service.status_payload_async(application_name, db)
+    if not payload["uuid"]:
+        raise HTTPException(status_code=404, detail=payload["message"])
+    return FastJSONResponse(payload)
+
+
+@router.get("/steps/{step_id}/log")
+def get_step_log(step_id: int, offset: int = 0, length: int = MAX_LOG_READ, range_header: Optional[str] = Header(None, alias="Range"),
+                 db: Session = Depends(get_db)):
+    """Full output of a step as text, read in ranges from offset/length or a "Range: bytes=start-end" header."""
+    ranged = range_header is not None
+    if ranged:
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", range_header.strip())
+        if not match:
+            raise HTTPException(status_code=416, detail="Only a single 'bytes=start-end' range is supported")
+        offset = int(match.group(1))
+        length = int(match.group(2)) - offset + 1 if match.group(2) else MAX_LOG_READ
+    if offset < 0 or length < 1:
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and length >= 1")
+    length = min(length, MAX_LOG_READ)
+    try:
+        result = status_service.read_step_log(step_id, db, offset, length)
+    except FileNotFoundError:
+        raise HTTPException(status_code=410, detail=f"Log of step {step_id} is no longer available")
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No step found with id {step_id}")
+    data, total = result
+    headers = {"X-Log-Size": str(total), "Accept-Ranges": "bytes"}
+    partial = offset > 0 or offset + len(data) < total
+    if partial and data:
+        headers["Content-Range"] = f"bytes {offset}-{offset + len(data) - 1}/{total}"
+    elif ranged and not data:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{total}"})
+    return Response(content=data, status_code=206 if partial and data else 200, media_type="text/plain; charset=utf-8",
+                    headers=headers)
@@ -2,16 +2,64 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from database import get_db
 from schemas import UnBuildRequest, UnBuildResponse
+from services.admission import admission, AdmissionRejected
+from services.log_pipeline import log_context
+from services.notifier import notifier
+from services.step_stream import StepStream
 from services.unbuild_service import UnbuildService
+import logging
 
 router = APIRouter()
-unbuild_service = UnbuildService()
+logger = logging.getLogger(__name__)
 
 
 @router.post("/", response_model=UnBuildResponse)
 def trigger_unbuild(request: UnBuildRequest, db: Session = Depends(get_db)):
     if not request.component:
         raise HTTPException(status_code=400, detail="Component name is required")
+    try:
+        notifier.validate(request.callbacks)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if request.stream:
+        return stream_unbuild(request)
 
-    result = unbuild_service.unbuild(request.component, request.task_path, request.db_flag, db)
+    try:
+        with admission.slot(), log_context(debug=request.debug):
+            # A fresh service per request: unbuild keeps the request's task folder on the instance
+            result = UnbuildService().unbuild(request.component, request.task_path, request.db_flag, db,
+                                              selector=request.selector)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        logger.exception("Unexpected error occurred during unbuild: %s", str(e))
+        notifier.publish(request.callbacks, "unbuild", UnBuildResponse(
+            component=request.component, status=UnbuildService.FAILED_STATE, message="Internal server error",
+            uuid="", results=[]))
+        raise HTTPException(status_code=500, detail="Internal server error")
+    notifier.publish(request.callbacks, "unbuild", result)
     return result
+
+
+def stream_unbuild(request: UnBuildRequest):
+    """The unbuild as NDJSON step records and a summary; the slot is taken here so a full queue is still a 429."""
+    try:
+        admission.acquire()
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    def run(db, step_sink):
+        service = UnbuildService()
+        service.step_sink = step_sink
+        try:
+            result = service.unbuild(request.component, request.task_path, request.db_flag, db,
+                                     selector=request.selector)
+        except Exception:
+            notifier.publish(request.callbacks, "unbuild", UnBuildResponse(
+                component=request.component, status=UnbuildService.FAILED_STATE, message="Internal server error",
+                uuid="", results=[]))
+            raise
+        notifier.publish(request.callbacks, "unbuild", result)
+        return result
+
+    return StepStream().start(run, debug=request.debug).response()
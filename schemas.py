@@ -1,21 +1,49 @@
 from pydantic import BaseModel
-from typing import Dict, List
+from datetime import datetime
+from typing import Dict, List, Optional
 
 
 class ResourceCreate(BaseModel):
-    name: str
-    status: str
+    application_name: str
+    task_name: str
+    resource: str
+    step_name: Optional[str] = None
+    step_type: Optional[str] = None
+    environment: Optional[str] = None
+    account: Optional[str] = None
+    region: Optional[str] = None
+    status: str = "deployed"  # deployed or destroyed
+    uuid: Optional[str] = None  # Build that last changed it
 
 
 class ResourceResponse(BaseModel):
     id: int
-    name: str
+    application_name: str
+    task_name: str
+    resource: str
+    step_name: Optional[str] = None
+    step_type: Optional[str] = None
+    environment: Optional[str] = None
+    account: Optional[str] = None
+    region: Optional[str] = None
     status: str
+    uuid: Optional[str] = None
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True  # Ensures compatibility with SQLAlchemy models
 
 
+class ResourcePage(BaseModel):
+    items: List[ResourceResponse]
+    next_after: Optional[int] = None  # Pass back as after for the next page, None on the last one
+
+
+class ResourceBulkResponse(BaseModel):
+    status: str
+    upserted: int
+
+
 class ResourceResult(BaseModel):
     resource: str
     status: str
@@ -29,12 +57,84 @@ class EnvironmentResponse(BaseModel):
     environment: Dict  # Contains all loaded env variables
 
 
+class ComponentInfo(BaseModel):
+    component: str
+    tasks: List[str]
+    groups: List[str]
+    resources: List[str]
+    environments: List[str]
+    files: List[str]  # Every file a build of the component reads
+    missing_files: List[str]
+
+
+class ComponentsResponse(BaseModel):
+    status: str
+    message: str
+    components: List[ComponentInfo]
+    environments: List[str]  # Global environment files found
+    resources: List[str]  # Resource folders found
+
+
+class TaskSelector(BaseModel):
+    groups: List[str] = []
+    tasks: List[str] = []
+    resources: List[str] = []
+    exclude_groups: List[str] = []
+    exclude_tasks: List[str] = []
+    exclude_resources: List[str] = []
+    upstream: bool = False  # Also select the tasks the selected ones depend on
+    downstream: bool = False  # Also select the tasks depending on the selected ones
+
+
+class CallbackTarget(BaseModel):
+    url: str  # http(s)://host/path or unix:///path/to/socket
+    secret: Optional[str] = None  # HMAC key for X-Builder-Signature, defaults to BUILDER_CALLBACK_SECRET
+
+
 class BuildRequest(BaseModel):
     component: str
     env_path: str
     resource_path: str
     task_path: str
     db_flag: bool = False
+    selector: Optional[TaskSelector] = None
+    plan_id: Optional[str] = None  # Build a validated plan instead of the current task file
+    callbacks: List[CallbackTarget] = []  # Notified when the build completes or fails
+    debug: bool = False  # Log this build at DEBUG whatever the server's log level
+    stream: bool = False  # Respond with NDJSON, one record per completed step and a summary
+
+
+class PlanRequest(BaseModel):
+    component: str
+    env_path: str
+    resource_path: str
+    task_path: str
+    selector: Optional[TaskSelector] = None
+
+
+class PlanStep(BaseModel):
+    task: str
+    step: str
+    resource: str
+    files: List[str]  # Rendered script first, then the cloud template if any
+    missing_variables: List[str] = []
+    error: Optional[str] = None
+
+
+class PlanResponse(BaseModel):
+    component: str
+    status: str
+    message: str
+    plan_id: str  # Empty when the plan has errors
+    steps: List[PlanStep]
+
+
+class ResumeRequest(BaseModel):
+    uuid: str  # uuid of the failed build to resume
+    env_path: str
+    resource_path: str
+    task_path: str
+    debug: bool = False
 
 
 class BuildResponse(BaseModel):
@@ -45,10 +145,73 @@ class BuildResponse(BaseModel):
     results: List[ResourceResult]
 
 
+class MatrixBuildRequest(BaseModel):
+    component: str
+    environments: List[str]
+    env_path: str
+    resource_path: str
+    task_path: str
+    max_concurrency: int = 4
+    selector: Optional[TaskSelector] = None
+    debug: bool = False
+
+
+class MatrixChildResult(BaseModel):
+    environment: str
+    application_name: str
+    uuid: str
+    status: str
+    message: str
+
+
+class MatrixBuildResponse(BaseModel):
+    component: str
+    status: str
+    message: str
+    uuid: str  # Parent uuid
+    builds: List[MatrixChildResult]
+
+
+class BatchComponent(BaseModel):
+    component: str
+    env_path: str
+    resource_path: str
+    task_path: str
+    priority: Optional[str] = None  # Overrides the batch priority
+    selector: Optional[TaskSelector] = None
+
+
+class BatchBuildRequest(BaseModel):
+    submitter: str = "anonymous"
+    priority: str = "normal"  # high, normal or low
+    max_concurrency: int = 4  # Builds of this batch running at the same time
+    components: List[BatchComponent]
+
+
+class BatchChildStatus(BaseModel):
+    component: str
+    uuid: str
+    status: str  # queued, started, success or error
+    message: str
+
+
+class BatchStatusResponse(BaseModel):
+    uuid: str
+    submitter: str
+    status: str
+    message: str
+    counts: Dict[str, int]  # Number of child builds per status
+    builds: List[BatchChildStatus]
+
+
 class UnBuildRequest(BaseModel):
     component: str
     task_path: str
     db_flag: bool = False
+    selector: Optional[TaskSelector] = None
+    callbacks: List[CallbackTarget] = []  # Notified when the unbuild completes or fails
+    debug: bool = False  # Log this unbuild at DEBUG whatever the server's log level
+    stream: bool = False  # Respond with NDJSON, one record per completed step and a summary
 
 
 class UnBuildResponse(BaseModel):
@@ -63,8 +226,12 @@ class StepResponse(BaseModel):
     id: int
     task_name: str
     step_name: str
-    status: Dict  # This contains the full result info as JSON
+    status: Dict  # Result info; long messages are truncated to their tail
     uuid: str
+    log_ref: Optional[str] = None  # Set when the full output is in the log store
+    log_size: Optional[int] = None
+    step_type: Optional[str] = None
+    duration: Optional[float] = None  # Seconds
 
     class Config:
         orm_mode = True
@@ -77,3 +244,67 @@ class StatusResponse(BaseModel):
     action: str
     message: str
     steps: List[StepResponse]
+    change_token: int = 0  # Pass as wait_for_change to wait for the next change
+    progress_percent: Optional[float] = None  # Running builds/unbuilds only
+    eta_seconds: Optional[float] = None  # None without duration history
+
+
+class RetentionPolicyRequest(BaseModel):
+    keep_builds: Optional[int] = None  # Newest builds to keep, None for no limit
+    keep_days: Optional[int] = None  # Days to keep builds, None for no limit
+
+
+class RetentionPolicyResponse(BaseModel):
+    application_name: str  # "*" is the default policy
+    keep_builds: Optional[int] = None
+    keep_days: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class RetentionReport(BaseModel):
+    status: str
+    message: str
+    archived_builds: int
+    deleted_steps: int
+    orphan_steps: int
+    archives: List[str]
+
+
+class BuildRollupResponse(BaseModel):
+    uuid: str
+    application_name: str
+    action: str
+    status: str
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    step_count: int
+    failed_steps: int
+    archive: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class DurationStat(BaseModel):
+    task_name: str
+    step_name: Optional[str] = None  # None when ranking tasks
+    step_type: Optional[str] = None
+    samples: int
+    p50: float  # Seconds
+    p95: float
+    mean: float
+    max: float
+
+
+class TokenRequest(BaseModel):
+    username: str
+    password: str
+
+
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int  # Seconds
@@ -0,0 +1,158 @@
+import os
+import math
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounds how many builds/unbuilds run on this host at once.
+
+    Up to MAX_RUNNING builds run; later requests wait in a FIFO queue of at most MAX_QUEUED entries for up
+    to QUEUE_TIMEOUT seconds and are rejected with a Retry-After hint after that or when the queue is full.
+    With ADAPTIVE enabled the running limit shrinks when the load average per CPU goes above
+    TARGET_LOAD_PER_CPU, and no new build starts while available memory is below MIN_FREE_MEMORY_MB.
+
+    Running and queued requests each hold one of the THREADPOOL_SIZE worker threads sync endpoints run on, so
+    MAX_RUNNING and MAX_QUEUED are capped to leave THREADPOOL_RESERVE of them to the other requests.
+    """
+    MAX_RUNNING = int(os.environ.get("BUILDER_MAX_RUNNING_BUILDS", 8))
+    MAX_QUEUED = int(os.environ.get("BUILDER_MAX_QUEUED_BUILDS", 24))
+    THREADPOOL_SIZE = int(os.environ.get("BUILDER_THREADPOOL_SIZE", 40))  # Applied to anyio's limiter by main.py
+    THREADPOOL_RESERVE = 8
+    QUEUE_TIMEOUT = float(os.environ.get("BUILDER_QUEUE_TIMEOUT", 30))
+    ADAPTIVE = os.environ.get("BUILDER_ADAPTIVE_ADMISSION", "true").lower() == "true"
+    TARGET_LOAD_PER_CPU = 1.5
+    MIN_FREE_MEMORY_MB = 256
+    SAMPLE_INTERVAL = 1.0  # seconds between host load samples
+    DEFAULT_BUILD_SECONDS = 60.0  # initial estimate used for Retry-After
+
+    def __init__(self, max_running: int = None, max_queued: int = None, queue_timeout: float = None,
+                 adaptive: bool = None, threadpool_size: float = None):
+        threadpool_size = self.THREADPOOL_SIZE if threadpool_size is None else threadpool_size
+        threads = threadpool_size - self.THREADPOOL_RESERVE
+        max_running = max_running or self.MAX_RUNNING
+        max_queued = self.MAX_QUEUED if max_queued is None else max_queued
+        self.max_running = max(1, min(max_running, threads))
+        self.max_queued = max(0, min(max_queued, threads - self.max_running))
+        if (self.max_running, self.max_queued) != (max_running, max_queued):
+            logger.warning("Admission capped to %d running and %d queued build(s) to leave %d of %s worker threads "
+                           "free", self.max_running, self.max_queued, self.THREADPOOL_RESERVE, threadpool_size)
+        self.queue_timeout = self.QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        self.adaptive = self.ADAPTIVE if adaptive is None else adaptive
+        self._cond = threading.Condition()
+        self._running = 0
+        self._queue = deque()
+        self._tickets = 0
+        self._avg_duration = self.DEFAULT_BUILD_SECONDS
+        self._limit = self.max_running
+        self._sampled = 0.0
+
+    @staticmethod
+    def host_load_per_cpu():
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1)
+        except (AttributeError, OSError):
+            return None
+
+    @staticmethod
+    def host_free_memory_mb():
+        try:
+            with open("/proc/meminfo") as meminfo:
+                for line in meminfo:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        return None
+
+    def limit(self) -> int:
+        """Current running limit; must be called with self._cond held."""
+        now = time.monotonic()
+        if not self.adaptive or now - self._sampled < self.SAMPLE_INTERVAL:
+            return self._limit
+        self._sampled = now
+
+        limit = self.max_running
+        load = self.host_load_per_cpu()
+        if load is not None and load > self.TARGET_LOAD_PER_CPU:
+            limit = max(1, int(self.max_running * self.TARGET_LOAD_PER_CPU / load))
+        free_memory = self.host_free_memory_mb()
+        if free_memory is not None and free_memory < self.MIN_FREE_MEMORY_MB:
+            # Let running builds finish, but start nothing new
+            limit = min(limit, self._running)
+        if limit != self._limit:
+            logger.warning("Admission limit changed from %d to %d (load/cpu: %s, free memory MB: %s)",
+                           self._limit, limit, load, free_memory)
+        self._limit = limit
+        return limit
+
+    def retry_after(self) -> int:
+        # Rough time until a queue slot frees up: queued work spread over the running slots
+        return max(1, math.ceil(self._avg_duration * (len(self._queue) + 1) / max(self._limit, 1)))
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"running": self._running, "queued": len(self._queue), "limit": self._limit}
+
+    def acquire(self, timeout: float = None) -> None:
+        """
+        Takes a build slot, waiting in line if needed. timeout overrides QUEUE_TIMEOUT; pass
+        float("inf") to wait as long as it takes. Raises AdmissionRejected when the request cannot be admitted.
+        """
+        timeout = self.queue_timeout if timeout is None else timeout
+        with self._cond:
+            if not self._queue and self._running < self.limit():
+                self._running += 1
+                return
+            if len(self._queue) >= self.max_queued:
+                logger.warning("Admission queue full (%d running, %d queued)", self._running, len(self._queue))
+                raise AdmissionRejected("Too many builds queued, try again later", self.retry_after())
+
+            self._tickets += 1
+            ticket = self._tickets
+            self._queue.append(ticket)
+            deadline = time.monotonic() + timeout
+            try:
+                while not (self._queue[0] == ticket and self._running < self.limit()):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        logger.warning("Build waited %.0fs for admission and was rejected", timeout)
+                        raise AdmissionRejected("Timed out waiting for a build slot, try again later",
+                                                self.retry_after())
+                    # Wake up at least every sample interval so the adaptive limit is re-evaluated
+                    self._cond.wait(min(remaining, self.SAMPLE_INTERVAL))
+                self._running += 1
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+
+    def release(self, duration: float = None) -> None:
+        with self._cond:
+            self._running -= 1
+            if duration is not None:
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, timeout: float = None):
+        self.acquire(timeout)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+
+admission = AdmissionController()
@@ -1,16 +1,23 @@
 import os
-import subprocess
-import yaml
+import json
+import time
+import hashlib
 import logging
-from jinja2 import Environment, FileSystemLoader
-from models import Step, Application
+from models import Step, Application, BuildRollup
 from datetime import datetime
+from services.file_cache import yaml_cache
+from services.log_store import log_store
+from services.rate_governor import governor
+from services.resource_service import ResourceService
+from services.step_executor import step_executor
 
 logger = logging.getLogger(__name__)
 
 
 class BaseService:
     USE_DB = False
+    application_name = None  # Component (or matrix child) being built/unbuilt, for the resource inventory
+    step_sink = None  # Called with each step result as it completes when the response is streamed
 
     TASKS_FOLDER = "tasks"
     RESOURCES_FOLDER = "resources"
@@ -29,6 +36,9 @@ class BaseService:
     DESTROY_CFN_SCRIPT = "destroy_cfn.sh"
     DESTROY_TERRAFORM_SCRIPT = "destroy_terraform.sh"
     CUSTOM_DESTROY_SCRIPT = "destroy.sh"
+    # Step types that call the AWS APIs heavily; a step can opt in/out with "throttled: true/false"
+    THROTTLED_STEP_TYPES = {"cloudformation", "terraform", "custom-cloudformation", "custom-terraform"}
+    THROTTLE_MAX_RETRIES = 4
 
     @staticmethod
     def flatten_list(nested_list):
@@ -40,20 +50,121 @@ class BaseService:
                 flat_list.append(element)
         return flat_list
 
+    def keep_result(self, results: list, result, task: dict, step_name: str) -> None:
+        """
+        Adds a step result to results. With a step_sink the result goes to the sink, tagged with its task and step,
+        and only a copy without the output is kept, so a streamed run holds no step output however long it is.
+        """
+        if self.step_sink is None or not isinstance(result, dict):
+            results.append(result)
+            return
+        self.step_sink(dict(result, task_name=task.get("name"), step_name=step_name))
+        results.append(dict(result, message=""))
+
+    @staticmethod
+    def fingerprint(*parts) -> str:
+        """Stable sha256 over JSON serialisable parts (dict key order does not matter)."""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def file_fingerprint(file_path):
+        expanded_path = os.path.expanduser(file_path)
+        if not os.path.exists(expanded_path):
+            return None
+        with open(expanded_path, "rb") as file:
+            return hashlib.sha256(file.read()).hexdigest()
+
+    def configure_folders(self, env_path: str, resource_path: str, task_path: str) -> None:
+        # Validate input paths
+        if not self.ENVIRONMENTS_FOLDER or not self.RESOURCES_FOLDER or not self.TASKS_FOLDER:
+            raise ValueError("Service folders (ENVIRONMENTS_FOLDER, RESOURCES_FOLDER, TASKS_FOLDER) must be initialized.")
+
+        # If any of the paths are empty, default to current working directory
+        if not env_path:
+            env_path = os.getcwd()
+        if not resource_path:
+            resource_path = os.getcwd()
+        if not task_path:
+            task_path = os.getcwd()
+
+        # Prepend the new paths to the existing paths
+        self.ENVIRONMENTS_FOLDER = os.path.expanduser(os.path.join(env_path, BaseService.ENVIRONMENTS_FOLDER))
+        self.RESOURCES_FOLDER = os.path.expanduser(os.path.join(resource_path, BaseService.RESOURCES_FOLDER))
+        self.TASKS_FOLDER = os.path.expanduser(os.path.join(task_path, BaseService.TASKS_FOLDER))
+
+        logger.debug("Environments folder set to: %s", self.ENVIRONMENTS_FOLDER)
+        logger.debug("Resources folder set to: %s", self.RESOURCES_FOLDER)
+        logger.debug("Tasks folder set to: %s", self.TASKS_FOLDER)
+
+    @staticmethod
+    def task_dependencies(tasks: list) -> dict:
+        """
+        Returns {task name: [names of the tasks it depends on]}.
+        Tasks can declare "depends_on"; when none does, the file order is the dependency chain.
+        """
+        names = [task.get("name") for task in tasks]
+        if any("depends_on" in task for task in tasks):
+            return {task.get("name"): list(task.get("depends_on") or []) for task in tasks}
+        return {name: names[index - 1:index] for index, name in enumerate(names)}
+
+    @staticmethod
+    def select_tasks(tasks: list, selector) -> list:
+        """
+        Returns the tasks chosen by a TaskSelector, in task file order.
+        Includes (group, task name, resource) are OR-ed and default to every task; upstream/downstream
+        tasks are pulled in next, and excludes are applied last so they always win.
+        """
+        if not selector:
+            return tasks
+
+        def included(task):
+            return (task.get("group") in selector.groups or task.get("name") in selector.tasks
+                    or task.get("resource") in selector.resources)
+
+        def excluded(task):
+            return (task.get("group") in selector.exclude_groups or task.get("name") in selector.exclude_tasks
+                    or task.get("resource") in selector.exclude_resources)
+
+        if selector.groups or selector.tasks or selector.resources:
+            chosen = {task.get("name") for task in tasks if included(task)}
+        else:
+            chosen = {task.get("name") for task in tasks}
+
+        upstream = BaseService.task_dependencies(tasks)
+        downstream = {}
+        for name, dependencies in upstream.items():
+            for dependency in dependencies:
+                downstream.setdefault(dependency, []).append(name)
+
+        for enabled, graph in ((selector.upstream, upstream), (selector.downstream, downstream)):
+            if not enabled:
+                continue
+            pending = list(chosen)
+            while pending:
+                for neighbour in graph.get(pending.pop(), []):
+                    if neighbour not in chosen:
+                        chosen.add(neighbour)
+                        pending.append(neighbour)
+
+        selected = [task for task in tasks if task.get("name") in chosen and not excluded(task)]
+        logger.debug("Selected tasks: %s", [task.get("name") for task in selected])
+        return selected
+
     @staticmethod
     def load_yaml(file_path):
         # Expand ~ to the full home directory path
         expanded_path = os.path.expanduser(file_path)
         logger.debug("Loading YAML file: %s", expanded_path)
         if os.path.exists(expanded_path):
-            with open(expanded_path, "r") as file:
-                try:
-                    data = yaml.safe_load(file)
-                    logger.debug("YAML file %s loaded successfully.", expanded_path)
-                    return data
-                except Exception as e:
-                    logger.error("Error parsing YAML file %s: %s", expanded_path, e)
-                    return {}
+            try:
+                # Parsed files are cached until the file changes on disk
+                data = yaml_cache.load(expanded_path)
+                logger.debug("YAML file %s loaded successfully.", expanded_path)
+                return data
+            except Exception as e:
+                logger.error("Error parsing YAML file %s: %s", expanded_path, e)
+                return {}
         else:
             logger.warning("YAML file %s does not exist.", expanded_path)
         return {}
@@ -92,6 +203,8 @@ class BaseService:
 
     @staticmethod
     def render_template(template_path, context):
+        from jinja2 import Environment, FileSystemLoader
+
         logger.debug("Rendering template: %s with context: %s", template_path, context)
         env = Environment(loader=FileSystemLoader(os.path.dirname(template_path)))
         template = env.get_template(os.path.basename(template_path))
@@ -104,13 +217,14 @@ class BaseService:
         logger.debug("Calling subprocess for resource: %s with script: %s", resource_name, script_path)
         if os.path.exists(script_path):
             try:
-                process = subprocess.run(["bash", script_path], capture_output=True, text=True)
+                # Runs the script, or records or replays it (BUILDER_EXECUTION)
+                process = step_executor.run(resource_name, script_path)
                 if process.returncode == 0:
                     results = {"resource": resource_name, "status": "success", "message": process.stdout}
-                    logger.debug("Subprocess for resource %s succeeded: %s result: %s", resource_name, process.stdout, results)
+                    logger.debug("Subprocess for resource %s succeeded: %s", resource_name, process.stdout)
                 else:
                     results = {"resource": resource_name, "status": "error", "message": process.stderr}
-                    logger.error("Subprocess for resource %s failed: %s result: %s", resource_name, process.stderr, results)
+                    logger.error("Subprocess for resource %s failed: %s", resource_name, process.stderr)
 
             except Exception as e:
                 results = {"resource": resource_name, "status": "error", "message": str(e)}
@@ -122,18 +236,89 @@ class BaseService:
             results["uuid"] = build_id
         return results
 
+    def run_script(self, resource_name: str, script_path: str, build_id: str, step: dict, envs: dict, task: dict = None) -> dict:
+        """
+        Run a rendered step script. Throttling sensitive steps are paced by the shared rate governor
+        (keyed by account and region) and retried with jittered backoff when AWS throttles them.
+        """
+        throttled = step.get("throttled", step.get("type") in self.THROTTLED_STEP_TYPES)
+        if str(throttled).lower() not in ("true", "yes", "1"):
+            return self.call_subprocess(resource_name, script_path, build_id)
+
+        key = governor.key_for((task or {}).get("account"), envs.get("aws_region"))
+        attempt = 0
+        while True:
+            governor.acquire(key)
+            result = self.call_subprocess(resource_name, script_path, build_id)
+            if not governor.is_throttled(result.get("message")):
+                governor.on_success(key)
+                return result
+
+            governor.on_throttle(key)
+            if result.get("status") == self.SUCCESS_STATE or attempt >= self.THROTTLE_MAX_RETRIES:
+                return result
+            attempt += 1
+            delay = governor.backoff(attempt)
+            logger.warning("Step for resource %s was throttled, retry %d/%d in %.1fs",
+                           resource_name, attempt, self.THROTTLE_MAX_RETRIES, delay)
+            time.sleep(delay)
+
     @staticmethod
-    def update_status(task_name, step_name, result, db, build_uuid):
+    def plan_steps(tasks: list, action: str = "build") -> list:
+        """
+        Steps a run of the tasks will record, in order, as {"task", "step", "type"} matching the Step columns.
+        Unbuilds record every step of an infrastructure task as "destroy".
+        """
+        planned = []
+        for task in tasks:
+            if action == "unbuild" and task.get("type") != "infrastructure":
+                continue
+            for step in task.get("steps", []):
+                planned.append({"task": task.get("resource"),
+                                "step": "destroy" if action == "unbuild" else step.get("name"),
+                                "type": step.get("type")})
+        return planned
+
+    def inventory_row(self, task: dict, step: dict, envs: dict, build_id: str, status: str):
+        """Inventory row (see ResourceService) a successful step leaves behind, or None outside a build/unbuild."""
+        if not self.application_name or not task or not task.get("name") or not task.get("resource"):
+            return None
+        return {
+            "application_name": self.application_name,
+            "task_name": task.get("name"),
+            "resource": task.get("resource"),
+            "step_name": step.get("name"),
+            "step_type": step.get("type"),
+            "environment": task.get("environment"),
+            "account": task.get("account"),
+            "region": (envs or {}).get("aws_region"),
+            "status": status,
+            "uuid": build_id
+        }
+
+    @staticmethod
+    def update_status(task_name, step_name, result, db, build_uuid, input_hash=None, step_type=None, duration=None,
+                      inventory=None):
         logger.debug("Updating status for task: %s, step: %s", task_name, step_name)
+        # Long outputs go to the log store; the row keeps a tail and the reference
+        row_result, log_ref, log_size = log_store.offload(result)
         step_info = Step(
             task_name=task_name,
             step_name=step_name,
-            status=result,
+            status=row_result,
             uuid=build_uuid,
+            input_hash=input_hash,
+            log_ref=log_ref,
+            log_size=log_size,
+            step_type=step_type,
+            duration=duration,
             timestamp=datetime.now()
         )
         db.add(step_info)
         try:
+            # The inventory changes with the step that caused it, in the same transaction
+            if inventory and result.get("status") == BaseService.SUCCESS_STATE:
+                ResourceService.upsert(db, [inventory])
             db.commit()
             logger.debug("Status updated successfully for step: %s", step_name)
         except Exception as e:
@@ -160,12 +345,35 @@ class BaseService:
             logger.warning("No application record found with build_id: %s", build_id)
         return None
 
+    @staticmethod
+    def rollup_build(app_record, steps, archive: str = None) -> BuildRollup:
+        """Compact summary of a build record and its steps (anything with .status and .timestamp)."""
+        timestamps = [step.timestamp for step in steps if step.timestamp]
+        finished = max(timestamps) if timestamps else None
+        started = app_record.timestamp
+        failed = sum(1 for step in steps if (step.status or {}).get("status") == BaseService.FAILED_STATE)
+        return BuildRollup(
+            uuid=app_record.uuid,
+            application_name=app_record.application_name,
+            action=app_record.action,
+            status=app_record.status,
+            started_at=started,
+            finished_at=finished,
+            duration_seconds=(finished - started).total_seconds() if started and finished else None,
+            step_count=len(steps),
+            failed_steps=failed,
+            archive=archive
+        )
+
     @staticmethod
     def delete_application_record(db, build_id):
         logger.debug("Deleting application record with build_id: %s", build_id)
         app_record = db.query(Application).filter(Application.uuid == build_id).first()
         if app_record:
             try:
+                # Summarise the record before it goes; retention archives the steps left behind
+                steps = db.query(Step).filter(Step.uuid == build_id).all()
+                db.merge(BaseService.rollup_build(app_record, steps))
                 db.delete(app_record)
                 db.commit()
                 logger.debug("Application record with build_id %s deleted.", build_id)
@@ -176,6 +384,9 @@ class BaseService:
     def load_config(self, task: dict) -> dict:
         resource_name = task.get("resource")
         environment_name = task.get("environment")
+        if not resource_name or not environment_name:
+            logger.warning("Task '%s' has no resource or environment, no config to load.", task.get("name"))
+            return {}
         global_env_path = os.path.join(self.ENVIRONMENTS_FOLDER, f"{environment_name}.yml")
         component_env_path = os.path.join(self.ENVIRONMENTS_FOLDER, resource_name, f"{environment_name}.yml")
 
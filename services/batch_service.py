@@ -0,0 +1,255 @@
+import time
+import uuid
+import logging
+import itertools
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Application
+from schemas import BatchBuildRequest, BatchStatusResponse, BatchChildStatus
+from services.admission import admission
+from services.base_service import BaseService
+from services.build_service import BuildService
+
+logger = logging.getLogger(__name__)
+
+QUEUED_STATE = "queued"
+STARTED_STATE = "started"
+
+
+class BatchJob:
+    def __init__(self, batch_id: str, submitter: str, priority: int, request, seq: int, runner, on_complete):
+        self.batch_id = batch_id
+        self.submitter = submitter
+        self.priority = priority
+        self.request = request  # BatchComponent
+        self.seq = seq
+        self.runner = runner
+        self.on_complete = on_complete
+        self.enqueued = time.monotonic()
+        self.state = QUEUED_STATE
+        self.uuid = ""
+        self.message = ""
+
+
+class BatchScheduler:
+    """
+    Shared worker pool running the child builds of every batch.
+
+    The next job is the one with the best priority class (aged, so queued low priority work still progresses),
+    then the one whose submitter has the fewest running builds (fair share), then the oldest. A batch never
+    runs more than its own max_concurrency jobs and the pool never runs more than max_workers jobs.
+    """
+    PRIORITY_CLASSES = {"high": 0, "normal": 1, "low": 2}
+    MAX_WORKERS = 8
+    PRIORITY_AGING_SECONDS = 300  # A waiting job moves up one priority class every 5 minutes
+    KEEP_FINISHED_BATCHES = 100
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self._cond = threading.Condition()
+        self._pending = []
+        self._batches = OrderedDict()  # batch_id -> [jobs]
+        self._limits = {}
+        self._running_batch = defaultdict(int)
+        self._running_submitter = defaultdict(int)
+        self._counter = itertools.count()
+        self._workers = []
+
+    def submit(self, batch_id: str, submitter: str, priority: str, max_concurrency: int, components: list,
+               runner, on_complete=None) -> list:
+        """
+        Queues one job per component. runner(job) executes a job and sets its state, uuid and message;
+        on_complete(batch_id, jobs) is called once every job of the batch has finished.
+        """
+        with self._cond:
+            jobs = [
+                BatchJob(batch_id, submitter, self.PRIORITY_CLASSES[component.priority or priority], component,
+                         next(self._counter), runner, on_complete)
+                for component in components
+            ]
+            self._batches[batch_id] = jobs
+            self._limits[batch_id] = max_concurrency
+            self._pending.extend(jobs)
+            self._start_workers()
+            self._cond.notify_all()
+        return jobs
+
+    def jobs(self, batch_id: str) -> list:
+        with self._cond:
+            return list(self._batches.get(batch_id, []))
+
+    def _start_workers(self):
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, name=f"batch-{len(self._workers)}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _rank(self, job: BatchJob, now: float) -> tuple:
+        priority = max(0, job.priority - int((now - job.enqueued) / self.PRIORITY_AGING_SECONDS))
+        return priority, self._running_submitter[job.submitter], job.seq
+
+    def _next_job(self):
+        # Must be called with self._cond held
+        now = time.monotonic()
+        eligible = [job for job in self._pending if self._running_batch[job.batch_id] < self._limits[job.batch_id]]
+        if not eligible:
+            return None
+        job = min(eligible, key=lambda candidate: self._rank(candidate, now))
+        self._pending.remove(job)
+        job.state = STARTED_STATE
+        self._running_batch[job.batch_id] += 1
+        self._running_submitter[job.submitter] += 1
+        return job
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+
+            try:
+                job.runner(job)
+            except Exception as e:
+                logger.exception("Batch '%s' job for '%s' failed", job.batch_id, job.request.component)
+                job.state = BaseService.FAILED_STATE
+                job.message = str(e)
+
+            with self._cond:
+                self._running_batch[job.batch_id] -= 1
+                self._running_submitter[job.submitter] -= 1
+                jobs = self._batches.get(job.batch_id, [])
+                finished = all(j.state not in (QUEUED_STATE, STARTED_STATE) for j in jobs)
+                if finished:
+                    self._limits.pop(job.batch_id, None)
+                    self._running_batch.pop(job.batch_id, None)
+                    # Keep a bounded number of finished batches in memory; older ones are served from the database
+                    done = [batch_id for batch_id in self._batches if batch_id not in self._limits]
+                    for batch_id in done[:max(0, len(done) - self.KEEP_FINISHED_BATCHES)]:
+                        del self._batches[batch_id]
+                self._cond.notify_all()
+
+            if finished and job.on_complete:
+                try:
+                    job.on_complete(job.batch_id, jobs)
+                except Exception:
+                    logger.exception("Completion callback failed for batch '%s'", job.batch_id)
+
+
+scheduler = BatchScheduler()
+
+
+class BatchBuildService(BaseService):
+    BATCH_ACTION = "batch"
+
+    def __init__(self, session_factory=None, batch_scheduler: BatchScheduler = None):
+        # Child builds run on scheduler threads and need their own sessions
+        self.session_factory = session_factory or SessionLocal
+        self.scheduler = batch_scheduler or scheduler
+
+    @staticmethod
+    def batch_name(submitter: str) -> str:
+        return f"batch:{submitter}"
+
+    def run_job(self, job: BatchJob) -> None:
+        request = job.request
+        db = self.session_factory()
+        try:
+            # Batch builds count against the host's admission limit too, but wait instead of being rejected
+            service = BuildService()
+            service.slot = lambda: admission.slot(timeout=float("inf"))
+            logger.info("Batch '%s' building component '%s'", job.batch_id, request.component)
+            response = service.build(request.component, request.env_path, request.resource_path,
+                                     request.task_path, db, selector=request.selector, parent_uuid=job.batch_id)
+            job.uuid = response.uuid
+            job.message = response.message
+            job.state = response.status
+        finally:
+            db.close()
+
+    def complete_batch(self, batch_id: str, jobs: list) -> None:
+        overall_error = any(job.state != BaseService.SUCCESS_STATE for job in jobs)
+        status = BaseService.FAILED_STATE if overall_error else BaseService.SUCCESS_STATE
+        logger.info("Batch '%s' completed with status: %s", batch_id, status)
+        db = self.session_factory()
+        try:
+            self.update_application_record(db, batch_id, status=status)
+        finally:
+            db.close()
+
+    def submit(self, request: BatchBuildRequest, db: Session) -> BatchStatusResponse:
+        def rejected(message):
+            logger.error("Batch from '%s' rejected: %s", request.submitter, message)
+            return BatchStatusResponse(uuid="", submitter=request.submitter, status=BaseService.FAILED_STATE,
+                                       message=message, counts={}, builds=[])
+
+        components = [component.component for component in request.components]
+        if not components:
+            return rejected("At least one component is required")
+        if len(set(components)) != len(components):
+            return rejected("Components of a batch must be unique")
+        if request.max_concurrency < 1:
+            return rejected("max_concurrency must be at least 1")
+        priorities = {request.priority} | {c.priority for c in request.components if c.priority}
+        unknown = priorities - set(BatchScheduler.PRIORITY_CLASSES)
+        if unknown:
+            return rejected(f"Unknown priority class(es): {', '.join(sorted(unknown))}")
+
+        batch_id = str(uuid.uuid4())
+        db.add(Application(
+            uuid=batch_id,
+            application_name=self.batch_name(request.submitter),
+            action=self.BATCH_ACTION,
+            status=STARTED_STATE,
+            tasks_built=components
+        ))
+        db.commit()
+        logger.info("Batch '%s' from '%s' queued %d component(s) with priority '%s'",
+                    batch_id, request.submitter, len(components), request.priority)
+
+        self.scheduler.submit(batch_id, request.submitter, request.priority, request.max_concurrency,
+                              request.components, self.run_job, self.complete_batch)
+        return self.status(batch_id, db)
+
+    def status(self, batch_id: str, db: Session) -> BatchStatusResponse:
+        batch_record = db.query(Application).filter(
+            Application.uuid == batch_id,
+            Application.action == self.BATCH_ACTION
+        ).first()
+        if not batch_record:
+            logger.error("No batch found with uuid: %s", batch_id)
+            return BatchStatusResponse(uuid=batch_id, submitter="", status=BaseService.FAILED_STATE,
+                                       message=f"No batch found with uuid {batch_id}", counts={}, builds=[])
+
+        jobs = self.scheduler.jobs(batch_id)
+        if jobs:
+            builds = [BatchChildStatus(component=job.request.component, uuid=job.uuid, status=job.state,
+                                       message=job.message) for job in jobs]
+        else:
+            # Not (or no longer) known to the scheduler: rebuild the picture from the child build records
+            children = {child.application_name: child for child in db.query(Application).filter(
+                Application.parent_uuid == batch_id
+            ).all()}
+            builds = []
+            for component in batch_record.tasks_built or []:
+                child = children.get(component)
+                if child:
+                    builds.append(BatchChildStatus(component=component, uuid=str(child.uuid),
+                                                   status=str(child.status), message=str(child.status)))
+                else:
+                    builds.append(BatchChildStatus(component=component, uuid="", status=BaseService.FAILED_STATE,
+                                                   message="No build record found"))
+
+        counts = dict(Counter(build.status for build in builds))
+        done = sum(count for state, count in counts.items() if state not in (QUEUED_STATE, STARTED_STATE))
+        return BatchStatusResponse(
+            uuid=batch_id,
+            submitter=batch_record.application_name[len(self.batch_name("")):],
+            status=str(batch_record.status),
+            message=f"{done}/{len(builds)} build(s) finished",
+            counts=counts,
+            builds=builds
+        )
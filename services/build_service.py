@@ -1,18 +1,30 @@
 import os
+import time
 import uuid
 import logging
+import threading
+from datetime import datetime
 from sqlalchemy.orm import Session
 from services.base_service import BaseService
-from models import Application
-from schemas import BuildResponse
+from services.log_pipeline import log_context
+from services.resource_service import ResourceService
+from services.single_flight import SingleFlight
+from models import Application, Step
+from schemas import BuildResponse, TaskSelector
 
 logger = logging.getLogger(__name__)
 
 
 class BuildService(BaseService):
-
-    def run_step(self, resource_name: str, step: dict, envs: dict, db: Session, build_id: str) -> dict:
-        logger.debug("Running step for resource: %s", resource_name)
+    # Identical build requests running at the same time share one build, across all instances
+    in_flight_builds = SingleFlight()
+    locker_lock = threading.Lock()
+    # Context manager factory (e.g. admission.slot) only the leader of a flight builds in; callers attaching to an
+    # in-flight build wait for its result without taking a slot
+    slot = None
+
+    def resolve_step_paths(self, resource_name: str, step: dict) -> tuple:
+        """Returns (resource_path, action_script_path, action_rendered_script_path, action_template) for a step."""
         action_type = step.get("type")
         resource_path = os.path.expanduser(os.path.join(self.RESOURCES_FOLDER, resource_name))
 
@@ -49,14 +61,21 @@ class BuildService(BaseService):
 
         logger.debug(f"Determined script_template_path: '{action_script_path}'")
         logger.debug(f"Determined rendered_script_path: '{action_rendered_script_path}'")
+        return resource_path, action_script_path, action_rendered_script_path, action_template
+
+    def render_step(self, resource_name: str, step: dict, envs: dict) -> dict:
+        """
+        Renders the action script and cloud template of a step in memory, without touching the resource folder.
+        Returns an ordered dict of {rendered_path: content}; the first entry is the action script.
+        """
+        action_type = step.get("type")
+        resource_path, action_script_path, action_rendered_script_path, action_template = self.resolve_step_paths(resource_name, step)
+        rendered = {}
 
         try:
             logger.debug(f"Loading action_script_path: '{action_script_path}'")
             if os.path.exists(action_script_path):
-                rendered_script = self.render_template(action_script_path, envs)
-                with open(action_rendered_script_path, "w") as f:
-                    f.write(rendered_script)
-                os.chmod(action_rendered_script_path, 0o755)
+                rendered[action_rendered_script_path] = self.render_template(action_script_path, envs)
             else:
                 logger.error("Template path '%s' does not exist after writing for step '%s'.", action_script_path,
                              step.get("action_script"))
@@ -71,18 +90,47 @@ class BuildService(BaseService):
                 resource_config = step.get("action_config")
                 logger.debug("use_template: %s", use_template)
                 if action_template:
-                    self.render_cloud_template(use_template, action_type, resource_type, resource_config, resource_path, action_template, envs)
+                    rendered_template_path, rendered_template = self.render_cloud_template_content(
+                        use_template, action_type, resource_type, resource_config, resource_path, action_template, envs)
+                    rendered[rendered_template_path] = rendered_template
 
         except Exception as e:
             logger.error("Template rendering failed for resource '%s': %s", resource_name, str(e))
             raise RuntimeError(f"Template rendering failed for {resource_name}: {str(e)}") from e
 
+        return rendered
+
+    def rendered_fingerprint(self, rendered: dict) -> str:
+        # Key by file name so the same inputs rendered under another checkout path still match
+        return self.fingerprint({os.path.basename(path): content for path, content in rendered.items()})
+
+    @staticmethod
+    def write_rendered_files(rendered: dict) -> None:
+        for index, (path, content) in enumerate(rendered.items()):
+            with open(path, "w") as f:
+                f.write(content)
+            if index == 0:
+                os.chmod(path, 0o755)
+
+    def run_step(self, resource_name: str, step: dict, envs: dict, db: Session, build_id: str, task: dict = None) -> dict:
+        logger.debug("Running step for resource: %s", resource_name)
+        started = time.monotonic()
+        rendered = self.render_step(resource_name, step, envs)
+        try:
+            self.write_rendered_files(rendered)
+        except Exception as e:
+            logger.error("Template rendering failed for resource '%s': %s", resource_name, str(e))
+            raise RuntimeError(f"Template rendering failed for {resource_name}: {str(e)}") from e
+
+        action_rendered_script_path = next(iter(rendered))
         logger.debug("Executing script for resource '%s': %s", resource_name, action_rendered_script_path)
-        result = self.call_subprocess(resource_name, action_rendered_script_path, build_id)
+        result = self.run_script(resource_name, action_rendered_script_path, build_id, step, envs, task)
         logger.debug("Step result for resource '%s': %s", resource_name, result)
 
         # Status update should only happen when execution reaches this point
-        self.update_status(resource_name, step.get("name"), result, db, build_id)
+        self.update_status(resource_name, step.get("name"), result, db, build_id, input_hash=self.rendered_fingerprint(rendered),
+                           step_type=step.get("type"), duration=time.monotonic() - started,
+                           inventory=self.inventory_row(task, step, envs, build_id, ResourceService.DEPLOYED))
         return result
 
     # Renders cloudformation or terraform templates based on the provided parameters
@@ -91,6 +139,13 @@ class BuildService(BaseService):
     # The rendered template will be saved in the resource_path with the name action_template
     # envs is a dictionary containing environment variables to be used in the template rendering
     def render_cloud_template(self, use_template: bool, action_type: str, resource_type: str, resource_config: str, resource_path: str, action_template: str, envs: dict) -> None:
+        rendered_template_path, rendered_template = self.render_cloud_template_content(
+            use_template, action_type, resource_type, resource_config, resource_path, action_template, envs)
+        with open(rendered_template_path, "w") as f:
+            f.write(rendered_template)
+
+    # Same as render_cloud_template, but returns (rendered_template_path, rendered_template) instead of writing it
+    def render_cloud_template_content(self, use_template: bool, action_type: str, resource_type: str, resource_config: str, resource_path: str, action_template: str, envs: dict) -> tuple:
         try:
             if use_template:
                 if action_type in {"cloudformation", "terraform"}:
@@ -107,7 +162,7 @@ class BuildService(BaseService):
 
                     logger.debug("Resource config path: '%s'", resource_configs_path)
                     resource_envs = self.load_yaml(resource_configs_path)
-                    logger.info("resource_envs: %s", resource_envs)
+                    logger.debug("resource_envs: %s", resource_envs)
                     envs = self.render_and_merge_envs(self, envs, resource_envs)
                 else:
                     template_path = os.path.join(resource_path, f"{action_template}.j2")
@@ -116,9 +171,7 @@ class BuildService(BaseService):
 
             rendered_template_path = os.path.join(resource_path, action_template)
             if os.path.exists(template_path):
-                rendered_template = self.render_template(template_path, envs)
-                with open(rendered_template_path, "w") as f:
-                    f.write(rendered_template)
+                return rendered_template_path, self.render_template(template_path, envs)
             else:
                 logger.error("Template path '%s' does not exist for render type '%s'.", template_path, use_template)
                 raise RuntimeError(f"Failed to create the rendered template at '{rendered_template_path}'.")
@@ -127,68 +180,250 @@ class BuildService(BaseService):
             raise RuntimeError(f"Template rendering failed for {use_template}: {str(e)}") from e
 
     # Executes all steps defined in a task for a given action (e.g., 'build')
-    def execute_task(self, task: dict, action: str, db: Session, build_id: str) -> list:
+    # envs can be passed in pre-resolved; otherwise they are loaded from the environment files
+    def execute_task(self, task: dict, action: str, db: Session, build_id: str, envs: dict = None) -> list:
         results = []
         task_name = task.get("name")
         resource_name = task.get("resource")
         steps = task.get("steps", [])
-        logger.info("Executing task '%s' for resource: %s (action: %s)", task_name, resource_name, action)
-        envs = self.load_config(task)
+        with log_context(build=build_id, task=task_name):
+            logger.info("Executing task '%s' for resource: %s (action: %s)", task_name, resource_name, action)
+            if envs is None:
+                envs = self.load_config(task)
+
+            logger.debug("Finish loading envs ... '%s'", envs)
+
+            if not envs:  # Check if envs is empty
+                logger.error("Failed to load configuration for task '%s' (resource: %s). Aborting task execution.",
+                             task_name, resource_name)
+                return []  # Return an empty list if configuration loading failed
+
+            logger.debug("Start executing steps ...")
+            for step in steps:
+                try:
+                    with log_context(step=step.get("name")):
+                        result = self.run_step(resource_name, step, envs, db, build_id, task=task)
+                    self.keep_result(results, result, task, step.get("name"))
+                except Exception as e:
+                    logger.error("Step '%s' failed with error: %s", step.get("name"), str(e))
+                    return []  # Return an empty list if any step fails
 
-        logger.debug(f"Finish loading envs ... '{envs}'")
+        return self.flatten_list(results)
 
-        if not envs:  # Check if envs is empty
-            logger.error("Failed to load configuration for task '%s' (resource: %s). Aborting task execution.",
-                         task_name, resource_name)
-            return []  # Return an empty list if configuration loading failed
+    def build_key(self, component: str, tasks: list, configs: dict, selector: TaskSelector = None,
+                  parent_uuid: str = None) -> str:
+        """Identity of a build request: component, paths, selector and the resolved tasks and configs."""
+        folders = (self.ENVIRONMENTS_FOLDER, self.RESOURCES_FOLDER, self.TASKS_FOLDER)
+        return self.fingerprint(component, folders, selector.model_dump() if selector else None, parent_uuid,
+                                tasks, configs)
 
-        logger.debug("Start executing steps ...")
-        for step in steps:
-            try:
-                result = self.run_step(resource_name, step, envs, db, build_id)
-                results.append(result)
-            except Exception as e:
-                logger.error("Step '%s' failed with error: %s", step.get("name"), str(e))
-                return []  # Return an empty list if any step fails
+    def flight_key(self, key: str) -> str:
+        # Only the leader's step_sink sees the steps, so a streamed build is never shared: a key of its own
+        return f"{key}:stream:{uuid.uuid4()}" if self.step_sink is not None else key
 
-        return self.flatten_list(results)
+    def lead(self, run):
+        """Runs a flight leader's build, inside self.slot() when there is one."""
+        if self.slot is None:
+            return run()
+        with self.slot():
+            return run()
+
+    def build(self, component: str, env_path: str, resource_path: str, task_path: str, db: Session,
+              selector: TaskSelector = None, parent_uuid: str = None) -> BuildResponse:
+        self.configure_folders(env_path, resource_path, task_path)
 
-    def build(self, component: str, env_path: str, resource_path: str, task_path: str, db: Session) -> BuildResponse:
-        # Validate input paths
-        if not self.ENVIRONMENTS_FOLDER or not self.RESOURCES_FOLDER or not self.TASKS_FOLDER:
-            raise ValueError("Service folders (ENVIRONMENTS_FOLDER, RESOURCES_FOLDER, TASKS_FOLDER) must be initialized.")
-
-        # If any of the paths are empty, default to current working directory
-        if not env_path:
-            env_path = os.getcwd()
-        if not resource_path:
-            resource_path = os.getcwd()
-        if not task_path:
-            task_path = os.getcwd()
-
-        # Prepend the new paths to the existing paths
-        self.ENVIRONMENTS_FOLDER = os.path.expanduser(os.path.join(env_path, BaseService.ENVIRONMENTS_FOLDER))
-        self.RESOURCES_FOLDER = os.path.expanduser(os.path.join(resource_path, BaseService.RESOURCES_FOLDER))
-        self.TASKS_FOLDER = os.path.expanduser(os.path.join(task_path, BaseService.TASKS_FOLDER))
-
-        logger.debug("Environments folder set to: %s", self.ENVIRONMENTS_FOLDER)
-        logger.debug("Resources folder set to: %s", self.RESOURCES_FOLDER)
-        logger.debug("Tasks folder set to: %s", self.TASKS_FOLDER)
-
-        active_build = db.query(Application).filter(
-            Application.application_name == component,
-            Application.status == "started"
-        ).first()
-        if active_build:
-            logger.error("Build already in progress for component '%s' (UUID: %s)", component, active_build.uuid)
+        yaml_path = os.path.join(self.TASKS_FOLDER, f"{component}.yml")
+        tasks = self.load_yaml(yaml_path)
+        if not tasks:
+            logger.error("Task file '%s.yml' not found.", component)
             return BuildResponse(
                 status=BaseService.FAILED_STATE,
-                message=f"Build for component '{component}' is already in progress.",
+                message=f"Task file {component}.yml not found",
                 component=component,
                 uuid="",  # instead of None
                 results=[]
             )
 
+        tasks = self.select_tasks(tasks, selector)
+        if not tasks:
+            logger.error("No task in '%s.yml' matches the selector.", component)
+            return BuildResponse(
+                status=BaseService.FAILED_STATE,
+                message=f"No task in {component}.yml matches the selector",
+                component=component,
+                uuid="",
+                results=[]
+            )
+
+        # Resolve configs up front: they are part of the request identity and the build reuses them
+        configs = {task.get("name"): self.load_config(task) for task in tasks}
+        key = self.build_key(component, tasks, configs, selector, parent_uuid)
+        response, shared = self.in_flight_builds.do(
+            self.flight_key(key),
+            lambda: self.lead(lambda: self.start_build(component, yaml_path, tasks, configs, db, parent_uuid))
+        )
+        if shared:
+            logger.info("Identical build request for '%s' attached to in-flight build %s", component, response.uuid)
+        return response
+
+    def start_build(self, component: str, yaml_path: str, tasks: list, configs: dict, db: Session,
+                    parent_uuid: str = None, task_hash: str = None) -> BuildResponse:
+        build_id = str(uuid.uuid4())
+        # Check the locker and claim it in one step, so a different request for the component cannot slip in
+        # between; the record is committed right away for the same reason
+        with self.locker_lock:
+            active_build = db.query(Application).filter(
+                Application.application_name == component,
+                Application.status == "started"
+            ).first()
+            if active_build:
+                logger.error("Build already in progress for component '%s' (UUID: %s)", component, active_build.uuid)
+                return BuildResponse(
+                    status=BaseService.FAILED_STATE,
+                    message=f"Build for component '{component}' is already in progress.",
+                    component=component,
+                    uuid="",  # instead of None
+                    results=[]
+                )
+
+            logger.info("Starting build for '%s' with build_id: %s", component, build_id, extra={"build": build_id})
+            new_app = Application(
+                uuid=build_id,
+                application_name=component,
+                action="build",
+                status="started",
+                task_hash=task_hash or self.file_fingerprint(yaml_path),
+                tasks_built=[task.get("name") for task in tasks],  # The chosen subset
+                parent_uuid=parent_uuid,
+                planned_steps=self.plan_steps(tasks),
+                run_started_at=datetime.now()
+            )
+            db.add(new_app)
+            db.commit()
+
+        return self.run_tasks(component, tasks, db, build_id, new_app, configs=configs)
+
+    # configs optionally maps task name to its pre-resolved envs
+    def run_tasks(self, component: str, tasks: list, db: Session, build_id: str, new_app: Application,
+                  tasks_built: list = None, configs: dict = None) -> BuildResponse:
+        self.application_name = component
+        with log_context(build=build_id):
+            results = []
+            overall_error = False
+
+            try:
+                for task in tasks:
+                    envs = configs.get(task.get("name"), {}) if configs is not None else None
+                    task_results = self.execute_task(task, "build", db, build_id, envs=envs)
+
+                    if not task_results:
+                        logger.error("Task execution failed for task '%s'. No results returned.", task.get("name"))
+                        new_app.status = BaseService.FAILED_STATE
+                        db.commit()
+                        return BuildResponse(
+                            status=BaseService.FAILED_STATE,
+                            message=f"Task execution failed for task {task.get('name')}. No results returned",
+                            component=component,
+                            uuid=build_id,
+                            results=[]
+                        )
+
+                    if any(r.get("status") == BaseService.FAILED_STATE for r in task_results if isinstance(r, dict)):
+                        overall_error = True
+                    results.append(task_results)
+
+                # If all tasks pass, update the database with a success status
+                new_app.status = BaseService.SUCCESS_STATE if not overall_error else BaseService.FAILED_STATE
+                new_app.tasks_built = tasks_built if tasks_built is not None else [task.get("name") for task in tasks]
+                db.commit()
+
+            except RuntimeError as e:
+                logger.error("Build process aborted due to error: %s", str(e))
+                db.rollback()  # Undo any changes since a commit has not happened yet
+                # Step updates may already have committed the record; never leave it 'started'
+                self.update_application_record(db, build_id, status=BaseService.FAILED_STATE)
+                return BuildResponse(
+                    status=BaseService.FAILED_STATE,
+                    message=f"{BaseService.BUILD_ERROR_MSG}: {str(e)}",
+                    component=component,
+                    uuid=build_id,
+                    results=[]
+                )
+
+            results = self.flatten_list(results)
+            logger.info("Build for '%s' completed with status: %s", component, new_app.status)
+
+            if not overall_error:
+                state = BaseService.SUCCESS_STATE
+                message = BaseService.BUILD_SUCCESS_MSG
+            else:
+                state = BaseService.FAILED_STATE
+                message = BaseService.BUILD_ERROR_MSG
+            return BuildResponse(
+                status=state,
+                message=message,
+                component=component,
+                uuid=build_id,
+                results=results
+            )
+
+    def find_resume_point(self, tasks: list, db: Session, build_id: str) -> tuple:
+        """
+        Walks the task file in order and returns (task_index, step_index) of the first step that did not
+        succeed under build_id, or None when every step succeeded.
+        Steps that are skipped are re-rendered in memory and must match the input hash recorded for them.
+        Raises RuntimeError when the inputs of an already deployed step changed.
+        """
+        step_records = db.query(Step).filter(Step.uuid == build_id).order_by(Step.timestamp).all()
+        # Latest record wins, so a step that failed and later succeeded on a resume counts as done
+        latest = {(record.task_name, record.step_name): record for record in step_records}
+
+        for task_index, task in enumerate(tasks):
+            resource_name = task.get("resource")
+            envs = None
+            for step_index, step in enumerate(task.get("steps", [])):
+                record = latest.get((resource_name, step.get("name")))
+                if not record or (record.status or {}).get("status") != BaseService.SUCCESS_STATE:
+                    return task_index, step_index
+
+                if envs is None:
+                    envs = self.load_config(task)
+                if not record.input_hash or not envs:
+                    raise RuntimeError(f"Inputs of step '{step.get('name')}' of task '{task.get('name')}' cannot be verified")
+                rendered = self.render_step(resource_name, step, envs)
+                if self.rendered_fingerprint(rendered) != record.input_hash:
+                    raise RuntimeError(f"Rendered inputs of step '{step.get('name')}' of task '{task.get('name')}' changed since the original run")
+        return None
+
+    def resume(self, build_id: str, env_path: str, resource_path: str, task_path: str, db: Session) -> BuildResponse:
+        """
+        Resumes a failed build under the same uuid, re-executing the first failed step and every step after it.
+        The task file and the rendered inputs of the skipped steps must be unchanged since the original run.
+        """
+        self.configure_folders(env_path, resource_path, task_path)
+
+        app_record = db.query(Application).filter(Application.uuid == build_id).first()
+        if not app_record:
+            logger.error("No build record found with build_id: %s", build_id)
+            return BuildResponse(
+                status=BaseService.FAILED_STATE,
+                message=f"No build record found for uuid {build_id}",
+                component="",
+                uuid=build_id,
+                results=[]
+            )
+
+        component = app_record.application_name
+        if app_record.action != "build" or app_record.status != BaseService.FAILED_STATE:
+            logger.error("Build '%s' cannot be resumed (action: %s, status: %s)", build_id, app_record.action, app_record.status)
+            return BuildResponse(
+                status=BaseService.FAILED_STATE,
+                message=f"Only failed builds can be resumed; build {build_id} is '{app_record.action}/{app_record.status}'",
+                component=component,
+                uuid=build_id,
+                results=[]
+            )
+
         yaml_path = os.path.join(self.TASKS_FOLDER, f"{component}.yml")
         tasks = self.load_yaml(yaml_path)
         if not tasks:
@@ -197,75 +432,74 @@ class BuildService(BaseService):
                 status=BaseService.FAILED_STATE,
                 message=f"Task file {component}.yml not found",
                 component=component,
-                uuid="",  # instead of None
+                uuid=build_id,
                 results=[]
             )
 
-        build_id = str(uuid.uuid4())
-        logger.info("Starting build for '%s' with build_id: %s", component, build_id)
-
-        # Create the application record but do not commit yet
-        new_app = Application(
-            uuid=build_id,
-            application_name=component,
-            action="build",
-            status="started"
-        )
-        db.add(new_app)
+        # A selective build only covers the subset recorded on the application
+        if app_record.tasks_built:
+            tasks = [task for task in tasks if task.get("name") in app_record.tasks_built]
 
-        results = []
-        overall_error = False
+        if not app_record.task_hash or app_record.task_hash != self.file_fingerprint(yaml_path):
+            logger.error("Task file '%s' changed since build %s", yaml_path, build_id)
+            return BuildResponse(
+                status=BaseService.FAILED_STATE,
+                message=f"Task file {component}.yml changed since build {build_id}; start a new build instead",
+                component=component,
+                uuid=build_id,
+                results=[]
+            )
 
         try:
-            for task in tasks:
-                task_results = self.execute_task(task, "build", db, build_id)
-
-                if not task_results:
-                    logger.error("Task execution failed for task '%s'. No results returned.", task.get("name"))
-                    new_app.status = BaseService.FAILED_STATE
-                    new_app.tasks_built = [task.get("name")]
-                    db.commit()
-                    return BuildResponse(
-                        status=BaseService.FAILED_STATE,
-                        message=f"Task execution failed for task {task.get('name')}. No results returned",
-                        component=component,
-                        uuid=build_id,
-                        results=[]
-                    )
-
-                if any(r.get("status") == BaseService.FAILED_STATE for r in task_results if isinstance(r, dict)):
-                    overall_error = True
-                results.append(task_results)
-
-            # If all tasks pass, update the database with a success status
-            new_app.status = BaseService.SUCCESS_STATE if not overall_error else BaseService.FAILED_STATE
-            new_app.tasks_built = [task.get("name") for task in tasks]
-            db.commit()
-
+            resume_point = self.find_resume_point(tasks, db, build_id)
         except RuntimeError as e:
-            logger.error("Build process aborted due to error: %s", str(e))
-            db.rollback()  # Undo any changes since a commit has not happened yet
+            logger.error("Build '%s' cannot be resumed: %s", build_id, str(e))
             return BuildResponse(
                 status=BaseService.FAILED_STATE,
-                message=f"{BaseService.BUILD_ERROR_MSG}: {str(e)}",
+                message=f"{str(e)}; start a new build instead",
                 component=component,
                 uuid=build_id,
                 results=[]
             )
 
-        results = self.flatten_list(results)
-        logger.info("Build for '%s' completed with status: %s", component, new_app.status)
+        if resume_point is None:
+            logger.error("Build '%s' has no failed step to resume from", build_id)
+            return BuildResponse(
+                status=BaseService.FAILED_STATE,
+                message=f"Build {build_id} has no failed step to resume from",
+                component=component,
+                uuid=build_id,
+                results=[]
+            )
 
-        if not overall_error:
-            state = BaseService.SUCCESS_STATE
-            message = BaseService.BUILD_SUCCESS_MSG
-        else:
-            state = BaseService.FAILED_STATE
-            message = BaseService.BUILD_ERROR_MSG
-        return BuildResponse(
-            status=state,
-            message=message,
-            component=component,
-            uuid=build_id,
-            results=results
-        )
+        task_index, step_index = resume_point
+        first_task = dict(tasks[task_index], steps=tasks[task_index].get("steps", [])[step_index:])
+        remaining = [first_task] + tasks[task_index + 1:]
+        logger.info("Resuming build '%s' of '%s' from task '%s', step %d",
+                    build_id, component, first_task.get("name"), step_index)
+
+        # Check the locker and claim the record in one step, as start_build does, so two resumes of the same
+        # build (or a new build of the component) cannot both get through
+        with self.locker_lock:
+            db.refresh(app_record)
+            active_build = db.query(Application).filter(
+                Application.application_name == component,
+                Application.status == "started"
+            ).first()
+            if active_build or app_record.status != BaseService.FAILED_STATE:
+                in_progress = active_build.uuid if active_build else build_id
+                logger.error("Build already in progress for component '%s' (UUID: %s)", component, in_progress)
+                return BuildResponse(
+                    status=BaseService.FAILED_STATE,
+                    message=f"Build for component '{component}' is already in progress.",
+                    component=component,
+                    uuid=build_id,
+                    results=[]
+                )
+
+            app_record.status = "started"
+            app_record.planned_steps = self.plan_steps(remaining)
+            app_record.run_started_at = datetime.now()
+            db.commit()
+        return self.run_tasks(component, remaining, db, build_id, app_record,
+                              tasks_built=[task.get("name") for task in tasks])
@@ -0,0 +1,142 @@
+import os
+import time
+import logging
+import threading
+from schemas import ComponentInfo, ComponentsResponse
+from services.base_service import BaseService
+from services.build_service import BuildService
+from services.file_cache import file_stamp
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogIndex:
+    """A snapshot of a folder's catalog; a re-scan builds a new one instead of changing it."""
+
+    def __init__(self):
+        self.scanned = 0.0
+        self.components = {}  # component -> (stamps of the files it was indexed from, ComponentInfo)
+        self.environments = []
+        self.resources = []
+
+
+class CatalogService(BuildService):
+    """
+    In-memory index of the components found in a tasks folder.
+
+    Each component lists its tasks, groups, resources and environments plus every file a build of it reads:
+    the task file, the global and resource environment files and the step scripts, configs and templates.
+    Folders are re-scanned at most every SCAN_INTERVAL seconds; a component is only parsed again when the
+    mtime or size of one of its files changed. Scans run outside indexes_lock, which only guards looking up
+    and swapping the index snapshots, so a slow folder holds up no one else.
+    """
+    SCAN_INTERVAL = 2.0
+    CLOUD_STEP_TYPES = {"cloudformation", "terraform", "custom-cloudformation", "custom-terraform"}
+    indexes = {}  # (tasks folder, environments folder, resources folder) -> CatalogIndex
+    indexes_lock = threading.Lock()
+
+    def step_files(self, resource_name: str, step: dict) -> list:
+        resource_path, action_script_path, _, action_template = self.resolve_step_paths(resource_name, step)
+        files = [action_script_path]
+        action_type = step.get("type")
+        resource_config = step.get("action_config")
+        if resource_config:
+            files.append(os.path.join(resource_path, resource_config))
+        if action_type in {"cloudformation", "terraform"} and step.get("use_template", False):
+            resource_type = step.get("resource")
+            files.append(os.path.join(self.TEMPLATES_FOLDER, action_type, resource_type, f"{resource_type}.yml.j2"))
+        elif action_template and action_type in self.CLOUD_STEP_TYPES:
+            files.append(os.path.join(resource_path, f"{action_template}.j2"))
+        return files
+
+    def index_component(self, component: str, yaml_path: str) -> tuple:
+        files = [yaml_path]
+        tasks = self.load_yaml(yaml_path)
+        if not isinstance(tasks, list):
+            tasks = []
+        names, groups, resources, environments = [], set(), set(), set()
+        for task in tasks:
+            names.append(task.get("name"))
+            resource_name = task.get("resource")
+            environment_name = task.get("environment")
+            if task.get("group"):
+                groups.add(task["group"])
+            if environment_name:
+                environments.add(environment_name)
+                files.append(os.path.join(self.ENVIRONMENTS_FOLDER, f"{environment_name}.yml"))
+            if not resource_name:
+                continue
+            resources.add(resource_name)
+            if environment_name:
+                files.append(os.path.join(self.ENVIRONMENTS_FOLDER, resource_name, f"{environment_name}.yml"))
+            for step in task.get("steps", []):
+                files.extend(self.step_files(resource_name, step))
+
+        files = [os.path.expanduser(path) for path in dict.fromkeys(files)]
+        stamps = {path: file_stamp(path) for path in files}
+        info = ComponentInfo(
+            component=component,
+            tasks=[str(name) for name in names],
+            groups=sorted(groups),
+            resources=sorted(resources),
+            environments=sorted(environments),
+            files=files,
+            missing_files=[path for path, stamp in stamps.items() if stamp is None]
+        )
+        return stamps, info
+
+    @staticmethod
+    def list_folder(folder: str, directories: bool) -> list:
+        try:
+            with os.scandir(folder) as entries:
+                return sorted(
+                    entry.name if directories else entry.name[:-len(".yml")]
+                    for entry in entries
+                    if (entry.is_dir() if directories else entry.is_file() and entry.name.endswith(".yml"))
+                )
+        except OSError:
+            return []
+
+    def scan(self, previous: CatalogIndex) -> CatalogIndex:
+        """Returns a new index of the folders, reusing the entries of previous whose files did not change."""
+        index = CatalogIndex()
+        index.scanned = time.monotonic()
+        components = {}
+        reindexed = 0
+        for component in self.list_folder(self.TASKS_FOLDER, directories=False):
+            known = previous.components.get(component)
+            if known and all(file_stamp(path) == stamp for path, stamp in known[0].items()):
+                components[component] = known
+            else:
+                components[component] = self.index_component(
+                    component, os.path.join(self.TASKS_FOLDER, f"{component}.yml"))
+                reindexed += 1
+        removed = len(set(previous.components) - set(components))
+        if reindexed or removed:
+            logger.info("Catalog of '%s' re-indexed %d and removed %d component(s)", self.TASKS_FOLDER, reindexed,
+                        removed)
+        index.components = components
+        index.environments = self.list_folder(self.ENVIRONMENTS_FOLDER, directories=False)
+        index.resources = self.list_folder(self.RESOURCES_FOLDER, directories=True)
+        return index
+
+    def components(self, env_path: str, resource_path: str, task_path: str, component: str = None) -> ComponentsResponse:
+        self.configure_folders(env_path, resource_path, task_path)
+        key = (self.TASKS_FOLDER, self.ENVIRONMENTS_FOLDER, self.RESOURCES_FOLDER)
+        with self.indexes_lock:
+            index = self.indexes.get(key) or CatalogIndex()
+        if time.monotonic() - index.scanned >= self.SCAN_INTERVAL:
+            index = self.scan(index)
+            with self.indexes_lock:
+                current = self.indexes.get(key)
+                # Concurrent scans of the same folders: the one that started last wins
+                if current is None or current.scanned < index.scanned:
+                    self.indexes[key] = index
+        infos = [info for name, (_, info) in sorted(index.components.items()) if component in (None, name)]
+        environments, resources = list(index.environments), list(index.resources)
+
+        if component and not infos:
+            return ComponentsResponse(status=BaseService.FAILED_STATE, message=f"Task file {component}.yml not found",
+                                      components=[], environments=environments, resources=resources)
+        return ComponentsResponse(status=BaseService.SUCCESS_STATE, message=f"{len(infos)} component(s) found",
+                                  components=infos, environments=environments, resources=resources)
@@ -0,0 +1,118 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from sqlalchemy import event, select
+from models import Application, Step
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeTracker:
+    """
+    Change tokens per application name, for long polling /status.
+
+    A token only grows: every committed change to an application's record or steps moves it to
+    max(previous + 1, epoch milliseconds), so tokens handed out before a restart are always older than
+    the ones after it. Waiters are asyncio futures woken from whichever thread committed the change;
+    waiting never touches the database.
+    """
+    MAX_KNOWN_BUILDS = 4096
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seed = self.now_ms()
+        self._tokens = {}
+        self._waiters = defaultdict(set)  # application name -> {(loop, future)}
+        self._names = OrderedDict()  # build uuid -> application name, so step rows can be attributed
+
+    @staticmethod
+    def now_ms() -> int:
+        return int(time.time() * 1000)
+
+    def token(self, name: str) -> int:
+        with self._lock:
+            return self._tokens.get(name, self._seed)
+
+    def remember(self, build_uuid: str, name: str) -> None:
+        with self._lock:
+            self._names[build_uuid] = name
+            self._names.move_to_end(build_uuid)
+            while len(self._names) > self.MAX_KNOWN_BUILDS:
+                self._names.popitem(last=False)
+
+    def name_for(self, build_uuid: str):
+        with self._lock:
+            return self._names.get(build_uuid)
+
+    def bump(self, name: str) -> int:
+        with self._lock:
+            token = max(self._tokens.get(name, self._seed) + 1, self.now_ms())
+            self._tokens[name] = token
+            waiters = self._waiters.pop(name, set())
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self._wake, future)
+        return token
+
+    @staticmethod
+    def _wake(future) -> None:
+        if not future.done():
+            future.set_result(None)
+
+    async def wait(self, name: str, token: int, timeout: float) -> int:
+        """Waits until the token of name differs from token or timeout passes; returns the current token."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = (loop, future)
+        with self._lock:
+            if self._tokens.get(name, self._seed) != token:
+                return self._tokens.get(name, self._seed)
+            self._waiters[name].add(waiter)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(name)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[name]
+        return self.token(name)
+
+
+tracker = ChangeTracker()
+
+
+def track_changes(session_factory, change_tracker: ChangeTracker = None) -> None:
+    """Bumps the change token of every application whose record or steps a session of session_factory commits."""
+    change_tracker = change_tracker or tracker
+
+    @event.listens_for(session_factory, "after_flush")
+    def collect(session, flush_context):
+        names = session.info.setdefault("changed_applications", set())
+        for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(instance, Application):
+                change_tracker.remember(instance.uuid, instance.application_name)
+                names.add(instance.application_name)
+            elif isinstance(instance, Step):
+                name = change_tracker.name_for(instance.uuid)
+                if name is None:
+                    name = session.connection().execute(
+                        select(Application.application_name).where(Application.uuid == instance.uuid)
+                    ).scalar()
+                    if name:
+                        change_tracker.remember(instance.uuid, name)
+                if name:
+                    names.add(name)
+
+    @event.listens_for(session_factory, "after_commit")
+    def publish(session):
+        for name in session.info.pop("changed_applications", ()):
+            change_tracker.bump(name)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def discard(session):
+        session.info.pop("changed_applications", None)
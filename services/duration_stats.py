@@ -0,0 +1,134 @@
+import os
+import math
+import time
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from models import Step
+
+logger = logging.getLogger(__name__)
+
+
+class DurationStats:
+    """
+    Step duration percentiles learned from past Step records, for ETAs and the slowest-tasks ranking.
+
+    The model is rebuilt from the newest MAX_SAMPLES timed steps at most every REFRESH_INTERVAL seconds and
+    shared by all requests. Only successful steps count, so fast failures do not drag the estimates down.
+    Estimates fall back from (task, step, type) to the step type and then to all steps.
+    """
+    REFRESH_INTERVAL = float(os.environ.get("BUILDER_DURATION_REFRESH", 60))
+    MAX_SAMPLES = 50000
+    SUCCESS_STATE = "success"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self.steps = {}  # (task, step, type) -> stats
+        self.types = {}  # type -> stats
+        self.tasks = {}  # task -> stats over the task's total per build
+        self.overall = None
+
+    @staticmethod
+    def percentile(values: list, q: float) -> float:
+        """Nearest-rank percentile of sorted values."""
+        return values[max(math.ceil(q / 100.0 * len(values)), 1) - 1]
+
+    @classmethod
+    def summarise(cls, values: list) -> dict:
+        values = sorted(values)
+        return {"samples": len(values), "p50": cls.percentile(values, 50), "p95": cls.percentile(values, 95),
+                "mean": sum(values) / len(values), "max": values[-1]}
+
+    def due(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.REFRESH_INTERVAL
+
+    def refresh(self, db, force: bool = False) -> None:
+        """
+        Rebuilds the model when it is due. A rebuild already under way is not waited for: the caller keeps the
+        current model, and a session running on the event loop (AsyncSession.run_sync) can never block on the lock.
+        """
+        if not force and not self.due():
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            rows = (
+                db.query(Step.uuid, Step.task_name, Step.step_name, Step.step_type, Step.duration, Step.status)
+                .filter(Step.duration.isnot(None))
+                .order_by(Step.id.desc())
+                .limit(self.MAX_SAMPLES)
+                .all()
+            )
+            steps, types, task_totals, overall = defaultdict(list), defaultdict(list), defaultdict(float), []
+            for build_uuid, task_name, step_name, step_type, duration, status in rows:
+                if (status or {}).get("status") != self.SUCCESS_STATE:
+                    continue
+                steps[(task_name, step_name, step_type)].append(duration)
+                types[step_type].append(duration)
+                task_totals[(build_uuid, task_name)] += duration
+                overall.append(duration)
+            tasks = defaultdict(list)
+            for (_, task_name), total in task_totals.items():
+                tasks[task_name].append(total)
+
+            self.steps = {key: self.summarise(values) for key, values in steps.items()}
+            self.types = {key: self.summarise(values) for key, values in types.items()}
+            self.tasks = {key: self.summarise(values) for key, values in tasks.items()}
+            self.overall = self.summarise(overall) if overall else None
+            self._loaded_at = time.monotonic()
+            logger.debug("Duration model rebuilt from %d step(s): %d step key(s)", len(overall), len(self.steps))
+        finally:
+            self._lock.release()
+
+    def estimate(self, task_name: str, step_name: str, step_type: str = None):
+        """Expected (p50) seconds for a step, or None without any history."""
+        stats = self.steps.get((task_name, step_name, step_type)) or self.types.get(step_type) or self.overall
+        return stats["p50"] if stats else None
+
+    def progress(self, planned: list, done: int, running_for: float) -> tuple:
+        """
+        Returns (percent complete, estimated seconds remaining) of a run with done of its planned steps finished,
+        the current one running for running_for seconds. Percent falls back to a step count and the ETA to None
+        when there is no history.
+        """
+        if not planned:
+            return None, None
+        done = min(done, len(planned))
+        estimates = [self.estimate(step.get("task"), step.get("step"), step.get("type")) for step in planned]
+        if any(estimate is None for estimate in estimates):
+            return round(100.0 * done / len(planned), 1), None
+
+        completed, remaining = sum(estimates[:done]), estimates[done:]
+        if remaining:
+            # The running step has used up part of its estimate, but is never assumed to be over
+            completed += min(running_for, remaining[0])
+            remaining[0] = max(remaining[0] - running_for, 0.0)
+        left = sum(remaining)
+        percent = 100.0 * completed / (completed + left) if completed + left else 100.0 * done / len(planned)
+        if done < len(planned):
+            percent = min(percent, 99.0)
+        return round(percent, 1), round(left, 1)
+
+    def slowest(self, db, group_by: str = "task", metric: str = "p95", limit: int = 20) -> list:
+        """Slowest tasks (total per build) or steps across all applications, ranked by metric."""
+        self.refresh(db)
+        if group_by == "step":
+            entries = [dict(stats, task_name=task, step_name=step, step_type=step_type)
+                       for (task, step, step_type), stats in self.steps.items()]
+        else:
+            entries = [dict(stats, task_name=task, step_name=None, step_type=None)
+                       for task, stats in self.tasks.items()]
+        entries.sort(key=lambda entry: entry[metric], reverse=True)
+        return entries[:limit]
+
+    @staticmethod
+    def running_for(steps: list, started_at: datetime, now: datetime = None) -> float:
+        """Seconds since the last recorded step (or the run start), i.e. how long the current step has run."""
+        last = max([step.timestamp for step in steps if step.timestamp] + ([started_at] if started_at else []),
+                   default=None)
+        return max(((now or datetime.now()) - last).total_seconds(), 0.0) if last else 0.0
+
+
+duration_stats = DurationStats()
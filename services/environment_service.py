@@ -1,34 +1,82 @@
 import os
 import logging
 import json
+import threading
+from collections import OrderedDict
 from schemas import EnvironmentResponse
 from services.base_service import BaseService
+from services.file_cache import file_stamp
 
 logger = logging.getLogger(__name__)
 
 
 class EnvironmentService(BaseService):
-    def get_environment(self, component: str, env_path: str, resource_path: str, task_path: str) -> EnvironmentResponse:
-        # Validate input paths
-        if not self.ENVIRONMENTS_FOLDER or not self.RESOURCES_FOLDER or not self.TASKS_FOLDER:
-            raise ValueError("Service folders (ENVIRONMENTS_FOLDER, RESOURCES_FOLDER, TASKS_FOLDER) must be initialized.")
+    # Resolved environments, keyed by component and folders, valid while their input files are unchanged
+    MAX_CACHED_ENVIRONMENTS = 256
+    resolved = OrderedDict()  # (component, folders) -> (inputs fingerprint, EnvironmentResponse, etag)
+    resolved_lock = threading.Lock()
+
+    def input_files(self, component: str, tasks: list) -> list:
+        """Every file get_environment reads for the component."""
+        files = [os.path.join(self.TASKS_FOLDER, f"{component}.yml")]
+        for task in tasks:
+            resource_name = task.get("resource")
+            environment_name = task.get("environment")
+            files.append(os.path.join(self.ENVIRONMENTS_FOLDER, f"{environment_name}.yml"))
+            files.append(os.path.join(self.ENVIRONMENTS_FOLDER, str(resource_name), f"{environment_name}.yml"))
+            for step in task.get("steps", []):
+                if step.get("use_template", False):
+                    files.append(os.path.join(self.RESOURCES_FOLDER, str(resource_name), f"{step.get('action_config')}"))
+        return [os.path.expanduser(path) for path in files]
 
-        # If any of the paths are empty, default to current working directory
-        if not env_path:
-            env_path = os.getcwd()
-        if not resource_path:
-            resource_path = os.getcwd()
-        if not task_path:
-            task_path = os.getcwd()
+    def cached_environment(self, component: str, env_path: str, resource_path: str, task_path: str) -> tuple:
+        """
+        Returns (EnvironmentResponse, etag). Only the input files are checked (stat, plus the task file from the
+        YAML cache) while they are unchanged; etag is None when the environment could not be resolved.
+        """
+        self.configure_folders(env_path, resource_path, task_path)
+        key = (component, self.ENVIRONMENTS_FOLDER, self.RESOURCES_FOLDER, self.TASKS_FOLDER)
+        tasks = self.load_yaml(os.path.join(self.TASKS_FOLDER, f"{component}.yml"))
+        inputs = self.fingerprint(key, [(path, file_stamp(path)) for path in self.input_files(component, tasks if isinstance(tasks, list) else [])])
 
-        # Prepend the new paths to the existing paths
-        self.ENVIRONMENTS_FOLDER = os.path.expanduser(os.path.join(env_path, BaseService.ENVIRONMENTS_FOLDER))
-        self.RESOURCES_FOLDER = os.path.expanduser(os.path.join(resource_path, BaseService.RESOURCES_FOLDER))
-        self.TASKS_FOLDER = os.path.expanduser(os.path.join(task_path, BaseService.TASKS_FOLDER))
+        with self.resolved_lock:
+            cached = self.resolved.get(key)
+            if cached and cached[0] == inputs:
+                self.resolved.move_to_end(key)
+                return cached[1], cached[2]
 
-        logger.debug("Environments folder set to: %s", self.ENVIRONMENTS_FOLDER)
-        logger.debug("Resources folder set to: %s", self.RESOURCES_FOLDER)
-        logger.debug("Tasks folder set to: %s", self.TASKS_FOLDER)
+        result = self.get_environment(component, env_path, resource_path, task_path)
+        if result.status != BaseService.SUCCESS_STATE:
+            return result, None
+        # Strong validator: derived from the response content itself
+        etag = f'"{self.fingerprint(result.model_dump())}"'
+        with self.resolved_lock:
+            self.resolved[key] = (inputs, result, etag)
+            self.resolved.move_to_end(key)
+            while len(self.resolved) > self.MAX_CACHED_ENVIRONMENTS:
+                self.resolved.popitem(last=False)
+        return result, etag
+
+    def warm(self, env_path: str, resource_path: str, task_path: str) -> int:
+        """Resolves every component of the tasks folder into the cache; returns how many resolved."""
+        self.configure_folders(env_path, resource_path, task_path)
+        try:
+            components = sorted(name[:-len(".yml")] for name in os.listdir(self.TASKS_FOLDER) if name.endswith(".yml"))
+        except OSError as e:
+            logger.warning("Cannot warm environments from '%s': %s", self.TASKS_FOLDER, e)
+            return 0
+        warmed = 0
+        for component in components:
+            try:
+                _, etag = self.cached_environment(component, env_path, resource_path, task_path)
+                warmed += etag is not None
+            except Exception:
+                logger.exception("Warming the environment of '%s' failed", component)
+        logger.info("Warmed %d of %d environment(s) from '%s'", warmed, len(components), self.TASKS_FOLDER)
+        return warmed
+
+    def get_environment(self, component: str, env_path: str, resource_path: str, task_path: str) -> EnvironmentResponse:
+        self.configure_folders(env_path, resource_path, task_path)
 
         env_vars = {}  # Initialize the dictionary
 
@@ -59,7 +107,8 @@ class EnvironmentService(BaseService):
                     resource_envs = self.load_yaml(resource_configs_path)
                     env_vars = self.render_and_merge_envs(self, env_vars, resource_envs)
 
-        logger.debug("Environmental variables: %s", json.dumps(env_vars, indent=2))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Environmental variables: %s", json.dumps(env_vars, indent=2))
 
         return EnvironmentResponse(
             component=component,
@@ -0,0 +1,58 @@
+import copy
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def file_stamp(path: str):
+    """(mtime_ns, size) of a file, or None when it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class YamlCache:
+    """
+    Parsed YAML files, validated against the file's mtime and size on every load.
+
+    Callers get a deep copy, so they can change what they loaded (render_and_merge_envs does) without
+    touching the cached document. Copying is much cheaper than parsing the file again.
+    """
+    MAX_ENTRIES = 1024
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # path -> (stamp, data)
+
+    def load(self, path: str):
+        """Raises OSError when the file cannot be read and yaml.YAMLError when it cannot be parsed."""
+        stamp = file_stamp(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and stamp is not None and entry[0] == stamp:
+                self._entries.move_to_end(path)
+                return copy.deepcopy(entry[1])
+
+        import yaml  # Imported on first use, it is not needed to serve most requests
+
+        with open(path, "r") as file:
+            data = yaml.safe_load(file)
+        with self._lock:
+            self._entries[path] = (stamp, data)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return copy.deepcopy(data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+yaml_cache = YamlCache()
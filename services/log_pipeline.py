@@ -0,0 +1,226 @@
+import os
+import re
+import sys
+import copy
+import json
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+build_var = contextvars.ContextVar("log_build", default=None)
+task_var = contextvars.ContextVar("log_task", default=None)
+step_var = contextvars.ContextVar("log_step", default=None)
+debug_var = contextvars.ContextVar("log_debug", default=False)
+
+CONTEXT_FIELDS = (("build", build_var), ("task", task_var), ("step", step_var))
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(build)s %(task)s %(step)s] %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the build, task and step it was logged under."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for name, _ in CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text  # Rendered by ContextQueueHandler before the record was queued
+        return json.dumps(entry, default=str)
+
+
+class BuildFileHandler(logging.Handler):
+    """Appends the records of each build to <folder>/<build uuid>.log, keeping the newest files open."""
+    MAX_OPEN_FILES = 32
+
+    def __init__(self, folder: str):
+        super().__init__()
+        self.folder = os.path.expanduser(folder)
+        self.files = OrderedDict()
+
+    @staticmethod
+    def file_name(build_uuid: str) -> str:
+        return re.sub(r"[^A-Za-z0-9._-]", "_", build_uuid) + ".log"
+
+    def stream(self, build_uuid: str):
+        stream = self.files.pop(build_uuid, None)
+        if stream is None:
+            os.makedirs(self.folder, exist_ok=True)
+            stream = open(os.path.join(self.folder, self.file_name(build_uuid)), "a", encoding="utf-8")
+            while len(self.files) >= self.MAX_OPEN_FILES:
+                self.files.popitem(last=False)[1].close()
+        self.files[build_uuid] = stream
+        return stream
+
+    def emit(self, record: logging.LogRecord) -> None:
+        build_uuid = getattr(record, "build", None)
+        if not build_uuid:
+            return
+        try:
+            stream = self.stream(str(build_uuid))
+            stream.write(self.format(record) + "\n")
+            stream.flush()
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        with self.lock:
+            while self.files:
+                self.files.popitem()[1].close()
+        super().close()
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Runs on the logging thread: drops records below the pipeline level (unless the build opted into DEBUG),
+    stamps the build/task/step context, caps the message size and hands the record to the queue without
+    ever blocking. Records are dropped and counted when the queue is full.
+    """
+
+    def __init__(self, log_queue, pipeline):
+        super().__init__(log_queue)
+        self.pipeline = pipeline
+        self.dropped = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.levelno < self.pipeline.level and not debug_var.get():
+            return
+        super().emit(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        for name, var in CONTEXT_FIELDS:
+            if getattr(record, name, None) is None:
+                setattr(record, name, var.get())
+        # Only the message is rendered here and capped; the listener's formatters do the rest. The traceback is
+        # rendered to exc_text as well, so the queued record holds no frames yet still has its "exc".
+        message = record.getMessage()
+        limit = self.pipeline.max_message_chars
+        if limit and len(message) > limit:
+            head, tail = message[:limit * 3 // 4], message[-(limit // 4):]
+            message = f"{head} ... [{len(message) - len(head) - len(tail)} characters dropped] ... {tail}"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.msg = record.message = message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """
+    Off-thread logging for the API process.
+
+    The root logger feeds a bounded queue; a listener thread formats the records (JSON or text) to the console,
+    LOG_FILE and one file per build under BUILD_LOG_DIR. The process runs at LEVEL; log_context(debug=True)
+    lowers it to DEBUG for the code running inside it only (the root logger is opened up while such a
+    context is active and the other records are dropped before they are queued).
+    """
+    LEVEL = os.environ.get("BUILDER_LOG_LEVEL", "INFO").upper()
+    FORMAT = os.environ.get("BUILDER_LOG_FORMAT", "json")  # json or text
+    LOG_FILE = os.environ.get("BUILDER_LOG_FILE", "app.log")
+    BUILD_LOG_DIR = os.environ.get("BUILDER_BUILD_LOG_DIR",
+                                   os.path.join(os.environ.get("BUILDER_LOG_DIR", "logs"), "builds"))
+    MAX_MESSAGE_CHARS = int(os.environ.get("BUILDER_LOG_MAX_CHARS", 2000))
+    QUEUE_SIZE = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._debug_contexts = 0
+        self.level = logging.INFO
+        self.max_message_chars = self.MAX_MESSAGE_CHARS
+        self.handler = None
+        self.listener = None
+
+    def configure(self, level: str = None, fmt: str = None, log_file: str = None, build_log_dir: str = None,
+                  stream=None) -> None:
+        """Routes the root logger through the queue. Calling it again replaces the previous setup."""
+        self.stop()
+        self.level = logging.getLevelName((level or self.LEVEL).upper())
+        if not isinstance(self.level, int):
+            raise ValueError(f"Unknown log level '{level or self.LEVEL}'")
+        formatter = JsonFormatter() if (fmt or self.FORMAT) == "json" else logging.Formatter(TEXT_FORMAT, DATE_FORMAT)
+
+        handlers = [logging.StreamHandler(stream or sys.stdout)]
+        log_file = self.LOG_FILE if log_file is None else log_file
+        if log_file:
+            handlers.append(logging.FileHandler(log_file))
+        build_log_dir = self.BUILD_LOG_DIR if build_log_dir is None else build_log_dir
+        if build_log_dir:
+            handlers.append(BuildFileHandler(build_log_dir))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        self.handler = ContextQueueHandler(queue.Queue(self.QUEUE_SIZE), self)
+        self.listener = QueueListener(self.handler.queue, *handlers)
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(logging.DEBUG if self._debug_contexts else self.level)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Flushes the queue and closes the handlers."""
+        if self.listener is None:
+            return
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+        logging.getLogger().removeHandler(self.handler)
+        self.listener = None
+
+    def open_debug(self) -> None:
+        with self._lock:
+            self._debug_contexts += 1
+            if self.listener is not None:
+                logging.getLogger().setLevel(logging.DEBUG)
+
+    def close_debug(self) -> None:
+        with self._lock:
+            self._debug_contexts -= 1
+            if self.listener is not None and not self._debug_contexts:
+                logging.getLogger().setLevel(self.level)
+
+
+log_pipeline = LogPipeline()
+
+
+@contextmanager
+def log_context(build: str = None, task: str = None, step: str = None, debug: bool = False):
+    """Tags the records logged inside with build/task/step; debug=True logs them at DEBUG whatever the level."""
+    tokens = [(var, var.set(value)) for (_, var), value in zip(CONTEXT_FIELDS, (build, task, step))
+              if value is not None]
+    if debug:
+        tokens.append((debug_var, debug_var.set(True)))
+        log_pipeline.open_debug()
+    try:
+        yield
+    finally:
+        if debug:
+            log_pipeline.close_debug()
+        for var, token in reversed(tokens):
+            var.reset(token)
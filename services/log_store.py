@@ -0,0 +1,81 @@
+import os
+import gzip
+import hashlib
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+class LogStore:
+    """
+    Content-addressed, gzip compressed step output on local disk.
+
+    An output is stored once under <root>/<sha256[:2]>/<sha256>.gz, whatever the number of steps that
+    produced it; its reference is the sha256 hex digest. Step rows keep a tail of TAIL_CHARS characters
+    and the reference, full output is read back in byte ranges.
+    """
+    ROOT = os.environ.get("BUILDER_LOG_DIR", "logs")
+    TAIL_CHARS = 4096  # Outputs up to this size stay inline in the step row
+
+    def __init__(self, root: str = None):
+        self.root = os.path.expanduser(root or self.ROOT)
+
+    def path(self, ref: str) -> str:
+        if len(ref) != 64 or any(c not in "0123456789abcdef" for c in ref):
+            raise ValueError(f"Invalid log reference '{ref}'")
+        return os.path.join(self.root, ref[:2], f"{ref}.gz")
+
+    def put(self, text: str) -> tuple:
+        """Stores text and returns (reference, size in bytes)."""
+        data = text.encode("utf-8")
+        ref = hashlib.sha256(data).hexdigest()
+        path = self.path(ref)
+        if os.path.exists(path):
+            os.utime(path)  # A fresh reference: retention leaves recently used logs alone
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see a partial log
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as compressed:
+                    compressed.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            logger.debug("Stored %d byte log %s", len(data), ref)
+        return ref, len(data)
+
+    def read(self, ref: str, offset: int = 0, length: int = None) -> bytes:
+        """Returns up to length bytes of the log from offset. Raises FileNotFoundError for an unknown reference."""
+        with gzip.open(self.path(ref), "rb") as compressed:
+            if offset:
+                compressed.seek(offset)
+            return compressed.read(-1 if length is None else length)
+
+    def delete(self, ref: str, unused_since: float = None) -> bool:
+        """Removes a log, unless it was stored or reused after unused_since (a timestamp); True if removed."""
+        path = self.path(ref)
+        try:
+            if unused_since is not None and os.path.getmtime(path) > unused_since:
+                return False
+            os.unlink(path)
+        except FileNotFoundError:
+            return False
+        logger.debug("Deleted log %s", ref)
+        return True
+
+    def offload(self, result: dict) -> tuple:
+        """
+        Moves a long result message to the store. Returns (result for the step row, reference, size); the
+        row keeps the last TAIL_CHARS characters. Short messages stay inline with reference and size None.
+        """
+        message = result.get("message") if isinstance(result, dict) else None
+        if not isinstance(message, str) or len(message) <= self.TAIL_CHARS:
+            return result, None, None
+        ref, size = self.put(message)
+        return dict(result, message=message[-self.TAIL_CHARS:], truncated=True), ref, size
+
+
+log_store = LogStore()
@@ -0,0 +1,185 @@
+import os
+import uuid
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Application
+from schemas import MatrixBuildResponse, MatrixChildResult, TaskSelector
+from services.admission import AdmissionRejected
+from services.base_service import BaseService
+from services.build_service import BuildService
+
+logger = logging.getLogger(__name__)
+
+
+class MatrixBuildService(BaseService):
+    """
+    Builds one component into several environments at once.
+
+    Every environment becomes a child build named '<component>@<environment>' that points at the parent
+    uuid, with the tasks' "environment" replaced by the target environment. Environment configs are
+    resolved once up front, then the children run concurrently. MAX_CONCURRENT_ENVIRONMENTS caps the
+    number of environment builds running across all matrix requests of the process.
+    """
+    MATRIX_ACTION = "matrix-build"
+    MAX_CONCURRENT_ENVIRONMENTS = 8
+    environment_slots = threading.BoundedSemaphore(MAX_CONCURRENT_ENVIRONMENTS)
+    # Context manager factory (e.g. admission.slot) every child build runs in; a child that is not admitted fails
+    slot = None
+
+    def __init__(self, session_factory=None):
+        # Each child build runs in its own thread and therefore needs its own session
+        self.session_factory = session_factory or SessionLocal
+
+    @staticmethod
+    def child_name(component: str, environment: str) -> str:
+        return f"{component}@{environment}"
+
+    def resolve_environment(self, tasks: list, environment: str) -> tuple:
+        """Returns (tasks pinned to the environment, {task name: envs}, error message or None)."""
+        env_tasks = [dict(task, environment=environment) for task in tasks]
+        configs = {}
+        for task in env_tasks:
+            envs = self.load_config(task)
+            if not envs:
+                return env_tasks, configs, f"Configuration for task '{task.get('name')}' not found in environment '{environment}'"
+            configs[task.get("name")] = envs
+        return env_tasks, configs, None
+
+    def build_environment(self, component: str, environment: str, env_tasks: list, configs: dict, error: str,
+                          parent_uuid: str, task_hash: str) -> MatrixChildResult:
+        application_name = self.child_name(component, environment)
+        build_id = str(uuid.uuid4())
+
+        with self.environment_slots:
+            if self.slot is None or error:
+                return self.run_environment(application_name, environment, env_tasks, configs, error, parent_uuid,
+                                            task_hash, build_id)
+            try:
+                with self.slot():
+                    return self.run_environment(application_name, environment, env_tasks, configs, error,
+                                                parent_uuid, task_hash, build_id)
+            except AdmissionRejected as e:
+                logger.error("Matrix build '%s' could not build environment '%s': %s", parent_uuid, environment, e)
+                return MatrixChildResult(environment=environment, application_name=application_name,
+                                         uuid=build_id, status=BaseService.FAILED_STATE, message=str(e))
+
+    def run_environment(self, application_name: str, environment: str, env_tasks: list, configs: dict, error: str,
+                        parent_uuid: str, task_hash: str, build_id: str) -> MatrixChildResult:
+        db = self.session_factory()
+        try:
+            # Check the locker and claim it in one step, as BuildService.start_build does, so two matrix builds
+            # (or a build) of the same child cannot both get through
+            with BuildService.locker_lock:
+                active_build = db.query(Application).filter(
+                    Application.application_name == application_name,
+                    Application.status == "started"
+                ).first()
+                if active_build:
+                    error = f"Build for '{application_name}' is already in progress."
+
+                child_app = Application(
+                    uuid=build_id,
+                    application_name=application_name,
+                    action="build",
+                    status=BaseService.FAILED_STATE if error else "started",
+                    task_hash=task_hash,
+                    tasks_built=[task.get("name") for task in env_tasks],
+                    parent_uuid=parent_uuid,
+                    environment=environment,
+                    planned_steps=self.plan_steps(env_tasks),
+                    run_started_at=datetime.now()
+                )
+                db.add(child_app)
+                db.commit()
+            if error:
+                logger.error("Matrix build '%s' skipped environment '%s': %s", parent_uuid, environment, error)
+                return MatrixChildResult(environment=environment, application_name=application_name,
+                                         uuid=build_id, status=BaseService.FAILED_STATE, message=error)
+
+            logger.info("Matrix build '%s' building '%s' (build_id: %s)", parent_uuid, application_name, build_id)
+            child = BuildService()
+            child.ENVIRONMENTS_FOLDER = self.ENVIRONMENTS_FOLDER
+            child.RESOURCES_FOLDER = self.RESOURCES_FOLDER
+            child.TASKS_FOLDER = self.TASKS_FOLDER
+            response = child.run_tasks(application_name, env_tasks, db, build_id, child_app, configs=configs)
+            return MatrixChildResult(environment=environment, application_name=application_name,
+                                     uuid=build_id, status=response.status, message=response.message)
+        except Exception as e:
+            logger.exception("Matrix build '%s' failed for environment '%s'", parent_uuid, environment)
+            db.rollback()
+            return MatrixChildResult(environment=environment, application_name=application_name,
+                                     uuid=build_id, status=BaseService.FAILED_STATE, message=str(e))
+        finally:
+            db.close()
+
+    def matrix_build(self, component: str, environments: list, env_path: str, resource_path: str, task_path: str,
+                     db: Session, max_concurrency: int = 4, selector: TaskSelector = None) -> MatrixBuildResponse:
+        self.configure_folders(env_path, resource_path, task_path)
+        environments = list(dict.fromkeys(environments or []))  # de-duplicate, keep order
+
+        def failed(message, parent_uuid=""):
+            logger.error("Matrix build for '%s' failed: %s", component, message)
+            return MatrixBuildResponse(component=component, status=BaseService.FAILED_STATE, message=message,
+                                       uuid=parent_uuid, builds=[])
+
+        if not environments:
+            return failed("At least one environment is required")
+
+        active_build = db.query(Application).filter(
+            Application.application_name == component,
+            Application.status == "started"
+        ).first()
+        if active_build:
+            return failed(f"Build for component '{component}' is already in progress.")
+
+        yaml_path = os.path.join(self.TASKS_FOLDER, f"{component}.yml")
+        tasks = self.load_yaml(yaml_path)
+        if not tasks:
+            return failed(f"Task file {component}.yml not found")
+        tasks = self.select_tasks(tasks, selector)
+        if not tasks:
+            return failed(f"No task in {component}.yml matches the selector")
+
+        # Resolve each environment's config once, before anything is deployed
+        resolved = {environment: self.resolve_environment(tasks, environment) for environment in environments}
+
+        parent_uuid = str(uuid.uuid4())
+        parent_app = Application(
+            uuid=parent_uuid,
+            application_name=component,
+            action=self.MATRIX_ACTION,
+            status="started",
+            tasks_built=environments
+        )
+        db.add(parent_app)
+        db.commit()
+        logger.info("Starting matrix build '%s' of '%s' for environments: %s", parent_uuid, component, environments)
+
+        task_hash = self.file_fingerprint(yaml_path)
+        workers = max(1, min(max_concurrency, len(environments)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="matrix") as executor:
+            # Children run in the request's logging context (e.g. a DEBUG opt-in), one copy each
+            futures = [
+                executor.submit(contextvars.copy_context().run, self.build_environment, component, environment,
+                                *resolved[environment], parent_uuid, task_hash)
+                for environment in environments
+            ]
+            builds = [future.result() for future in futures]
+
+        overall_error = any(build.status != BaseService.SUCCESS_STATE for build in builds)
+        parent_app.status = BaseService.FAILED_STATE if overall_error else BaseService.SUCCESS_STATE
+        db.commit()
+        logger.info("Matrix build '%s' of '%s' completed with status: %s", parent_uuid, component, parent_app.status)
+
+        return MatrixBuildResponse(
+            component=component,
+            status=parent_app.status,
+            message=BaseService.BUILD_ERROR_MSG if overall_error else BaseService.BUILD_SUCCESS_MSG,
+            uuid=parent_uuid,
+            builds=builds
+        )
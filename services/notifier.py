@@ -0,0 +1,169 @@
+import os
+import hmac
+import json
+import time
+import heapq
+import socket
+import hashlib
+import logging
+import itertools
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class Delivery:
+    def __init__(self, url: str, secret: str, event: str, body: bytes):
+        self.url = url
+        self.secret = secret
+        self.event = event
+        self.body = body
+        self.attempts = 0
+
+
+class Notifier:
+    """
+    Delivers build/unbuild events to callback targets in the background.
+
+    Targets are http(s) URLs or unix:///path/to/socket (POST to "/" over the socket). Bodies are JSON;
+    when the target or BUILDER_CALLBACK_SECRET provides a secret, X-Builder-Signature carries
+    "sha256=" + HMAC-SHA256 of "<X-Builder-Timestamp>.<body>". Failed deliveries are retried with
+    exponential backoff up to MAX_ATTEMPTS times; publishing only queues, so a slow receiver never holds up a build.
+    """
+    SCHEMES = {"http", "https", "unix"}
+    MAX_ATTEMPTS = 5
+    RETRY_BASE = 2.0  # seconds, doubled per attempt
+    RETRY_CAP = 60.0
+    TIMEOUT = 5.0  # seconds per delivery attempt
+    WORKERS = 2
+    MAX_PENDING = 1000
+
+    def __init__(self, secret: str = None, workers: int = None):
+        self.secret = secret if secret is not None else os.environ.get("BUILDER_CALLBACK_SECRET")
+        self.workers = workers or self.WORKERS
+        self._cond = threading.Condition()
+        self._pending = []  # heap of (due, seq, Delivery)
+        self._counter = itertools.count()
+        self._threads = []
+
+    def check_signing(self) -> None:
+        """Warns at startup when events to targets without a secret of their own will go out unsigned."""
+        if not self.secret:
+            logger.warning("BUILDER_CALLBACK_SECRET is not set: callback events are only signed for targets "
+                           "that provide their own secret")
+
+    @classmethod
+    def validate(cls, targets) -> None:
+        """Raises ValueError for a target the notifier cannot deliver to."""
+        for target in targets or []:
+            parts = urlsplit(target.url)
+            if parts.scheme not in cls.SCHEMES or not (parts.netloc or parts.path):
+                raise ValueError(f"Unsupported callback target '{target.url}', use http(s):// or unix://")
+
+    @staticmethod
+    def summary(results: list) -> dict:
+        failed = [result.resource for result in results if result.status != "success"]
+        return {"steps": len(results), "succeeded": len(results) - len(failed), "failed": len(failed),
+                "failed_resources": failed}
+
+    def publish(self, targets, action: str, response) -> None:
+        """Queues the completion or failure event of a build/unbuild response for every target."""
+        if not targets:
+            return
+        outcome = "completed" if response.status == "success" else "failed"
+        event = f"{action}.{outcome}"
+        body = json.dumps({
+            "event": event,
+            "component": response.component,
+            "uuid": response.uuid,
+            "status": response.status,
+            "message": response.message,
+            "summary": self.summary(response.results),
+            "timestamp": time.time()
+        }, sort_keys=True).encode("utf-8")
+        for target in targets:
+            self.enqueue(Delivery(target.url, target.secret or self.secret, event, body))
+
+    def enqueue(self, delivery: Delivery, delay: float = 0.0) -> None:
+        with self._cond:
+            if len(self._pending) >= self.MAX_PENDING:
+                logger.error("Callback queue full, dropping '%s' event for %s", delivery.event, delivery.url)
+                return
+            heapq.heappush(self._pending, (time.monotonic() + delay, next(self._counter), delivery))
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"notifier-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+
+    def headers(self, delivery: Delivery) -> dict:
+        timestamp = str(int(time.time()))
+        headers = {"Content-Type": "application/json", "X-Builder-Event": delivery.event,
+                   "X-Builder-Timestamp": timestamp}
+        if delivery.secret:
+            digest = hmac.new(delivery.secret.encode("utf-8"), timestamp.encode("utf-8") + b"." + delivery.body,
+                              hashlib.sha256).hexdigest()
+            headers["X-Builder-Signature"] = f"sha256={digest}"
+        return headers
+
+    def send(self, delivery: Delivery) -> int:
+        """Posts the delivery once and returns the HTTP status."""
+        parts = urlsplit(delivery.url)
+        if parts.scheme == "unix":
+            connection = UnixHTTPConnection(parts.path, self.TIMEOUT)
+            path = "/"
+        else:
+            connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            connection = connection_class(parts.netloc, timeout=self.TIMEOUT)
+            path = parts.path or "/"
+            if parts.query:
+                path = f"{path}?{parts.query}"
+        try:
+            connection.request("POST", path, body=delivery.body, headers=self.headers(delivery))
+            return connection.getresponse().status
+        finally:
+            connection.close()
+
+    def _next(self) -> Delivery:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self._pending and self._pending[0][0] <= now:
+                    return heapq.heappop(self._pending)[2]
+                self._cond.wait(self._pending[0][0] - now if self._pending else None)
+
+    def _work(self):
+        while True:
+            delivery = self._next()
+            delivery.attempts += 1
+            try:
+                status = self.send(delivery)
+                error = None if 200 <= status < 300 else f"HTTP {status}"
+            except (OSError, http.client.HTTPException) as e:
+                error = str(e)
+            if error is None:
+                logger.info("Delivered '%s' event to %s", delivery.event, delivery.url)
+            elif delivery.attempts >= self.MAX_ATTEMPTS:
+                logger.error("Giving up on '%s' event for %s after %d attempts: %s", delivery.event,
+                             delivery.url, delivery.attempts, error)
+            else:
+                delay = min(self.RETRY_CAP, self.RETRY_BASE * 2 ** (delivery.attempts - 1))
+                logger.warning("Delivering '%s' event to %s failed (%s), retrying in %.0fs", delivery.event,
+                               delivery.url, error, delay)
+                self.enqueue(delivery, delay)
+
+
+notifier = Notifier()
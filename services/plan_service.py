@@ -0,0 +1,156 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+from schemas import BuildResponse, PlanResponse, PlanStep, TaskSelector
+from services.base_service import BaseService
+from services.build_service import BuildService
+
+logger = logging.getLogger(__name__)
+
+
+class Plan:
+    def __init__(self, plan_id: str, component: str, folders: tuple, yaml_path: str, task_hash: str, tasks: list,
+                 configs: dict, renders: dict, key: str):
+        self.plan_id = plan_id
+        self.component = component
+        self.folders = folders  # (ENVIRONMENTS_FOLDER, RESOURCES_FOLDER, TASKS_FOLDER)
+        self.yaml_path = yaml_path
+        self.task_hash = task_hash
+        self.tasks = tasks
+        self.configs = configs
+        self.renders = renders  # fingerprint(resource, step, envs) -> {rendered_path: content}
+        self.key = key  # Build identity, shared with BuildService.build_key
+
+
+class PlanService(BuildService):
+    """
+    Validates a build before anything is deployed.
+
+    Planning loads the task file, resolves every task's envs and renders every step's script and cloud
+    template in memory. Template variables missing from the envs are reported per step (they would
+    otherwise render as empty strings). A plan without errors is cached under an id derived from its
+    content; building that plan id runs exactly the planned tasks with the cached renders.
+    """
+    MAX_CACHED_PLANS = 64
+    plans = OrderedDict()  # plan_id -> Plan, least recently used first
+    plans_lock = threading.Lock()
+
+    def __init__(self):
+        self.renders = None
+        self.undeclared = {}
+
+    @classmethod
+    def cache_plan(cls, plan: Plan) -> None:
+        with cls.plans_lock:
+            cls.plans[plan.plan_id] = plan
+            cls.plans.move_to_end(plan.plan_id)
+            while len(cls.plans) > cls.MAX_CACHED_PLANS:
+                cls.plans.popitem(last=False)
+
+    @classmethod
+    def cached_plan(cls, plan_id: str):
+        with cls.plans_lock:
+            plan = cls.plans.get(plan_id)
+            if plan:
+                cls.plans.move_to_end(plan_id)
+            return plan
+
+    @staticmethod
+    def undeclared_variables(template_path: str, context: dict) -> set:
+        from jinja2 import Environment, FileSystemLoader, meta
+
+        env = Environment(loader=FileSystemLoader(os.path.dirname(template_path)))
+        source = env.loader.get_source(env, os.path.basename(template_path))[0]
+        variables = meta.find_undeclared_variables(env.parse(source))
+        return variables - set(context) - set(env.globals)
+
+    def render_template(self, template_path, context):
+        # Every template rendered while planning is also checked for variables the envs do not define
+        if self.renders is None:
+            missing = self.undeclared_variables(template_path, context)
+            if missing:
+                self.undeclared[template_path] = missing
+        return BaseService.render_template(template_path, context)
+
+    def render_step(self, resource_name: str, step: dict, envs: dict) -> dict:
+        if self.renders is not None:
+            rendered = self.renders.get(self.fingerprint(resource_name, step, envs))
+            if rendered is not None:
+                return dict(rendered)
+        return super().render_step(resource_name, step, envs)
+
+    def plan(self, component: str, env_path: str, resource_path: str, task_path: str,
+             selector: TaskSelector = None) -> PlanResponse:
+        self.configure_folders(env_path, resource_path, task_path)
+
+        def failed(message, steps=None):
+            logger.error("Plan for '%s' failed: %s", component, message)
+            return PlanResponse(component=component, status=BaseService.FAILED_STATE, message=message,
+                                plan_id="", steps=steps or [])
+
+        yaml_path = os.path.join(self.TASKS_FOLDER, f"{component}.yml")
+        tasks = self.load_yaml(yaml_path)
+        if not tasks:
+            return failed(f"Task file {component}.yml not found")
+        tasks = self.select_tasks(tasks, selector)
+        if not tasks:
+            return failed(f"No task in {component}.yml matches the selector")
+
+        configs = {}
+        renders = {}
+        steps = []
+        for task in tasks:
+            task_name = task.get("name")
+            resource_name = task.get("resource")
+            envs = configs[task_name] = self.load_config(task)
+            if not envs:
+                steps.append(PlanStep(task=task_name, step="", resource=str(resource_name), files=[],
+                                      error=f"Configuration for task '{task_name}' not found"))
+                continue
+
+            for step in task.get("steps", []):
+                self.undeclared = {}
+                plan_step = PlanStep(task=task_name, step=str(step.get("name")), resource=resource_name, files=[])
+                try:
+                    rendered = BuildService.render_step(self, resource_name, step, envs)
+                    renders[self.fingerprint(resource_name, step, envs)] = rendered
+                    plan_step.files = list(rendered)
+                except Exception as e:
+                    plan_step.error = str(e)
+                plan_step.missing_variables = sorted(set().union(*self.undeclared.values()))
+                if plan_step.missing_variables and not plan_step.error:
+                    plan_step.error = f"Undefined variable(s): {', '.join(plan_step.missing_variables)}"
+                steps.append(plan_step)
+
+        errors = [step for step in steps if step.error]
+        if errors:
+            return failed(f"{len(errors)} of {len(steps)} step(s) failed validation", steps)
+
+        plan_id = self.fingerprint(component, tasks, configs, renders)
+        key = self.build_key(component, tasks, configs, selector)
+        folders = (self.ENVIRONMENTS_FOLDER, self.RESOURCES_FOLDER, self.TASKS_FOLDER)
+        self.cache_plan(Plan(plan_id, component, folders, yaml_path, self.file_fingerprint(yaml_path), tasks,
+                             configs, renders, key))
+        logger.info("Plan '%s' for '%s' validated %d step(s)", plan_id, component, len(steps))
+        return PlanResponse(component=component, status=BaseService.SUCCESS_STATE,
+                            message=f"{len(steps)} step(s) validated", plan_id=plan_id, steps=steps)
+
+    def build_plan(self, plan_id: str, component: str, db, parent_uuid: str = None) -> BuildResponse:
+        plan = self.cached_plan(plan_id)
+        if not plan or plan.component != component:
+            logger.error("Plan '%s' for component '%s' not found", plan_id, component)
+            return BuildResponse(status=BaseService.FAILED_STATE, component=component, uuid="", results=[],
+                                 message=f"Plan {plan_id} not found for component {component}, create a new plan")
+
+        self.ENVIRONMENTS_FOLDER, self.RESOURCES_FOLDER, self.TASKS_FOLDER = plan.folders
+        self.renders = plan.renders
+        logger.info("Building '%s' from plan '%s'", component, plan_id)
+        response, shared = self.in_flight_builds.do(
+            self.flight_key(plan.key),
+            lambda: self.lead(lambda: self.start_build(component, plan.yaml_path, plan.tasks, plan.configs, db,
+                                                       parent_uuid, task_hash=plan.task_hash))
+        )
+        if shared:
+            logger.info("Plan '%s' attached to in-flight build %s", plan_id, response.uuid)
+        return response
@@ -0,0 +1,107 @@
+import re
+import time
+import random
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket whose refill rate is tuned by the governor (AIMD)."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.last_decrease = 0.0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateGovernor:
+    """
+    Process wide governor for AWS API heavy steps, keyed by (account, region).
+
+    Each key owns a token bucket. A step must take a token before it starts, so the
+    number of stacks hitting the same account/region is paced instead of bursting.
+    The refill rate grows additively after every clean step and is halved whenever
+    a throttling error shows up in a step output.
+    """
+    INITIAL_RATE = 1.0  # steps started per second
+    MIN_RATE = 0.05
+    MAX_RATE = 10.0
+    BURST = 5
+    ADDITIVE_INCREASE = 0.1
+    MULTIPLICATIVE_DECREASE = 0.5
+    DECREASE_COOLDOWN = 2.0  # seconds; one burst of throttles only halves the rate once
+    BACKOFF_BASE = 2.0
+    BACKOFF_CAP = 60.0
+
+    THROTTLING_PATTERN = re.compile(
+        r"Throttling|ThrottlingException|Rate exceeded|TooManyRequestsException|"
+        r"RequestLimitExceeded|RequestThrottled|SlowDown"
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    @staticmethod
+    def key_for(account, region) -> tuple:
+        return account or "default", region or "default"
+
+    def _bucket(self, key) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.INITIAL_RATE, self.BURST)
+            self._buckets[key] = bucket
+        return bucket
+
+    def rate(self, key) -> float:
+        with self._lock:
+            return self._bucket(key).rate
+
+    def acquire(self, key) -> float:
+        """Block until a step may start for the key. Returns the time spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                bucket = self._bucket(key)
+                bucket.refill(time.monotonic())
+                if bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    return waited
+                wait = (1 - bucket.tokens) / bucket.rate
+            logger.debug("Rate governor delaying step for %s by %.2fs", key, wait)
+            time.sleep(wait)
+            waited += wait
+
+    def on_success(self, key) -> None:
+        with self._lock:
+            bucket = self._bucket(key)
+            bucket.rate = min(self.MAX_RATE, bucket.rate + self.ADDITIVE_INCREASE)
+
+    def on_throttle(self, key) -> None:
+        with self._lock:
+            bucket = self._bucket(key)
+            now = time.monotonic()
+            if now - bucket.last_decrease < self.DECREASE_COOLDOWN:
+                return
+            bucket.rate = max(self.MIN_RATE, bucket.rate * self.MULTIPLICATIVE_DECREASE)
+            bucket.tokens = min(bucket.tokens, 0)
+            bucket.last_decrease = now
+            logger.warning("Throttling detected for %s, rate lowered to %.2f steps/s", key, bucket.rate)
+
+    def is_throttled(self, output) -> bool:
+        return bool(output) and bool(self.THROTTLING_PATTERN.search(output))
+
+    def backoff(self, attempt: int) -> float:
+        # Full jitter, so retries of concurrently throttled steps do not line up again
+        return random.uniform(0, min(self.BACKOFF_CAP, self.BACKOFF_BASE * (2 ** attempt)))
+
+
+governor = RateGovernor()
@@ -0,0 +1,73 @@
+import logging
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import Resource
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceService:
+    """
+    The resource inventory: one row per (application, task), written by the steps that deploy or destroy it.
+
+    Rows are upserted with a single INSERT ... ON CONFLICT DO UPDATE for any number of rows, inside the caller's
+    transaction, so a step and the inventory change it causes are committed together.
+    """
+    DEPLOYED = "deployed"
+    DESTROYED = "destroyed"
+    FILTERS = ("application_name", "task_name", "resource", "environment", "account", "region", "status", "step_type")
+    MAX_PAGE_SIZE = 1000
+    SUMMARY_GROUPS = ("account", "region", "environment", "resource", "application_name", "step_type")
+    UPDATED_COLUMNS = ("resource", "step_name", "step_type", "environment", "account", "region", "status", "uuid",
+                       "updated_at")
+
+    @staticmethod
+    def insert_for(db: Session):
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert
+
+    @classmethod
+    def upsert(cls, db: Session, rows: list) -> int:
+        """Inserts or updates rows (dicts of Resource columns) without committing; returns the number of rows."""
+        if not rows:
+            return 0
+        rows = [dict(row, updated_at=row.get("updated_at") or datetime.now()) for row in rows]
+        statement = cls.insert_for(db)(Resource).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["application_name", "task_name"],
+            set_={column: getattr(statement.excluded, column) for column in cls.UPDATED_COLUMNS}
+        )
+        db.execute(statement)
+        return len(rows)
+
+    @classmethod
+    def find(cls, db: Session, filters: dict, limit: int = 100, after: int = None) -> tuple:
+        """
+        One page of resources matching the filters (exact matches, None ignored), ordered by id.
+        Returns (rows, cursor for the next page or None); pass the cursor back as after.
+        """
+        limit = min(max(limit, 1), cls.MAX_PAGE_SIZE)
+        query = db.query(Resource)
+        for name in cls.FILTERS:
+            if filters.get(name) is not None:
+                query = query.filter(getattr(Resource, name) == filters[name])
+        if after is not None:
+            query = query.filter(Resource.id > after)
+        # One extra row tells whether there is a next page without a COUNT
+        rows = query.order_by(Resource.id).limit(limit + 1).all()
+        next_after = rows[limit - 1].id if len(rows) > limit else None
+        return rows[:limit], next_after
+
+    @classmethod
+    def summary(cls, db: Session, group_by: list, status: str = DEPLOYED) -> list:
+        """Resource counts per combination of the group_by columns, in one grouped query."""
+        columns = [getattr(Resource, name) for name in group_by]
+        query = db.query(*columns, func.count(Resource.id))
+        if status is not None:
+            query = query.filter(Resource.status == status)
+        rows = query.group_by(*columns).order_by(*columns).all()
+        return [dict(zip(group_by, row[:-1]), count=row[-1]) for row in rows]
@@ -0,0 +1,189 @@
+import os
+import re
+import json
+import gzip
+import time
+import logging
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import Application, Step, RetentionPolicy, BuildRollup
+from schemas import RetentionReport
+from services.base_service import BaseService
+from services.log_pipeline import BuildFileHandler, LogPipeline
+from services.log_store import LogStore, log_store
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionService(BaseService):
+    """
+    Prunes Application/Step history.
+
+    A build record is expired when it is beyond the newest keep_builds records of its application or older
+    than keep_days (the application's policy, else the "*" policy, else KEEP_BUILDS/KEEP_DAYS). Running
+    builds and the newest finished record of each application, whatever its age, are never expired. Expired records and their steps are written to a gzip JSON-lines archive,
+    summarised into build_rollups and deleted, BATCH_SIZE records per transaction so no single transaction
+    holds the database for long. Step rows without a record (left by unbuilds) are archived the same way
+    once they are older than ORPHAN_GRACE_HOURS. The per-build log files of the deleted builds go with them, and so
+    do the log store outputs no remaining step refers to (unless stored or reused within ORPHAN_GRACE_HOURS, as a
+    running build may not have committed its step yet).
+    """
+    DEFAULT_POLICY = "*"
+    KEEP_BUILDS = int(os.environ.get("BUILDER_KEEP_BUILDS", 50))
+    KEEP_DAYS = int(os.environ.get("BUILDER_KEEP_DAYS", 90))
+    ARCHIVE_DIR = os.environ.get("BUILDER_ARCHIVE_DIR", "archive")
+    BATCH_SIZE = 200
+    ORPHAN_GRACE_HOURS = 1
+
+    def __init__(self, archive_dir: str = None, store: LogStore = None, build_log_dir: str = None):
+        self.archive_dir = os.path.expanduser(archive_dir or self.ARCHIVE_DIR)
+        self.store = store or log_store
+        self.build_log_dir = os.path.expanduser(LogPipeline.BUILD_LOG_DIR if build_log_dir is None else build_log_dir)
+
+    def policy_for(self, application_name: str, db: Session) -> tuple:
+        """Returns (keep_builds, keep_days); None means no limit of that kind."""
+        policies = {policy.application_name: policy for policy in db.query(RetentionPolicy).filter(
+            RetentionPolicy.application_name.in_([application_name, self.DEFAULT_POLICY])
+        ).all()}
+        policy = policies.get(application_name) or policies.get(self.DEFAULT_POLICY)
+        if policy:
+            return policy.keep_builds, policy.keep_days
+        return self.KEEP_BUILDS, self.KEEP_DAYS
+
+    @staticmethod
+    def set_policy(application_name: str, keep_builds: int, keep_days: int, db: Session) -> RetentionPolicy:
+        policy = db.merge(RetentionPolicy(application_name=application_name, keep_builds=keep_builds,
+                                          keep_days=keep_days))
+        db.commit()
+        logger.info("Retention policy for '%s': keep %s build(s), %s day(s)", application_name, keep_builds, keep_days)
+        return policy
+
+    def expired_uuids(self, application_name: str, db: Session, now: datetime = None) -> list:
+        keep_builds, keep_days = self.policy_for(application_name, db)
+        cutoff = (now or datetime.now()) - timedelta(days=keep_days) if keep_days is not None else None
+        records = db.query(Application.uuid, Application.timestamp, Application.status).filter(
+            Application.application_name == application_name
+        ).order_by(Application.timestamp.desc()).all()
+        expired = []
+        latest_kept = False
+        for rank, (build_uuid, timestamp, status) in enumerate(records):
+            if status == "started":
+                continue
+            if not latest_kept:
+                # The newest finished record describes what is deployed: unbuild, status and resume need it
+                latest_kept = True
+                continue
+            if (keep_builds is not None and rank >= keep_builds) or (cutoff and timestamp and timestamp < cutoff):
+                expired.append(build_uuid)
+        return expired
+
+    @staticmethod
+    def row(obj, kind: str) -> dict:
+        return dict({column.name: getattr(obj, column.name) for column in obj.__table__.columns}, type=kind)
+
+    def write_archive(self, name: str, applications: list, steps: list) -> str:
+        folder = os.path.join(self.archive_dir, re.sub(r"[^A-Za-z0-9._@-]", "_", name) or "_")
+        os.makedirs(folder, exist_ok=True)
+        first = applications[0].uuid if applications else steps[0].uuid
+        path = os.path.join(folder, f"{datetime.now():%Y%m%dT%H%M%S}-{str(first)[:8]}.jsonl.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as archive:
+            for obj, kind in [(app, "application") for app in applications] + [(step, "step") for step in steps]:
+                archive.write(json.dumps(self.row(obj, kind), default=str) + "\n")
+        return path
+
+    def archive_builds(self, uuids: list, db: Session) -> tuple:
+        """Archives, rolls up and deletes the given records and their steps; returns (archive path, steps)."""
+        applications = db.query(Application).filter(Application.uuid.in_(uuids)).all()
+        steps = db.query(Step).filter(Step.uuid.in_(uuids)).order_by(Step.id).all()
+        if not applications and not steps:
+            return None, 0
+        name = applications[0].application_name if applications else "orphaned"
+        path = self.write_archive(name, applications, steps)
+
+        steps_by_uuid = {}
+        for step in steps:
+            steps_by_uuid.setdefault(step.uuid, []).append(step)
+        for app in applications:
+            db.merge(self.rollup_build(app, steps_by_uuid.get(app.uuid, []), archive=path))
+        for orphan_uuid in set(steps_by_uuid) - {app.uuid for app in applications}:
+            rollup = db.get(BuildRollup, orphan_uuid)
+            if rollup:
+                rollup.archive = path
+            else:
+                orphan_steps = steps_by_uuid[orphan_uuid]
+                placeholder = SimpleNamespace(uuid=orphan_uuid, application_name="", action="unknown",
+                                              status="orphaned", timestamp=min(
+                                                  (s.timestamp for s in orphan_steps if s.timestamp), default=None))
+                db.add(self.rollup_build(placeholder, orphan_steps, archive=path))
+
+        deleted_uuids = set(steps_by_uuid) | {app.uuid for app in applications}
+        log_refs = {step.log_ref for step in steps if step.log_ref}
+        db.query(Step).filter(Step.uuid.in_(uuids)).delete(synchronize_session=False)
+        db.query(Application).filter(Application.uuid.in_(uuids)).delete(synchronize_session=False)
+        db.commit()
+        self.delete_logs(deleted_uuids, log_refs, db)
+        return path, len(steps)
+
+    def delete_logs(self, uuids: set, log_refs: set, db: Session) -> None:
+        """Removes the log files of the deleted builds and the stored outputs no remaining step refers to."""
+        if self.build_log_dir:
+            for build_uuid in uuids:
+                try:
+                    os.unlink(os.path.join(self.build_log_dir, BuildFileHandler.file_name(str(build_uuid))))
+                except FileNotFoundError:
+                    pass
+        if not log_refs:
+            return
+        in_use = {ref for (ref,) in db.query(Step.log_ref).filter(Step.log_ref.in_(log_refs)).distinct().all()}
+        unused_since = time.time() - self.ORPHAN_GRACE_HOURS * 3600
+        deleted = sum(self.store.delete(ref, unused_since) for ref in log_refs - in_use)
+        logger.debug("Deleted %d stored log(s) of %d build(s)", deleted, len(uuids))
+
+    def orphan_uuids(self, db: Session, now: datetime = None) -> list:
+        cutoff = (now or datetime.now()) - timedelta(hours=self.ORPHAN_GRACE_HOURS)
+        return [build_uuid for (build_uuid,) in db.query(Step.uuid).filter(
+            ~Step.uuid.in_(db.query(Application.uuid))
+        ).group_by(Step.uuid).having(func.max(Step.timestamp) < cutoff).limit(self.BATCH_SIZE).all()]
+
+    def run(self, db: Session, application_name: str = None, now: datetime = None) -> RetentionReport:
+        started = time.monotonic()
+        names = [application_name] if application_name else [
+            name for (name,) in db.query(Application.application_name).distinct().all()]
+        archives, archived_builds, deleted_steps, orphan_steps = [], 0, 0, 0
+
+        for name in names:
+            expired = self.expired_uuids(name, db, now)
+            for start in range(0, len(expired), self.BATCH_SIZE):
+                batch = expired[start:start + self.BATCH_SIZE]
+                path, steps = self.archive_builds(batch, db)
+                archives.append(path)
+                archived_builds += len(batch)
+                deleted_steps += steps
+
+        if not application_name:
+            orphans = self.orphan_uuids(db, now)
+            while orphans:
+                path, steps = self.archive_builds(orphans, db)
+                archives.append(path)
+                orphan_steps += steps
+                orphans = self.orphan_uuids(db, now)
+
+        message = (f"Archived {archived_builds} build(s) with {deleted_steps} step(s) and {orphan_steps} orphaned "
+                   f"step(s) in {time.monotonic() - started:.1f}s")
+        logger.info("Retention run: %s", message)
+        return RetentionReport(status=BaseService.SUCCESS_STATE, message=message, archived_builds=archived_builds,
+                               deleted_steps=deleted_steps, orphan_steps=orphan_steps, archives=archives)
+
+    def run_forever(self, session_factory, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            db = session_factory()
+            try:
+                self.run(db)
+            except Exception:
+                logger.exception("Retention run failed")
+                db.rollback()
+            finally:
+                db.close()
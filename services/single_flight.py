@@ -0,0 +1,65 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one.
+
+    The first caller for a key (the leader) runs the function; callers arriving while it runs wait for it
+    and get the same result, or the same exception. The key is forgotten as soon as the leader finishes,
+    so a later call runs again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._flights
+
+    def waiting(self, key: str) -> int:
+        """Callers waiting on the key's in-flight run, 0 when there is none."""
+        with self._lock:
+            flight = self._flights.get(key)
+            return flight.followers if flight else 0
+
+    def do(self, key: str, fn) -> tuple:
+        """Returns (result of fn, True if the result was shared from another caller's flight)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+            else:
+                flight.followers += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            if flight.followers:
+                logger.info("Shared result of flight %s with %d waiting caller(s)", key[:12], flight.followers)
+            flight.done.set()
+        return flight.result, False
@@ -1,8 +1,14 @@
 import logging
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from database import SessionLocal
 from models import Application, Step
 from schemas import StatusResponse
 from services.base_service import BaseService
+from services.change_tracker import tracker
+from services.duration_stats import duration_stats
+from services.log_store import log_store
 
 logger = logging.getLogger(__name__)
 
@@ -10,15 +16,24 @@ logger = logging.getLogger(__name__)
 class StatusService:
     @staticmethod
     def get_status(app_name: str, db: Session) -> StatusResponse:
+        """Retrieves the status for the given application (see status_payload) as a validated StatusResponse."""
+        return StatusResponse(**StatusService.status_payload(app_name, db))
+
+    @staticmethod
+    def status_payload(app_name: str, db: Session) -> dict:
         """
-        Retrieves the status for the given application.
+        Retrieves the status for the given application, as the JSON-ready body of a StatusResponse.
 
         - If an active record (status == "started") exists (build or unbuild),
           it returns that record's steps.
         - Otherwise, it returns the steps from the most recent record (build or unbuild).
 
-        The response includes the record's uuid, application name, action, overall status, and a list of step details.
+        The response includes the record's uuid, application name, action, overall status, a list of step details
+        and the change token to pass back as wait_for_change.
         """
+        # Read the token before the records, so a change committed in between is never hidden behind it
+        change_token = tracker.token(app_name)
+
         # Query for an active record with a status 'started' (either build or unbuild)
         active_record = (
             db.query(Application)
@@ -44,14 +59,17 @@ class StatusService:
             )
             if not app_record:
                 logger.error("No record found for application '%s'.", app_name)
-                return StatusResponse(
-                    uuid="",
-                    application_name=app_name,
-                    action="",
-                    status=BaseService.FAILED_STATE,
-                    message=f"No record found for application '{app_name}'",
-                    steps=[]
-                )
+                return {
+                    "uuid": "",
+                    "application_name": app_name,
+                    "action": "",
+                    "status": BaseService.FAILED_STATE,
+                    "message": f"No record found for application '{app_name}'",
+                    "steps": [],
+                    "change_token": change_token,
+                    "progress_percent": None,
+                    "eta_seconds": None
+                }
             logger.info("No active record for '%s'. Using most recent record (UUID: %s, action: %s).",
                         app_name, app_record.uuid, app_record.action)
 
@@ -71,17 +89,75 @@ class StatusService:
                 "task_name": step.task_name,
                 "step_name": step.step_name,
                 "status": step.status,
-                "timestamp": step.timestamp.isoformat() if step.timestamp else None,
-                "uuid": step.uuid
+                "uuid": step.uuid,
+                "log_ref": step.log_ref,
+                "log_size": step.log_size,
+                "step_type": step.step_type,
+                "duration": step.duration
             })
 
-        response = StatusResponse(
-            uuid=str(app_record.uuid),
-            application_name=str(app_record.application_name),
-            action=str(app_record.action),
-            status=str(app_record.status),
-            message=str(app_record.status),
-            steps=steps_info
-        )
-        logger.debug("Status response constructed: %s", response)
-        return response
+        progress_percent, eta_seconds = None, None
+        if app_record.status == "started" and app_record.planned_steps:
+            progress_percent, eta_seconds = StatusService.estimate_progress(app_record, steps_records, db)
+
+        # Built field by field to match StatusResponse, so routes can serialise it without validating it again
+        payload = {
+            "uuid": str(app_record.uuid),
+            "application_name": str(app_record.application_name),
+            "action": str(app_record.action),
+            "status": str(app_record.status),
+            "message": str(app_record.status),
+            "steps": steps_info,
+            "change_token": change_token,
+            "progress_percent": progress_percent,
+            "eta_seconds": eta_seconds
+        }
+        logger.debug("Status of '%s' built with %d step(s)", app_name, len(steps_info))
+        return payload
+
+    @staticmethod
+    async def status_payload_async(app_name: str, db: AsyncSession) -> dict:
+        """
+        status_payload on an asyncio session: the queries are awaited on the event loop instead of holding a worker
+        thread. A duration model due for a rebuild is rebuilt on a worker thread first, so that large read never
+        runs on the loop.
+        """
+        if duration_stats.due():
+            await run_in_threadpool(StatusService.refresh_durations)
+        return await db.run_sync(lambda session: StatusService.status_payload(app_name, session))
+
+    @staticmethod
+    def refresh_durations() -> None:
+        db = SessionLocal()
+        try:
+            duration_stats.refresh(db)
+        finally:
+            db.close()
+
+    @staticmethod
+    def estimate_progress(app_record, steps_records: list, db: Session) -> tuple:
+        """(percent complete, seconds remaining) of a running build/unbuild from the historical step durations."""
+        duration_stats.refresh(db)
+        started_at = app_record.run_started_at
+        # Steps of earlier runs (before a resume, or of the build an unbuild reuses) do not count
+        current = [step for step in steps_records
+                   if started_at is None or (step.timestamp and step.timestamp >= started_at)]
+        return duration_stats.progress(app_record.planned_steps, len(current),
+                                       duration_stats.running_for(current, started_at))
+
+    @staticmethod
+    def read_step_log(step_id: int, db: Session, offset: int = 0, length: int = None):
+        """
+        Returns (bytes, total size) of a step's full output from offset, or None when the step does not exist.
+        Steps whose output stayed inline are served from the row.
+        """
+        step = db.query(Step).filter(Step.id == step_id).first()
+        if not step:
+            logger.error("No step found with id %s.", step_id)
+            return None
+        if step.log_ref:
+            return log_store.read(step.log_ref, offset, length), step.log_size
+        message = (step.status or {}).get("message") or ""
+        data = str(message).encode("utf-8")
+        end = None if length is None else offset + length
+        return data[offset:end], len(data)
@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+
+class StepExecutor:
+    """
+    Runs rendered step scripts for BaseService.call_subprocess, in the mode BUILDER_EXECUTION selects:
+
+      live    run the script with bash (the default)
+      record  run it, and append its exit code, output and timing to the replay bundle
+      replay  run nothing: play back a recorded run of the same script of the same resource
+
+    A bundle (BUILDER_REPLAY_BUNDLE) is a JSON Lines file with one recorded run per line. When a script was
+    recorded several times, replays take the recordings in turn, only those of a script with the same sha256 as the
+    one being replayed when there are any (a replay of a script that changed since it was recorded logs a warning
+    and is counted as a mismatch). A replay waits for the recorded duration divided by
+    BUILDER_REPLAY_SPEED (1 is real time, 0 does not wait), so builds keep their timing without touching AWS.
+    """
+    MODES = ("live", "record", "replay")
+    MODE = os.environ.get("BUILDER_EXECUTION", "live").lower()
+    BUNDLE = os.environ.get("BUILDER_REPLAY_BUNDLE", "replay.jsonl")
+    SPEED = float(os.environ.get("BUILDER_REPLAY_SPEED", 1))
+
+    def __init__(self, mode: str = None, bundle: str = None, speed: float = None):
+        self.mode = (mode or self.MODE).lower()
+        if self.mode not in self.MODES:
+            raise ValueError(f"Unknown execution mode '{self.mode}', expected one of {', '.join(self.MODES)}")
+        self.bundle = os.path.expanduser(bundle or self.BUNDLE)
+        self.speed = self.SPEED if speed is None else speed
+        self._lock = threading.Lock()
+        self._recordings = None  # (resource, script name) -> [recorded run, ...], loaded on the first replay
+        self._plays = {}  # (resource, script name, sha256 or None for any) -> runs played so far
+        self.recorded = 0
+        self.replayed = 0
+        self.replayed_seconds = 0.0  # Recorded time of the runs played back
+        self.mismatched = 0  # Replays of a script none of whose recordings has its sha256
+
+    @staticmethod
+    def key(resource_name: str, script_path: str) -> tuple:
+        # Only the file name: the resources folder of a recording may live elsewhere than the replay's
+        return resource_name, os.path.basename(script_path)
+
+    @staticmethod
+    def digest(script_path: str) -> str:
+        with open(script_path, "rb") as script:
+            return hashlib.sha256(script.read()).hexdigest()
+
+    def run(self, resource_name: str, script_path: str) -> subprocess.CompletedProcess:
+        if self.mode == "replay":
+            return self.replay(resource_name, script_path)
+        started_at = time.time()
+        started = time.monotonic()
+        process = subprocess.run(["bash", script_path], capture_output=True, text=True)
+        if self.mode == "record":
+            self.record(resource_name, script_path, process, time.monotonic() - started, started_at)
+        return process
+
+    def record(self, resource_name: str, script_path: str, process: subprocess.CompletedProcess, duration: float,
+               started_at: float) -> None:
+        resource, script_name = self.key(resource_name, script_path)
+        line = json.dumps({"resource": resource, "script": script_name, "sha256": self.digest(script_path),
+                           "returncode": process.returncode, "stdout": process.stdout, "stderr": process.stderr,
+                           "duration": round(duration, 3), "started_at": round(started_at, 3)})
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.bundle)), exist_ok=True)
+            with open(self.bundle, "a") as f:
+                f.write(line + "\n")
+            self.recorded += 1
+        logger.debug("Recorded %s of resource %s (exit %d, %.2fs)", script_name, resource, process.returncode, duration)
+
+    def load(self) -> dict:
+        recordings = {}
+        with open(self.bundle) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    recordings.setdefault((entry["resource"], entry["script"]), []).append(entry)
+        logger.info("Loaded %d recorded run(s) of %d script(s) from %s",
+                    sum(len(runs) for runs in recordings.values()), len(recordings), self.bundle)
+        return recordings
+
+    def replay(self, resource_name: str, script_path: str) -> subprocess.CompletedProcess:
+        key = self.key(resource_name, script_path)
+        try:
+            digest = self.digest(script_path)
+        except OSError:
+            digest = None
+        with self._lock:
+            if self._recordings is None:
+                self._recordings = self.load()
+            runs = self._recordings.get(key)
+            if runs:
+                # Recordings without a sha256 (e.g. hand-written bundles) stand in for any version of the script
+                matching = [run for run in runs if digest and run.get("sha256") == digest] or [
+                    run for run in runs if not run.get("sha256")]
+                play_key = key + (digest if matching else None,)
+                runs = matching or runs
+                entry = runs[self._plays.get(play_key, 0) % len(runs)]
+                self._plays[play_key] = self._plays.get(play_key, 0) + 1
+                self.replayed += 1
+                self.replayed_seconds += entry["duration"]
+                if not matching:
+                    self.mismatched += 1
+        if runs and not matching:
+            logger.warning("Replaying %s of resource %s from a recording of another version of the script "
+                           "(sha256 %s)", key[1], resource_name, digest)
+        if not runs:
+            logger.error("No recorded run of %s for resource %s in %s", key[1], resource_name, self.bundle)
+            return subprocess.CompletedProcess(["bash", script_path], 127, "",
+                                               f"No recorded run of {key[1]} for resource {resource_name}")
+        if self.speed > 0:
+            time.sleep(entry["duration"] / self.speed)
+        return subprocess.CompletedProcess(["bash", script_path], entry["returncode"], entry["stdout"], entry["stderr"])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mode": self.mode, "recorded": self.recorded, "replayed": self.replayed,
+                    "mismatched": self.mismatched, "replayed_seconds": round(self.replayed_seconds, 3)}
+
+
+step_executor = StepExecutor()
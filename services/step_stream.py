@@ -0,0 +1,81 @@
+import time
+import queue
+import logging
+import threading
+import orjson
+from fastapi.responses import StreamingResponse
+from database import SessionLocal
+from services.admission import admission
+from services.base_service import BaseService
+from services.log_pipeline import log_context
+
+logger = logging.getLogger(__name__)
+
+
+class StepStream:
+    """
+    A build or unbuild streamed as NDJSON: one "step" record per completed step, then one "summary" record.
+
+    The run gets its own thread and database session and hands each step result over through
+    BaseService.step_sink as it completes. At most QUEUE_SIZE records wait to be sent, so memory stays flat
+    however many steps the component has: the run waits for a slow client, and once the client has gone it
+    carries on without queueing anything.
+    """
+    QUEUE_SIZE = 64
+    PUT_TIMEOUT = 1.0  # Seconds between checks whether the client is still there
+    MEDIA_TYPE = "application/x-ndjson"
+
+    def __init__(self):
+        self.records = queue.Queue(self.QUEUE_SIZE)
+        self.closed = threading.Event()
+        self.steps = 0
+
+    def put(self, record) -> None:
+        while not self.closed.is_set():
+            try:
+                self.records.put(record, timeout=self.PUT_TIMEOUT)
+                return
+            except queue.Full:
+                continue
+
+    def step(self, result: dict) -> None:
+        """The step_sink of the streamed service."""
+        self.steps += 1
+        self.put(dict(result, record="step", index=self.steps))
+
+    def run(self, target, debug: bool = False) -> None:
+        """
+        Body of the run thread: target(db, step_sink) runs the build/unbuild and returns its response.
+        The caller has taken an admission slot for it, which is released here.
+        """
+        started = time.monotonic()
+        db = SessionLocal()
+        try:
+            with log_context(debug=debug):
+                summary = target(db, self.step).model_dump(exclude={"results"})
+        except Exception:
+            logger.exception("Streamed run failed")
+            summary = {"status": BaseService.FAILED_STATE, "message": "Internal server error"}
+        finally:
+            db.close()
+            admission.release(time.monotonic() - started)
+        summary.update(record="summary", steps=self.steps)
+        self.put(summary)
+        self.put(None)
+
+    def start(self, target, debug: bool = False) -> "StepStream":
+        threading.Thread(target=self.run, args=(target, debug), name="step-stream", daemon=True).start()
+        return self
+
+    def __iter__(self):
+        try:
+            while True:
+                record = self.records.get()
+                if record is None:
+                    return
+                yield orjson.dumps(record, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+        finally:
+            self.closed.set()
+
+    def response(self) -> StreamingResponse:
+        return StreamingResponse(iter(self), media_type=self.MEDIA_TYPE)
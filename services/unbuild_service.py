@@ -1,18 +1,23 @@
 import os
+import time
 import logging
 import uuid
+from datetime import datetime
 
 from sqlalchemy.orm import Session
 from services.base_service import BaseService
+from services.log_pipeline import log_context
+from services.resource_service import ResourceService
 from models import Application
-from schemas import UnBuildResponse
+from schemas import UnBuildResponse, TaskSelector
 
 logger = logging.getLogger(__name__)
 
 
 class UnbuildService(BaseService):
 
-    def destroy_task(self, resource_name: str, step: dict, envs: dict, db: Session, build_id: str) -> dict:
+    def destroy_task(self, resource_name: str, step: dict, envs: dict, db: Session, build_id: str, task: dict = None) -> dict:
+        started = time.monotonic()
         resource = resource_name
         resource_type = step.get("type")
         resource_path = os.path.expanduser(os.path.join(self.RESOURCES_FOLDER, resource))
@@ -38,9 +43,11 @@ class UnbuildService(BaseService):
         else:
             logger.warning("No destroy template for resource '%s'. Using existing destroy.sh if available.", resource)
 
-        result = self.call_subprocess(resource, destroy_script_path, build_id)
+        result = self.run_script(resource, destroy_script_path, build_id, step, envs, task)
         logger.debug("Destroy result for resource '%s': %s", resource, result)
-        self.update_status(resource, "destroy", result, db, build_id)
+        self.update_status(resource, "destroy", result, db, build_id, step_type=resource_type,
+                           duration=time.monotonic() - started,
+                           inventory=self.inventory_row(task, step, envs, build_id, ResourceService.DESTROYED))
         return result
 
     def execute_task(self, task: dict, db: Session, build_id: str) -> list:
@@ -65,17 +72,19 @@ class UnbuildService(BaseService):
 
             for step in steps:
                 try:
-                    result = self.destroy_task(resource_name, step, envs, db, build_id)
-                    results.append(result)
+                    with log_context(step=step.get("name")):
+                        result = self.destroy_task(resource_name, step, envs, db, build_id, task=task)
+                    self.keep_result(results, result, task, step.get("name"))
                 except Exception as e:
                     logger.error("Step '%s' failed with error: %s", step.get("name"), str(e))
                     return []  # Return an empty list if any step fails
 
         return self.flatten_list(results)
 
-    def unbuild(self, component: str, task_path: str, use_db: bool, db: Session) -> UnBuildResponse:
+    def unbuild(self, component: str, task_path: str, use_db: bool, db: Session, selector: TaskSelector = None) -> UnBuildResponse:
         logger.info("Starting unbuild for component: %s", component)
         results = []
+        self.application_name = component
 
         self.TASKS_FOLDER = os.path.expanduser(os.path.join(task_path, BaseService.TASKS_FOLDER))
 
@@ -142,12 +151,27 @@ class UnbuildService(BaseService):
                 results=results
             )
 
+        tasks = self.select_tasks(tasks, selector)
+        if not tasks:
+            logger.error("No task in '%s.yml' matches the selector.", component)
+            self.update_application_record(db, build_id, status="failed")
+            return UnBuildResponse(
+                status=BaseService.FAILED_STATE,
+                message=f"No task in {component}.yml matches the selector",
+                component=component,
+                uuid=build_id,
+                results=results
+            )
+        self.update_application_record(db, build_id, planned_steps=self.plan_steps(tasks, "unbuild"),
+                                       run_started_at=datetime.now())
+
         overall_error = False
 
         for task in tasks:
             resource_type = task.get("type")
             logger.debug("resource_type: '%s' ", resource_type)
-            task_results = self.execute_task(task, db, build_id)
+            with log_context(build=build_id, task=task.get("name")):
+                task_results = self.execute_task(task, db, build_id)
             if any(r.get("status") == BaseService.FAILED_STATE for r in task_results if isinstance(r, dict)):
                 overall_error = True
             results.extend(task_results)
@@ -165,7 +189,17 @@ class UnbuildService(BaseService):
             )
         else:
             logger.info("Unbuild process completed successfully for component: %s", component)
-            self.delete_application_record(db, build_id)
+            # After a selective unbuild, keep the record while other tasks of the build are still deployed
+            remaining = []
+            if selector and app_record:
+                unbuilt = {task.get("name") for task in tasks}
+                remaining = [name for name in (app_record.tasks_built or []) if name not in unbuilt]
+            if remaining:
+                # The record describes the live partial deployment again, not the unbuild
+                self.update_application_record(db, build_id, action="build", status=BaseService.SUCCESS_STATE,
+                                               tasks_built=remaining)
+            else:
+                self.delete_application_record(db, build_id)
             return UnBuildResponse(
                 status=BaseService.SUCCESS_STATE,
                 message=BaseService.UNBUILD_SUCCESS_MSG,
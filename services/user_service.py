@@ -0,0 +1,37 @@
+import logging
+from typing import Optional
+from sqlalchemy.orm import Session
+from auth import dummy_hash, hash_password, verify_password
+from models import User
+
+logger = logging.getLogger(__name__)
+
+
+class UserService:
+    """API users. Password checks are bcrypt and take tens of milliseconds: call them from a worker thread."""
+
+    @staticmethod
+    def authenticate(username: str, password: str, db: Session) -> Optional[User]:
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            verify_password(password, dummy_hash())
+            logger.warning("Token requested for unknown user '%s'", username)
+            return None
+        if not verify_password(password, user.hashed_password) or user.disabled:
+            logger.warning("Token refused for user '%s'", username)
+            return None
+        return user
+
+    @staticmethod
+    def create_user(username: str, password: str, db: Session) -> User:
+        user = User(username=username, hashed_password=hash_password(password), disabled=False)
+        db.add(user)
+        db.commit()
+        logger.info("User '%s' created", username)
+        return user
+
+    @staticmethod
+    def ensure_user(username: str, password: str, db: Session) -> None:
+        """Creates the user when it does not exist yet; an existing user keeps its password."""
+        if db.query(User.id).filter(User.username == username).first() is None:
+            UserService.create_user(username, password, db)
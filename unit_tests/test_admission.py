@@ -0,0 +1,76 @@
+import threading
+import unittest
+from unittest.mock import patch
+from services.admission import AdmissionController, AdmissionRejected
+
+
+class TestAdmissionController(unittest.TestCase):
+    def setUp(self):
+        self.controller = AdmissionController(max_running=1, max_queued=1, queue_timeout=0.05, adaptive=False)
+
+    def test_admits_up_to_limit(self):
+        controller = AdmissionController(max_running=2, adaptive=False)
+        controller.acquire()
+        controller.acquire()
+        self.assertEqual(controller.stats(), {"running": 2, "queued": 0, "limit": 2})
+        controller.release()
+        self.assertEqual(controller.stats()["running"], 1)
+
+    def test_queue_full_rejected(self):
+        self.controller.acquire()
+        self.controller._queue.append(0)  # someone already waiting
+        with self.assertRaises(AdmissionRejected) as ctx:
+            self.controller.acquire()
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+
+    def test_wait_timeout_rejected(self):
+        self.controller.acquire()
+        with self.assertRaises(AdmissionRejected):
+            self.controller.acquire()
+        self.assertEqual(self.controller.stats(), {"running": 1, "queued": 0, "limit": 1})
+
+    def test_waiter_admitted_after_release(self):
+        self.controller.acquire()
+        admitted = threading.Event()
+
+        def waiter():
+            self.controller.acquire(timeout=5)
+            admitted.set()
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        self.assertFalse(admitted.wait(0.05))
+        self.controller.release()
+        thread.join(5)
+        self.assertTrue(admitted.is_set())
+        self.assertEqual(self.controller.stats()["running"], 1)
+
+    def test_slot_releases_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.controller.slot():
+                raise ValueError("fail")
+        self.assertEqual(self.controller.stats()["running"], 0)
+
+    def test_capped_below_threadpool(self):
+        controller = AdmissionController(max_running=8, max_queued=32, adaptive=False, threadpool_size=40)
+        self.assertEqual((controller.max_running, controller.max_queued), (8, 24))
+        controller = AdmissionController(max_running=50, adaptive=False, threadpool_size=40)
+        self.assertEqual((controller.max_running, controller.max_queued), (32, 0))
+
+    def test_adaptive_limit_follows_load(self):
+        controller = AdmissionController(max_running=8, adaptive=True)
+        with patch.object(AdmissionController, "host_load_per_cpu", return_value=3.0), \
+                patch.object(AdmissionController, "host_free_memory_mb", return_value=4096):
+            with controller._cond:
+                self.assertEqual(controller.limit(), 4)
+
+    def test_adaptive_limit_low_memory(self):
+        controller = AdmissionController(max_running=8, max_queued=0, adaptive=True)
+        with patch.object(AdmissionController, "host_load_per_cpu", return_value=0.1), \
+                patch.object(AdmissionController, "host_free_memory_mb", return_value=10):
+            with self.assertRaises(AdmissionRejected):
+                controller.acquire()
+
+
+if __name__ == "__main__":
+    unittest.main()
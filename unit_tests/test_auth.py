@@ -0,0 +1,123 @@
+import time
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from jose import JWTError, jwt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import auth
+from auth import TokenCache, create_access_token, decode_token, hash_password, require_user, token_cache, verify_password
+from database import Base, get_db
+from models import User
+from routes import auth as auth_routes
+from services.user_service import UserService
+
+
+class TestPasswords(unittest.TestCase):
+    def test_hash_and_verify(self):
+        hashed = hash_password("s3cret")
+        self.assertTrue(hashed.startswith("$2b$"))
+        self.assertTrue(verify_password("s3cret", hashed))
+        self.assertFalse(verify_password("wrong", hashed))
+        self.assertFalse(verify_password("s3cret", "not-a-hash"))
+
+
+class TestTokens(unittest.TestCase):
+    def setUp(self):
+        token_cache.clear()
+
+    def test_token_expiry_is_utc(self):
+        claims = jwt.get_unverified_claims(create_access_token({"sub": "alice"}, timedelta(minutes=5)))
+        expected = (datetime.now(timezone.utc) + timedelta(minutes=5)).timestamp()
+        self.assertAlmostEqual(claims["exp"], expected, delta=5)
+
+    def test_decode_token_caches_verified_claims(self):
+        token = create_access_token({"sub": "alice"})
+        with patch("auth.jwt.decode", wraps=jwt.decode) as mock_decode:
+            self.assertEqual(decode_token(token)["sub"], "alice")
+            self.assertEqual(decode_token(token)["sub"], "alice")
+        self.assertEqual(mock_decode.call_count, 1)
+
+    def test_decode_token_rejects_bad_tokens(self):
+        with self.assertRaises(JWTError):
+            decode_token(create_access_token({"role": "none"}))  # No subject
+        with self.assertRaises(JWTError):
+            decode_token(create_access_token({"sub": "alice"}, timedelta(seconds=-1)))
+        with self.assertRaises(JWTError):
+            decode_token(jwt.encode({"sub": "alice", "exp": time.time() + 60}, "other-key", algorithm="HS256"))
+
+    def test_cache_expires_entries_and_is_bounded(self):
+        cache = TokenCache(max_entries=2)
+        cache.put("a", {"sub": "a", "exp": time.time() + 60})
+        cache.put("old", {"sub": "old", "exp": time.time() - 1})
+        self.assertIsNone(cache.get("old"))
+        cache.put("b", {"sub": "b", "exp": time.time() + 60})
+        cache.get("a")
+        cache.put("c", {"sub": "c", "exp": time.time() + 60})
+        self.assertEqual((cache.get("a")["sub"], cache.get("b"), cache.get("c")["sub"]), ("a", None, "c"))
+
+
+class TestRequireUser(unittest.TestCase):
+    def setUp(self):
+        token_cache.clear()
+        app = FastAPI()
+
+        @app.get("/who")
+        async def who(user=Depends(require_user)):
+            return {"user": user}
+
+        self.client = TestClient(app)
+
+    def test_requires_a_valid_bearer_token(self):
+        self.assertEqual(self.client.get("/who").status_code, 401)
+        self.assertEqual(self.client.get("/who", headers={"Authorization": "Bearer junk"}).status_code, 401)
+        token = create_access_token({"sub": "alice"})
+        response = self.client.get("/who", headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.json(), {"user": "alice"})
+
+    def test_disabled_auth(self):
+        with patch.object(auth, "AUTH_ENABLED", False):
+            self.assertIsNone(asyncio.run(require_user(None)))
+
+
+class TestTokenEndpoint(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        UserService.create_user("alice", "s3cret", self.db)
+        app = FastAPI()
+        app.include_router(auth_routes.router, prefix="/auth")
+        app.dependency_overrides[get_db] = lambda: self.db
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_issue_token(self):
+        response = self.client.post("/auth/token", json={"username": "alice", "password": "s3cret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(decode_token(response.json()["access_token"])["sub"], "alice")
+        self.assertEqual(response.json()["token_type"], "bearer")
+
+    def test_refuses_wrong_unknown_and_disabled_users(self):
+        self.assertEqual(self.client.post("/auth/token", json={"username": "alice", "password": "x"}).status_code, 401)
+        self.assertEqual(self.client.post("/auth/token", json={"username": "bob", "password": "x"}).status_code, 401)
+        user = self.db.query(User).filter(User.username == "alice").first()
+        user.disabled = True
+        self.db.commit()
+        self.assertIsNone(UserService.authenticate("alice", "s3cret", self.db))
+
+    def test_ensure_user_keeps_existing_password(self):
+        UserService.ensure_user("alice", "changed", self.db)
+        self.assertIsNotNone(UserService.authenticate("alice", "s3cret", self.db))
+        UserService.ensure_user("carol", "pw", self.db)
+        self.assertIsNotNone(UserService.authenticate("carol", "pw", self.db))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,6 +6,7 @@ import logging
 from datetime import datetime
 from services.base_service import BaseService
 from models import Step, Application
+from schemas import TaskSelector
 
 # Configure logger for testing (prints to console)
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -53,6 +54,10 @@ class DummyDB:
         # For our dummy DB, refresh does nothing.
         return obj
 
+    def merge(self, obj):
+        self.merged = getattr(self, "merged", []) + [obj]
+        return obj
+
     def delete(self, obj):
         if hasattr(obj, "application_name"):
             if obj in self.applications:
@@ -134,6 +139,28 @@ class TestBaseService(unittest.TestCase):
         self.assertEqual(step.uuid, "dummy-uuid")
         self.assertIsInstance(step.timestamp, datetime)
 
+    def test_update_status_records_type_and_duration(self):
+        db = DummyDB()
+        BaseService.update_status("res1", "step1", {"status": "success"}, db, "dummy-uuid",
+                                  step_type="terraform", duration=4.2)
+        self.assertEqual((db.steps[0].step_type, db.steps[0].duration), ("terraform", 4.2))
+
+    def test_plan_steps(self):
+        tasks = [
+            {"name": "net", "resource": "vpc", "type": "infrastructure",
+             "steps": [{"name": "deploy", "type": "cloudformation"}, {"name": "tag", "type": "custom"}]},
+            {"name": "cfg", "resource": "app", "type": "configuration", "steps": [{"name": "push", "type": "custom"}]},
+        ]
+        self.assertEqual(BaseService.plan_steps(tasks), [
+            {"task": "vpc", "step": "deploy", "type": "cloudformation"},
+            {"task": "vpc", "step": "tag", "type": "custom"},
+            {"task": "app", "step": "push", "type": "custom"},
+        ])
+        self.assertEqual(BaseService.plan_steps(tasks, "unbuild"), [
+            {"task": "vpc", "step": "destroy", "type": "cloudformation"},
+            {"task": "vpc", "step": "destroy", "type": "custom"},
+        ])
+
     def test_update_application_record(self):
         db = DummyDB()
         # Create a dummy Application object.
@@ -159,6 +186,16 @@ class TestBaseService(unittest.TestCase):
         db.applications.append(app)
         BaseService.delete_application_record(db, "dummy-uuid")
         self.assertEqual(len(db.applications), 0)
+        self.assertEqual(db.merged[0].uuid, "dummy-uuid")
+
+    def test_rollup_build(self):
+        app = Application(uuid="u1", application_name="app", action="build", status="error",
+                          timestamp=datetime(2024, 1, 1, 10, 0, 0))
+        steps = [Step(status={"status": "success"}, timestamp=datetime(2024, 1, 1, 10, 1, 0)),
+                 Step(status={"status": "error"}, timestamp=datetime(2024, 1, 1, 10, 2, 30))]
+        rollup = BaseService.rollup_build(app, steps, archive="a.jsonl.gz")
+        self.assertEqual((rollup.step_count, rollup.failed_steps, rollup.duration_seconds), (2, 1, 150.0))
+        self.assertEqual(rollup.archive, "a.jsonl.gz")
 
     def test_load_config_merges_envs(self):
         # Create temp directories and files
@@ -189,5 +226,45 @@ class TestBaseService(unittest.TestCase):
         os.rmdir(component_dir)
         os.rmdir(temp_dir)
 
+    def _tasks(self):
+        return [
+            {"name": "network", "resource": "vpc", "group": "base"},
+            {"name": "bucket", "resource": "s3", "group": "storage"},
+            {"name": "app", "resource": "ec2", "group": "compute"},
+            {"name": "dns", "resource": "route53", "group": "compute"},
+        ]
+
+    @staticmethod
+    def _names(tasks):
+        return [task["name"] for task in tasks]
+
+    def test_select_tasks_without_selector(self):
+        self.assertEqual(BaseService.select_tasks(self._tasks(), None), self._tasks())
+
+    def test_select_tasks_by_group_name_and_resource(self):
+        selector = TaskSelector(groups=["storage"], tasks=["dns"], resources=["vpc"])
+        self.assertEqual(self._names(BaseService.select_tasks(self._tasks(), selector)), ["network", "bucket", "dns"])
+
+    def test_select_tasks_exclude_wins(self):
+        selector = TaskSelector(groups=["compute"], exclude_tasks=["dns"])
+        self.assertEqual(self._names(BaseService.select_tasks(self._tasks(), selector)), ["app"])
+        selector = TaskSelector(exclude_groups=["compute"])
+        self.assertEqual(self._names(BaseService.select_tasks(self._tasks(), selector)), ["network", "bucket"])
+
+    def test_select_tasks_upstream_follows_file_order(self):
+        selector = TaskSelector(tasks=["bucket"], upstream=True)
+        self.assertEqual(self._names(BaseService.select_tasks(self._tasks(), selector)), ["network", "bucket"])
+        selector = TaskSelector(tasks=["bucket"], downstream=True)
+        self.assertEqual(self._names(BaseService.select_tasks(self._tasks(), selector)), ["bucket", "app", "dns"])
+
+    def test_select_tasks_with_depends_on(self):
+        tasks = self._tasks()
+        tasks[2]["depends_on"] = ["network"]
+        tasks[3]["depends_on"] = ["app"]
+        selector = TaskSelector(tasks=["dns"], upstream=True)
+        self.assertEqual(self._names(BaseService.select_tasks(tasks, selector)), ["network", "app", "dns"])
+        selector = TaskSelector(tasks=["network"], downstream=True)
+        self.assertEqual(self._names(BaseService.select_tasks(tasks, selector)), ["network", "app", "dns"])
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,158 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+from services.batch_service import BatchScheduler, BatchBuildService, BatchJob
+from schemas import BatchBuildRequest, BatchComponent
+
+
+def component(name, priority=None):
+    return BatchComponent(component=name, env_path="/tmp", resource_path="/tmp", task_path="/tmp", priority=priority)
+
+
+class TestBatchScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = BatchScheduler(max_workers=1)
+
+    def _queue(self, batch_id, submitter, priority, names, limit=10):
+        # Queue jobs without starting the worker threads
+        jobs = [BatchJob(batch_id, submitter, BatchScheduler.PRIORITY_CLASSES[priority], component(name),
+                         next(self.scheduler._counter), None, None) for name in names]
+        self.scheduler._batches[batch_id] = jobs
+        self.scheduler._limits[batch_id] = limit
+        self.scheduler._pending.extend(jobs)
+        return jobs
+
+    def _drain(self):
+        order = []
+        job = self.scheduler._next_job()
+        while job:
+            order.append(job.request.component)
+            job = self.scheduler._next_job()
+        return order
+
+    def test_priority_classes(self):
+        self._queue("b1", "alice", "low", ["low1"])
+        self._queue("b2", "alice", "normal", ["normal1"])
+        self._queue("b3", "alice", "high", ["high1"])
+        self.assertEqual(self._drain(), ["high1", "normal1", "low1"])
+
+    def test_fair_share_between_submitters(self):
+        self._queue("b1", "alice", "normal", ["a1", "a2", "a3"])
+        self._queue("b2", "bob", "normal", ["b1", "b2"])
+        # alice and bob alternate while both have running builds
+        self.assertEqual(self._drain(), ["a1", "b1", "a2", "b2", "a3"])
+
+    def test_per_batch_limit(self):
+        self._queue("b1", "alice", "high", ["a1", "a2"], limit=1)
+        self._queue("b2", "bob", "low", ["b1"])
+        self.assertEqual(self._drain(), ["a1", "b1"])
+
+    def test_priority_aging(self):
+        jobs = self._queue("b1", "alice", "low", ["old-low"])
+        self._queue("b2", "alice", "normal", ["normal1"])
+        jobs[0].enqueued -= BatchScheduler.PRIORITY_AGING_SECONDS * 2
+        self.assertEqual(self._drain()[0], "old-low")
+
+    def test_submit_runs_jobs_and_completes_batch(self):
+        scheduler = BatchScheduler(max_workers=3)
+        lock = threading.Lock()
+        running = {"now": 0, "peak": 0}
+        done = threading.Event()
+
+        def runner(job):
+            with lock:
+                running["now"] += 1
+                running["peak"] = max(running["peak"], running["now"])
+            threading.Event().wait(0.02)
+            with lock:
+                running["now"] -= 1
+            job.state = "success"
+
+        completed = []
+
+        def on_complete(batch_id, jobs):
+            completed.append((batch_id, [job.state for job in jobs]))
+            done.set()
+
+        scheduler.submit("b1", "alice", "normal", 2, [component(f"c{i}") for i in range(5)], runner, on_complete)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(completed, [("b1", ["success"] * 5)])
+        self.assertLessEqual(running["peak"], 2)
+
+
+class TestBatchBuildService(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.scheduler = MagicMock()
+        self.service = BatchBuildService(session_factory=lambda: self.db, batch_scheduler=self.scheduler)
+
+    def test_submit_rejects_unknown_priority(self):
+        request = BatchBuildRequest(submitter="ci", priority="urgent", components=[component("c1")])
+        response = self.service.submit(request, self.db)
+        self.assertEqual(response.status, self.service.FAILED_STATE)
+        self.assertEqual(response.uuid, "")
+        self.scheduler.submit.assert_not_called()
+
+    def test_submit_rejects_duplicates(self):
+        request = BatchBuildRequest(submitter="ci", components=[component("c1"), component("c1")])
+        response = self.service.submit(request, self.db)
+        self.assertEqual(response.status, self.service.FAILED_STATE)
+
+    def test_submit_queues_components(self):
+        request = BatchBuildRequest(submitter="ci", priority="high", components=[component("c1"), component("c2")])
+        batch = MagicMock()
+        batch.application_name = "batch:ci"
+        batch.status = "started"
+        batch.tasks_built = ["c1", "c2"]
+        self.db.query().filter().first.return_value = batch
+        self.db.query().filter().all.return_value = []
+        self.scheduler.jobs.return_value = []
+        response = self.service.submit(request, self.db)
+        self.assertTrue(response.uuid)
+        self.assertEqual(response.submitter, "ci")
+        args = self.scheduler.submit.call_args.args
+        self.assertEqual(args[1:4], ("ci", "high", 4))
+        self.db.add.assert_called_once()
+
+    def test_status_aggregates_children(self):
+        batch = MagicMock()
+        batch.application_name = "batch:ci"
+        batch.status = "started"
+        batch.tasks_built = ["c1", "c2", "c3"]
+        self.db.query().filter().first.return_value = batch
+        jobs = []
+        for name, state in (("c1", "success"), ("c2", "started"), ("c3", "queued")):
+            job = BatchJob("b1", "ci", 1, component(name), 0, None, None)
+            job.state = state
+            jobs.append(job)
+        self.scheduler.jobs.return_value = jobs
+        response = self.service.status("b1", self.db)
+        self.assertEqual(response.counts, {"success": 1, "started": 1, "queued": 1})
+        self.assertEqual(response.message, "1/3 build(s) finished")
+
+    def test_status_from_database(self):
+        batch = MagicMock()
+        batch.application_name = "batch:ci"
+        batch.status = "error"
+        batch.tasks_built = ["c1", "c2"]
+        child = MagicMock()
+        child.application_name = "c1"
+        child.uuid = "u1"
+        child.status = "success"
+        self.db.query().filter().first.return_value = batch
+        self.db.query().filter().all.return_value = [child]
+        self.scheduler.jobs.return_value = []
+        response = self.service.status("b1", self.db)
+        self.assertEqual([(b.component, b.status) for b in response.builds], [("c1", "success"), ("c2", "error")])
+
+    def test_run_job_links_child_build(self):
+        job = BatchJob("b1", "ci", 1, component("c1"), 0, None, None)
+        with unittest.mock.patch("services.batch_service.BuildService.build") as mock_build:
+            mock_build.return_value = MagicMock(uuid="u1", status="success", message="ok")
+            self.service.run_job(job)
+        self.assertEqual(mock_build.call_args.kwargs["parent_uuid"], "b1")
+        self.assertEqual((job.uuid, job.state), ("u1", "success"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,11 @@
+import time
+import threading
 import unittest
+from contextlib import contextmanager
 from unittest.mock import MagicMock, patch
 from services.build_service import BuildService
 from models import Application
-from schemas import BuildResponse
+from schemas import BuildResponse, TaskSelector
 
 class TestBuildService(unittest.TestCase):
     def setUp(self):
@@ -98,5 +101,181 @@ class TestBuildService(unittest.TestCase):
         response = self.bs.build("mycomponent", "/tmp/env", "/tmp/res", "/tmp/task", db)
         self.assertEqual(response.status, self.bs.FAILED_STATE)
 
+    @patch('services.build_service.BuildService.load_yaml')
+    @patch('services.build_service.BuildService.run_tasks')
+    def test_build_selected_tasks(self, mock_run_tasks, mock_load_yaml):
+        db = MagicMock()
+        db.query().filter().first.return_value = None
+        mock_load_yaml.return_value = [{"name": "task1", "group": "a"}, {"name": "task2", "group": "b"}]
+        self.bs.build("mycomponent", "/tmp/env", "/tmp/res", "/tmp/task", db, selector=TaskSelector(groups=["b"]))
+        args = mock_run_tasks.call_args[0]
+        self.assertEqual(args[1], [{"name": "task2", "group": "b"}])
+        self.assertEqual(args[4].tasks_built, ["task2"])
+
+    @patch('services.build_service.BuildService.load_yaml', return_value=[{"name": "task1", "group": "a"}])
+    def test_build_selector_matches_nothing(self, mock_load_yaml):
+        db = MagicMock()
+        db.query().filter().first.return_value = None
+        response = self.bs.build("mycomponent", "/tmp/env", "/tmp/res", "/tmp/task", db, selector=TaskSelector(tasks=["nope"]))
+        self.assertEqual(response.status, self.bs.FAILED_STATE)
+        db.add.assert_not_called()
+
+    @patch('services.build_service.BuildService.load_config', return_value={"env": "val"})
+    @patch('services.build_service.BuildService.load_yaml', return_value=[{"name": "task1", "resource": "res1"}])
+    @patch('services.build_service.BuildService.start_build')
+    def test_build_identical_requests_share_build(self, mock_start_build, mock_load_yaml, mock_load_config):
+        db = MagicMock()
+        shared = BuildResponse(component="mycomponent", status="success", message="ok", uuid="u1", results=[])
+        with patch.object(BuildService.in_flight_builds, 'do', return_value=(shared, True)) as mock_do:
+            response = self.bs.build("mycomponent", "/tmp/env", "/tmp/res", "/tmp/task", db)
+        self.assertIs(response, shared)
+        key = mock_do.call_args[0][0]
+        self.assertEqual(key, self.bs.build_key("mycomponent", mock_load_yaml.return_value, {"task1": {"env": "val"}}))
+        other = BuildService()
+        other.configure_folders("/tmp/env", "/tmp/res", "/tmp/task")
+        self.assertNotEqual(key, other.build_key("mycomponent", mock_load_yaml.return_value, {"task1": {"env": "new"}}))
+        mock_start_build.assert_not_called()
+
+    @patch('services.build_service.BuildService.load_config', return_value={"env": "val"})
+    @patch('services.build_service.BuildService.load_yaml', return_value=[{"name": "task1", "resource": "res1"}])
+    @patch('services.build_service.BuildService.start_build')
+    def test_only_the_leader_takes_a_slot(self, mock_start_build, mock_load_yaml, mock_load_config):
+        release = threading.Event()
+        slots = []
+
+        @contextmanager
+        def slot():
+            slots.append(1)
+            yield
+
+        def start_build(*args, **kwargs):
+            release.wait(5)
+            return BuildResponse(component="mycomponent", status="success", message="ok", uuid="u1", results=[])
+
+        mock_start_build.side_effect = start_build
+        # configure_folders is patched out, so every request keeps the default folders
+        key = BuildService().build_key("mycomponent", mock_load_yaml.return_value, {"task1": {"env": "val"}})
+
+        def request():
+            service = BuildService()
+            service.slot = slot
+            responses.append(service.build("mycomponent", "envs", "resources", "tasks", MagicMock()))
+
+        responses = []
+        with patch.object(BuildService, 'configure_folders'):
+            threads = [threading.Thread(target=request) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + 5
+            while BuildService.in_flight_builds.waiting(key) < 2 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(len(slots), 1)
+        self.assertEqual(mock_start_build.call_count, 1)
+        self.assertEqual([response.uuid for response in responses], ["u1"] * 3)
+
+    @patch('services.build_service.BuildService.render_template', return_value="rendered")
+    @patch('os.path.exists', return_value=True)
+    @patch('builtins.open', new_callable=unittest.mock.mock_open)
+    def test_render_step_in_memory(self, mock_open, mock_exists, mock_render_template):
+        rendered = self.bs.render_step("myresource", {"type": "cloudformation"}, {})
+        self.assertEqual(list(rendered.values()), ["rendered", "rendered"])
+        self.assertTrue(next(iter(rendered)).endswith(self.bs.DEPLOY_CFN_SCRIPT))
+        mock_open.assert_not_called()
+
+    def _step_record(self, task_name, step_name, status, input_hash=None):
+        record = MagicMock()
+        record.task_name = task_name
+        record.step_name = step_name
+        record.status = {"status": status}
+        record.input_hash = input_hash
+        return record
+
+    @patch('services.build_service.BuildService.load_config', return_value={"env": "val"})
+    @patch('services.build_service.BuildService.render_step', return_value={"/r/deploy_cfn.sh": "script"})
+    def test_find_resume_point(self, mock_render_step, mock_load_config):
+        db = MagicMock()
+        input_hash = self.bs.rendered_fingerprint({"/r/deploy_cfn.sh": "script"})
+        db.query().filter().order_by().all.return_value = [
+            self._step_record("res1", "step1", "success", input_hash),
+            self._step_record("res1", "step2", "error", input_hash),
+        ]
+        tasks = [{"name": "task1", "resource": "res1", "steps": [{"name": "step1"}, {"name": "step2"}]},
+                 {"name": "task2", "resource": "res2", "steps": [{"name": "step1"}]}]
+        self.assertEqual(self.bs.find_resume_point(tasks, db, "buildid"), (0, 1))
+
+    @patch('services.build_service.BuildService.load_config', return_value={"env": "val"})
+    @patch('services.build_service.BuildService.render_step', return_value={"/r/deploy_cfn.sh": "changed"})
+    def test_find_resume_point_inputs_changed(self, mock_render_step, mock_load_config):
+        db = MagicMock()
+        input_hash = self.bs.rendered_fingerprint({"/r/deploy_cfn.sh": "script"})
+        db.query().filter().order_by().all.return_value = [self._step_record("res1", "step1", "success", input_hash)]
+        tasks = [{"name": "task1", "resource": "res1", "steps": [{"name": "step1"}, {"name": "step2"}]}]
+        with self.assertRaises(RuntimeError):
+            self.bs.find_resume_point(tasks, db, "buildid")
+
+    def _failed_build(self, status="error"):
+        app = MagicMock()
+        app.uuid = "buildid"
+        app.application_name = "mycomponent"
+        app.action = "build"
+        app.status = status
+        app.task_hash = "taskhash"
+        app.tasks_built = None
+        return app
+
+    def test_resume_requires_failed_build(self):
+        db = MagicMock()
+        db.query().filter().first.side_effect = [self._failed_build(status="success")]
+        response = self.bs.resume("buildid", "/tmp/env", "/tmp/res", "/tmp/task", db)
+        self.assertEqual(response.status, self.bs.FAILED_STATE)
+        self.assertIn("Only failed builds", response.message)
+
+    @patch('services.build_service.BuildService.file_fingerprint', return_value="otherhash")
+    @patch('services.build_service.BuildService.load_yaml', return_value=[{"name": "task1"}])
+    def test_resume_task_file_changed(self, mock_load_yaml, mock_file_fingerprint):
+        db = MagicMock()
+        db.query().filter().first.side_effect = [self._failed_build(), None]
+        response = self.bs.resume("buildid", "/tmp/env", "/tmp/res", "/tmp/task", db)
+        self.assertEqual(response.status, self.bs.FAILED_STATE)
+        self.assertIn("changed", response.message)
+
+    @patch('services.build_service.BuildService.run_tasks')
+    @patch('services.build_service.BuildService.find_resume_point', return_value=(0, 1))
+    @patch('services.build_service.BuildService.file_fingerprint', return_value="taskhash")
+    @patch('services.build_service.BuildService.load_yaml')
+    def test_resume_runs_remaining_steps(self, mock_load_yaml, mock_file_fingerprint, mock_find, mock_run_tasks):
+        db = MagicMock()
+        app = self._failed_build()
+        db.query().filter().first.side_effect = [app, None]
+        mock_load_yaml.return_value = [
+            {"name": "task1", "resource": "res1", "steps": [{"name": "step1"}, {"name": "step2"}]},
+            {"name": "task2", "resource": "res2", "steps": [{"name": "step1"}]},
+        ]
+        self.bs.resume("buildid", "/tmp/env", "/tmp/res", "/tmp/task", db)
+        self.assertEqual(app.status, "started")
+        args, kwargs = mock_run_tasks.call_args
+        remaining = args[1]
+        self.assertEqual([t["name"] for t in remaining], ["task1", "task2"])
+        self.assertEqual(remaining[0]["steps"], [{"name": "step2"}])
+        self.assertEqual(kwargs["tasks_built"], ["task1", "task2"])
+
+    @patch('services.build_service.BuildService.run_tasks')
+    @patch('services.build_service.BuildService.find_resume_point', return_value=(0, 0))
+    @patch('services.build_service.BuildService.file_fingerprint', return_value="taskhash")
+    @patch('services.build_service.BuildService.load_yaml', return_value=[{"name": "task1", "steps": [{"name": "s1"}]}])
+    def test_resume_claimed_meanwhile(self, mock_load_yaml, mock_file_fingerprint, mock_find, mock_run_tasks):
+        db = MagicMock()
+        app = self._failed_build()
+        db.query().filter().first.side_effect = [app, None]
+        # Another resume of the same build claimed the record after the first checks
+        db.refresh.side_effect = lambda record: setattr(record, "status", "started")
+        response = self.bs.resume("buildid", "/tmp/env", "/tmp/res", "/tmp/task", db)
+        self.assertIn("already in progress", response.message)
+        mock_run_tasks.assert_not_called()
+        db.commit.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from services.catalog_service import CatalogService
+
+TASKS = """
+- name: task1
+  resource: res1
+  group: g1
+  environment: np
+  steps:
+    - name: step1
+      type: shell
+      action_script: run.sh
+"""
+
+
+class TestCatalogService(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        for folder in ("tasks", "environments/res1", "resources/res1"):
+            os.makedirs(os.path.join(self.root, folder))
+        self.write("tasks/comp.yml", TASKS)
+        self.write("environments/np.yml", "region: ap-southeast-2\n")
+        self.write("resources/res1/run.sh.j2", "echo hi\n")
+        CatalogService.indexes.clear()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, relative_path, content):
+        path = os.path.join(self.root, relative_path)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def components(self, component=None):
+        return CatalogService().components(self.root, self.root, self.root, component=component)
+
+    def test_lists_components(self):
+        response = self.components()
+        self.assertEqual(response.status, "success")
+        info = response.components[0]
+        self.assertEqual((info.component, info.tasks, info.groups, info.resources, info.environments),
+                         ("comp", ["task1"], ["g1"], ["res1"], ["np"]))
+        self.assertEqual(info.missing_files, [os.path.join(self.root, "environments", "res1", "np.yml")])
+        self.assertEqual(response.environments, ["np"])
+        self.assertEqual(response.resources, ["res1"])
+
+    def test_unknown_component(self):
+        self.assertEqual(self.components("nope").status, "error")
+
+    def test_rescan_only_reindexes_changed_components(self):
+        self.write("tasks/other.yml", TASKS.replace("res1", "res2"))
+        self.components()
+        with patch.object(CatalogService, "SCAN_INTERVAL", 0), \
+                patch.object(CatalogService, "index_component", autospec=True,
+                             side_effect=CatalogService.index_component) as mock_index:
+            self.write("environments/res1/np.yml", "bucket: b\n")
+            response = self.components("comp")
+        self.assertEqual([call.args[1] for call in mock_index.call_args_list], ["comp"])
+        self.assertEqual(response.components[0].missing_files, [])
+
+    def test_rescan_is_rate_limited(self):
+        self.components()
+        self.write("tasks/other.yml", TASKS)
+        self.assertEqual([c.component for c in self.components().components], ["comp"])
+        with patch.object(CatalogService, "SCAN_INTERVAL", 0):
+            self.assertEqual([c.component for c in self.components().components], ["comp", "other"])
+
+    def test_scan_runs_outside_the_lock(self):
+        original = CatalogService.index_component
+
+        def index_component(service, component, yaml_path):
+            self.assertFalse(CatalogService.indexes_lock.locked())
+            return original(service, component, yaml_path)
+
+        with patch.object(CatalogService, "index_component", autospec=True, side_effect=index_component) as mock_index:
+            self.assertEqual([c.component for c in self.components().components], ["comp"])
+        mock_index.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
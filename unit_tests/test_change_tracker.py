@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models import Application, Step
+from services.change_tracker import ChangeTracker, track_changes
+
+
+class TestChangeTracker(unittest.TestCase):
+    def setUp(self):
+        self.tracker = ChangeTracker()
+
+    def test_tokens_grow(self):
+        first = self.tracker.token("app")
+        bumped = self.tracker.bump("app")
+        self.assertGreater(bumped, first)
+        self.assertGreater(self.tracker.bump("app"), bumped)
+        self.assertEqual(self.tracker.token("other"), first)
+
+    def test_wait_returns_immediately_for_old_token(self):
+        token = self.tracker.token("app")
+        self.tracker.bump("app")
+        self.assertNotEqual(asyncio.run(self.tracker.wait("app", token, 5)), token)
+
+    def test_wait_times_out(self):
+        token = self.tracker.token("app")
+        self.assertEqual(asyncio.run(self.tracker.wait("app", token, 0.01)), token)
+        self.assertFalse(self.tracker._waiters)
+
+    def test_wait_woken_from_other_thread(self):
+        token = self.tracker.token("app")
+        timer = threading.Timer(0.05, self.tracker.bump, args=("app",))
+        timer.start()
+        self.assertGreater(asyncio.run(self.tracker.wait("app", token, 5)), token)
+        timer.join()
+
+
+class TestTrackChanges(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        self.session_factory = sessionmaker(bind=engine)
+        self.tracker = ChangeTracker()
+        track_changes(self.session_factory, self.tracker)
+
+    def test_commits_bump_application(self):
+        token = self.tracker.token("app")
+        db = self.session_factory()
+        db.add(Application(uuid="u1", application_name="app", action="build", status="started"))
+        db.commit()
+        after_record = self.tracker.token("app")
+        self.assertGreater(after_record, token)
+
+        db.add(Step(task_name="t", step_name="s", status={}, uuid="u1"))
+        db.commit()
+        self.assertGreater(self.tracker.token("app"), after_record)
+
+    def test_step_of_unknown_build_is_looked_up(self):
+        db = self.session_factory()
+        db.add(Application(uuid="u1", application_name="app", action="build", status="started"))
+        db.commit()
+        self.tracker._names.clear()
+        token = self.tracker.token("app")
+        db.add(Step(task_name="t", step_name="s", status={}, uuid="u1"))
+        db.commit()
+        self.assertGreater(self.tracker.token("app"), token)
+
+    def test_rollback_does_not_bump(self):
+        token = self.tracker.token("app")
+        db = self.session_factory()
+        db.add(Application(uuid="u1", application_name="app", action="build", status="started"))
+        db.flush()
+        db.rollback()
+        self.assertEqual(self.tracker.token("app"), token)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models import Step
+from services.duration_stats import DurationStats
+
+
+class TestDurationStats(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.stats = DurationStats()
+
+    def tearDown(self):
+        self.db.close()
+
+    def add_steps(self, build_uuid, *steps, status="success"):
+        for task_name, step_name, step_type, duration in steps:
+            self.db.add(Step(task_name=task_name, step_name=step_name, step_type=step_type, duration=duration,
+                             status={"status": status}, uuid=build_uuid))
+        self.db.commit()
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(DurationStats.percentile(values, 50), 50)
+        self.assertEqual(DurationStats.percentile(values, 95), 95)
+        self.assertEqual(DurationStats.percentile([7], 95), 7)
+
+    def test_estimate_falls_back_to_type_and_overall(self):
+        for i, duration in enumerate([10.0, 20.0, 30.0]):
+            self.add_steps(f"b{i}", ("vpc", "deploy", "cloudformation", duration), ("app", "apply", "terraform", 100.0))
+        self.add_steps("failed", ("vpc", "deploy", "cloudformation", 1.0), status="error")
+        self.stats.refresh(self.db)
+
+        self.assertEqual(self.stats.estimate("vpc", "deploy", "cloudformation"), 20.0)
+        self.assertEqual(self.stats.estimate("db", "deploy", "cloudformation"), 20.0)
+        self.assertEqual(self.stats.estimate("db", "script", "custom"), 30.0)
+        self.assertIsNone(DurationStats().estimate("vpc", "deploy", "cloudformation"))
+
+    def test_refresh_is_rate_limited(self):
+        self.stats.refresh(self.db)
+        self.add_steps("b1", ("vpc", "deploy", "cloudformation", 10.0))
+        self.stats.refresh(self.db)
+        self.assertIsNone(self.stats.overall)
+        self.stats.refresh(self.db, force=True)
+        self.assertEqual(self.stats.overall["samples"], 1)
+        self.assertFalse(self.stats.due())
+
+    def test_refresh_does_not_wait_for_another_rebuild(self):
+        self.add_steps("b1", ("vpc", "deploy", "cloudformation", 10.0))
+        with self.stats._lock:
+            self.stats.refresh(self.db)
+        self.assertIsNone(self.stats.overall)
+        self.assertTrue(self.stats.due())
+
+    def test_progress(self):
+        self.add_steps("b1", ("vpc", "deploy", "cloudformation", 30.0), ("app", "apply", "terraform", 90.0))
+        self.stats.refresh(self.db)
+        planned = [{"task": "vpc", "step": "deploy", "type": "cloudformation"},
+                   {"task": "app", "step": "apply", "type": "terraform"}]
+        self.assertEqual(self.stats.progress(planned, 0, 10.0), (8.3, 110.0))
+        self.assertEqual(self.stats.progress(planned, 1, 60.0), (75.0, 30.0))
+        # An overrunning step is never assumed to be done
+        self.assertEqual(self.stats.progress(planned, 1, 200.0), (99.0, 0.0))
+        self.assertEqual(DurationStats().progress(planned, 1, 0.0), (50.0, None))
+        self.assertEqual(self.stats.progress([], 0, 0.0), (None, None))
+
+    def test_running_for(self):
+        now = datetime(2024, 1, 1, 12, 0, 0)
+        steps = [SimpleNamespace(timestamp=now - timedelta(seconds=30)), SimpleNamespace(timestamp=None)]
+        self.assertEqual(DurationStats.running_for(steps, now - timedelta(seconds=90), now), 30.0)
+        self.assertEqual(DurationStats.running_for([], now - timedelta(seconds=90), now), 90.0)
+        self.assertEqual(DurationStats.running_for([], None, now), 0.0)
+
+    def test_slowest(self):
+        self.add_steps("b1", ("vpc", "deploy", "cloudformation", 30.0), ("vpc", "outputs", "custom", 5.0),
+                       ("app", "apply", "terraform", 20.0))
+        self.add_steps("b2", ("vpc", "deploy", "cloudformation", 50.0), ("app", "apply", "terraform", 40.0))
+        tasks = self.stats.slowest(self.db, group_by="task", metric="p95")
+        self.assertEqual([(entry["task_name"], entry["p95"], entry["samples"]) for entry in tasks],
+                         [("vpc", 50.0, 2), ("app", 40.0, 2)])
+        steps = self.stats.slowest(self.db, group_by="step", metric="mean", limit=2)
+        self.assertEqual([(entry["task_name"], entry["step_name"], entry["mean"]) for entry in steps],
+                         [("vpc", "deploy", 40.0), ("app", "apply", 30.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -37,5 +37,41 @@ class TestEnvironmentService(unittest.TestCase):
         self.assertEqual(resp.environment, {})
         self.assertIn("not found", resp.message)
 
+    @patch('services.environment_service.file_stamp', return_value=(1, 10))
+    @patch.object(EnvironmentService, 'load_yaml', return_value=[{"resource": "res1", "environment": "np"}])
+    @patch.object(EnvironmentService, 'get_environment')
+    def test_cached_environment_reuses_resolution(self, mock_get_environment, mock_yaml, mock_stamp):
+        EnvironmentService.resolved.clear()
+        mock_get_environment.return_value = EnvironmentResponse(component="comp", status="success", message="ok",
+                                                                environment={"VAR": "value"})
+        result, etag = self.service.cached_environment("comp", "env_path", "res_path", "task_path")
+        again, same_etag = self.service.cached_environment("comp", "env_path", "res_path", "task_path")
+        self.assertEqual(mock_get_environment.call_count, 1)
+        self.assertIs(again, result)
+        self.assertEqual(etag, same_etag)
+        self.assertTrue(etag.startswith('"'))
+
+        # A changed input file invalidates the entry
+        mock_stamp.return_value = (2, 10)
+        self.service.cached_environment("comp", "env_path", "res_path", "task_path")
+        self.assertEqual(mock_get_environment.call_count, 2)
+
+    @patch.object(EnvironmentService, 'load_yaml', return_value=None)
+    def test_cached_environment_not_cached_on_error(self, mock_yaml):
+        EnvironmentService.resolved.clear()
+        result, etag = self.service.cached_environment("comp", "env_path", "res_path", "task_path")
+        self.assertIsNone(etag)
+        self.assertEqual(result.status, self.service.FAILED_STATE)
+        self.assertFalse(EnvironmentService.resolved)
+
+    def test_input_files(self):
+        self.service.configure_folders("/base", "/base", "/base")
+        tasks = [{"resource": "res1", "environment": "np", "steps": [{"use_template": True, "action_config": "cfg.yml"}]}]
+        self.assertEqual(self.service.input_files("comp", tasks), [
+            "/base/tasks/comp.yml", "/base/environments/np.yml", "/base/environments/res1/np.yml",
+            "/base/resources/res1/cfg.yml"
+        ])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from services.file_cache import YamlCache
+
+
+class TestYamlCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "env.yml")
+        self.write("key: value\n")
+        self.cache = YamlCache()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, content, mtime_ns=None):
+        with open(self.path, "w") as f:
+            f.write(content)
+        if mtime_ns:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_unchanged_file_is_parsed_once(self):
+        with patch("yaml.safe_load", wraps=__import__("yaml").safe_load) as mock_safe_load:
+            self.assertEqual(self.cache.load(self.path), {"key": "value"})
+            self.assertEqual(self.cache.load(self.path), {"key": "value"})
+        self.assertEqual(mock_safe_load.call_count, 1)
+
+    def test_returns_copies(self):
+        data = self.cache.load(self.path)
+        data["key"] = "changed"
+        self.assertEqual(self.cache.load(self.path), {"key": "value"})
+
+    def test_changed_file_is_reloaded(self):
+        self.cache.load(self.path)
+        self.write("key: other\n", mtime_ns=os.stat(self.path).st_mtime_ns + 1_000_000_000)
+        self.assertEqual(self.cache.load(self.path), {"key": "other"})
+
+    def test_missing_file_raises(self):
+        with self.assertRaises(OSError):
+            self.cache.load(os.path.join(self.tmp.name, "missing.yml"))
+
+    def test_bounded(self):
+        cache = YamlCache(max_entries=1)
+        other = os.path.join(self.tmp.name, "other.yml")
+        with open(other, "w") as f:
+            f.write("a: 1\n")
+        cache.load(self.path)
+        cache.load(other)
+        self.assertEqual(list(cache._entries), [other])
+
+
+if __name__ == "__main__":
+    unittest.main()
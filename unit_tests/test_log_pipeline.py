@@ -0,0 +1,96 @@
+import io
+import os
+import json
+import queue
+import logging
+import tempfile
+import unittest
+from unittest.mock import patch
+from services.log_pipeline import LogPipeline, ContextQueueHandler, log_context, log_pipeline
+
+logger = logging.getLogger("test_log_pipeline")
+
+
+class TestLogPipeline(unittest.TestCase):
+    def setUp(self):
+        root = logging.getLogger()
+        self.saved = (list(root.handlers), root.level)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.stream = io.StringIO()
+        self.build_dir = os.path.join(self.tmp.name, "builds")
+        log_pipeline.configure(level="INFO", fmt="json", log_file="", build_log_dir=self.build_dir,
+                               stream=self.stream)
+
+    def tearDown(self):
+        log_pipeline.stop()
+        root = logging.getLogger()
+        for handler in self.saved[0]:
+            root.addHandler(handler)
+        root.setLevel(self.saved[1])
+        self.tmp.cleanup()
+
+    def records(self):
+        log_pipeline.stop()  # Drains the queue
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_records_carry_context_and_go_to_build_files(self):
+        with log_context(build="b-1", task="network"):
+            with log_context(step="deploy"):
+                logger.info("deploying %s", "vpc")
+            logger.warning("task done")
+        logger.info("outside")
+
+        records = self.records()
+        self.assertEqual([(r["message"], r.get("build"), r.get("task"), r.get("step")) for r in records], [
+            ("deploying vpc", "b-1", "network", "deploy"),
+            ("task done", "b-1", "network", None),
+            ("outside", None, None, None),
+        ])
+        with open(os.path.join(self.build_dir, "b-1.log")) as build_log:
+            self.assertEqual([json.loads(line)["message"] for line in build_log], ["deploying vpc", "task done"])
+
+    def test_debug_opt_in_is_scoped_to_the_context(self):
+        logger.debug("dropped")
+        with log_context(build="b-2", debug=True):
+            self.assertEqual(logging.getLogger().level, logging.DEBUG)
+            logger.debug("kept %d", 1)
+        self.assertEqual(logging.getLogger().level, logging.INFO)
+        logger.debug("dropped again")
+        self.assertEqual([r["message"] for r in self.records()], ["kept 1"])
+
+    def test_large_messages_are_capped(self):
+        log_pipeline.max_message_chars = 100
+        try:
+            logger.info("output: %s", "x" * 1000 + "END")
+        finally:
+            log_pipeline.max_message_chars = LogPipeline.MAX_MESSAGE_CHARS
+        message = self.records()[0]["message"]
+        self.assertLess(len(message), 160)
+        self.assertTrue(message.startswith("output: xxx"))
+        self.assertTrue(message.endswith("END"))
+        self.assertIn("characters dropped", message)
+
+    def test_exceptions_keep_their_traceback(self):
+        with patch.object(logging.Formatter, "format", side_effect=AssertionError("formatted on the caller")):
+            try:
+                raise ValueError("bad value")
+            except ValueError:
+                logger.exception("step %s failed", "deploy")
+        record = self.records()[0]
+        self.assertEqual(record["message"], "step deploy failed")
+        self.assertIn("ValueError: bad value", record["exc"])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = ContextQueueHandler(queue.Queue(1), log_pipeline)
+        record = logging.LogRecord("x", logging.INFO, __file__, 1, "message", None, None)
+        handler.handle(record)
+        handler.handle(record)
+        self.assertEqual(handler.dropped, 1)
+
+    def test_unknown_level(self):
+        with self.assertRaises(ValueError):
+            LogPipeline().configure(level="LOUD")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from services.log_store import LogStore
+
+
+class TestLogStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = LogStore(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_put_and_read_ranges(self):
+        text = "".join(f"line {i}\n" for i in range(10000))
+        ref, size = self.store.put(text)
+        self.assertEqual(size, len(text.encode()))
+        self.assertEqual(self.store.read(ref), text.encode())
+        self.assertEqual(self.store.read(ref, 7, 7), b"line 1\n")
+        self.assertEqual(self.store.read(ref, size - 10), text.encode()[-10:])
+        self.assertLess(os.path.getsize(self.store.path(ref)), size / 4)
+
+    def test_content_addressed(self):
+        ref, _ = self.store.put("same output")
+        self.assertEqual(self.store.put("same output")[0], ref)
+        self.assertNotEqual(self.store.put("other output")[0], ref)
+        self.assertEqual(len(os.listdir(os.path.join(self.tmp.name, ref[:2]))), 1)
+
+    def test_offload_keeps_short_messages_inline(self):
+        result = {"status": "success", "message": "short"}
+        self.assertEqual(self.store.offload(result), (result, None, None))
+        self.assertEqual(self.store.offload({"status": "error"}), ({"status": "error"}, None, None))
+
+    def test_offload_long_message(self):
+        message = "x" * LogStore.TAIL_CHARS + "tail"
+        row, ref, size = self.store.offload({"status": "success", "message": message})
+        self.assertEqual(len(row["message"]), LogStore.TAIL_CHARS)
+        self.assertTrue(row["message"].endswith("tail"))
+        self.assertTrue(row["truncated"])
+        self.assertEqual(size, len(message))
+        self.assertEqual(self.store.read(ref).decode(), message)
+
+    def test_delete_spares_recently_used_logs(self):
+        ref, _ = self.store.put("output")
+        stored = os.path.getmtime(self.store.path(ref))
+        self.assertFalse(self.store.delete(ref, unused_since=stored - 60))
+        self.assertTrue(self.store.delete(ref, unused_since=stored + 60))
+        self.assertFalse(os.path.exists(self.store.path(ref)))
+        self.assertFalse(self.store.delete(ref))
+
+    def test_invalid_reference(self):
+        with self.assertRaises(ValueError):
+            self.store.read("../../etc/passwd")
+        with self.assertRaises(FileNotFoundError):
+            self.store.read("0" * 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import time
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+from services.admission import AdmissionRejected
+from services.build_service import BuildService
+from services.matrix_service import MatrixBuildService
+from schemas import BuildResponse, MatrixBuildResponse
+
+TASKS = [{"name": "task1", "resource": "res1", "environment": "np", "steps": [{"name": "step1"}]},
+         {"name": "task2", "resource": "res2", "environment": "np", "steps": [{"name": "step1"}]}]
+
+
+def build_response(status="success"):
+    return BuildResponse(component="comp", status=status, message=status, uuid="child", results=[])
+
+
+class TestMatrixBuildService(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.db.query().filter().first.return_value = None
+        self.child_db = MagicMock()
+        self.child_db.query().filter().first.return_value = None
+        self.service = MatrixBuildService(session_factory=lambda: self.child_db)
+
+    @patch("services.matrix_service.BuildService.run_tasks")
+    @patch("services.matrix_service.MatrixBuildService.load_config", side_effect=lambda task: {"env": task["environment"]})
+    @patch("services.matrix_service.MatrixBuildService.load_yaml", return_value=TASKS)
+    def test_matrix_build_success(self, mock_load_yaml, mock_load_config, mock_run_tasks):
+        mock_run_tasks.return_value = build_response()
+        response = self.service.matrix_build("comp", ["dev", "prod", "dev"], "/tmp/env", "/tmp/res", "/tmp/task", self.db)
+        self.assertIsInstance(response, MatrixBuildResponse)
+        self.assertEqual(response.status, "success")
+        self.assertEqual([b.environment for b in response.builds], ["dev", "prod"])
+        self.assertEqual([b.application_name for b in response.builds], ["comp@dev", "comp@prod"])
+        # Configs are resolved once per task and environment, then handed to the child builds
+        self.assertEqual(mock_load_config.call_count, 4)
+        configs = {call.kwargs["configs"]["task1"]["env"] for call in mock_run_tasks.call_args_list}
+        self.assertEqual(configs, {"dev", "prod"})
+        child_tasks = mock_run_tasks.call_args_list[0].args[1]
+        self.assertTrue(all(task["environment"] in ("dev", "prod") for task in child_tasks))
+        child_app = mock_run_tasks.call_args_list[0].args[4]
+        self.assertEqual(child_app.parent_uuid, response.uuid)
+
+    @patch("services.matrix_service.BuildService.run_tasks")
+    @patch("services.matrix_service.MatrixBuildService.load_config", side_effect=lambda task: {"env": 1} if task["environment"] == "dev" else {})
+    @patch("services.matrix_service.MatrixBuildService.load_yaml", return_value=TASKS)
+    def test_matrix_build_missing_environment(self, mock_load_yaml, mock_load_config, mock_run_tasks):
+        mock_run_tasks.return_value = build_response()
+        response = self.service.matrix_build("comp", ["dev", "prod"], "/tmp/env", "/tmp/res", "/tmp/task", self.db)
+        self.assertEqual(response.status, self.service.FAILED_STATE)
+        statuses = {b.environment: b.status for b in response.builds}
+        self.assertEqual(statuses, {"dev": "success", "prod": self.service.FAILED_STATE})
+        mock_run_tasks.assert_called_once()
+
+    @patch("services.matrix_service.BuildService.run_tasks")
+    @patch("services.matrix_service.MatrixBuildService.load_config", return_value={"env": "val"})
+    @patch("services.matrix_service.MatrixBuildService.load_yaml", return_value=TASKS)
+    def test_matrix_build_concurrency_cap(self, mock_load_yaml, mock_load_config, mock_run_tasks):
+        lock = threading.Lock()
+        running = {"now": 0, "peak": 0}
+
+        def run_tasks(*args, **kwargs):
+            with lock:
+                running["now"] += 1
+                running["peak"] = max(running["peak"], running["now"])
+            time.sleep(0.05)
+            with lock:
+                running["now"] -= 1
+            return build_response()
+
+        mock_run_tasks.side_effect = run_tasks
+        environments = [f"env{i}" for i in range(6)]
+        response = self.service.matrix_build("comp", environments, "/tmp/env", "/tmp/res", "/tmp/task", self.db,
+                                             max_concurrency=2)
+        self.assertEqual(response.status, "success")
+        self.assertEqual(len(response.builds), 6)
+        self.assertEqual(running["peak"], 2)
+
+    @patch("services.matrix_service.BuildService.run_tasks", return_value=build_response())
+    @patch("services.matrix_service.MatrixBuildService.load_config", return_value={"env": "val"})
+    @patch("services.matrix_service.MatrixBuildService.load_yaml", return_value=TASKS)
+    def test_matrix_build_slot_per_child(self, mock_load_yaml, mock_load_config, mock_run_tasks):
+        slots = []
+
+        @contextmanager
+        def slot():
+            if len(slots) == 2:
+                raise AdmissionRejected("Too many builds queued, try again later", 1)
+            slots.append(True)
+            yield
+
+        self.service.slot = slot
+        response = self.service.matrix_build("comp", ["dev", "test", "prod"], "/tmp/env", "/tmp/res", "/tmp/task",
+                                             self.db, max_concurrency=1)
+        self.assertEqual(len(slots), 2)
+        self.assertEqual([b.status for b in response.builds], ["success", "success", self.service.FAILED_STATE])
+        self.assertEqual(response.builds[2].message, "Too many builds queued, try again later")
+        self.assertEqual(mock_run_tasks.call_count, 2)
+
+    @patch("services.matrix_service.BuildService.run_tasks", return_value=build_response())
+    @patch("services.matrix_service.MatrixBuildService.load_config", return_value={"env": "val"})
+    @patch("services.matrix_service.MatrixBuildService.load_yaml", return_value=TASKS)
+    def test_matrix_child_claims_under_the_locker_lock(self, mock_load_yaml, mock_load_config, mock_run_tasks):
+        locked = []
+        self.child_db.commit.side_effect = lambda: locked.append(BuildService.locker_lock.locked())
+        self.service.matrix_build("comp", ["dev"], "/tmp/env", "/tmp/res", "/tmp/task", self.db)
+        self.assertEqual(locked[0], True)
+
+    def test_matrix_build_requires_environments(self):
+        response = self.service.matrix_build("comp", [], "/tmp/env", "/tmp/res", "/tmp/task", self.db)
+        self.assertEqual(response.status, self.service.FAILED_STATE)
+        self.db.add.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
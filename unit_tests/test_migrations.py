@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+import models  # noqa: F401
+from database import Base, HEAD_REVISION, MIGRATIONS_FOLDER, async_url, migrate
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'builder.db')}")
+        self.config = Config()
+        self.config.set_main_option("script_location", MIGRATIONS_FOLDER)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def upgrade(self, revision):
+        with self.engine.begin() as connection:
+            self.config.attributes["connection"] = connection
+            command.upgrade(self.config, revision)
+
+    def schema_diff(self):
+        with self.engine.connect() as connection:
+            return compare_metadata(MigrationContext.configure(connection), Base.metadata)
+
+    def revision(self):
+        with self.engine.connect() as connection:
+            return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+    def test_head_revision_matches_scripts(self):
+        self.assertEqual(ScriptDirectory.from_config(self.config).get_current_head(), HEAD_REVISION)
+
+    def test_migrations_match_models(self):
+        self.upgrade("head")
+        self.assertEqual(self.schema_diff(), [])
+
+    def test_empty_database_is_created_at_head(self):
+        self.assertEqual(migrate(self.engine), HEAD_REVISION)
+        self.assertEqual(self.revision(), HEAD_REVISION)
+        self.assertEqual(self.schema_diff(), [])
+        self.assertEqual(migrate(self.engine), HEAD_REVISION)
+
+    def test_legacy_database_is_stamped_and_upgraded(self):
+        # A database create_all made before this backlog: baseline tables, no alembic_version
+        self.upgrade("0001")
+        with self.engine.begin() as connection:
+            connection.execute(text("DROP TABLE alembic_version"))
+            connection.execute(text("INSERT INTO applications (uuid, application_name, action, status, timestamp) "
+                                    "VALUES ('u1', 'app', 'build', 'success', '2024-01-01 00:00:00')"))
+
+        self.assertEqual(migrate(self.engine), HEAD_REVISION)
+        self.assertEqual(self.revision(), HEAD_REVISION)
+        self.assertEqual(self.schema_diff(), [])
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.execute(text("SELECT application_name FROM applications")).scalar(), "app")
+
+    def test_database_created_by_create_all_is_stamped(self):
+        # create_all built the schema until migrations were added (0002); later tables never came from it
+        pre_migration = [table for name, table in Base.metadata.tables.items() if name not in ("users",)]
+        Base.metadata.create_all(bind=self.engine, tables=pre_migration)
+        self.assertEqual(migrate(self.engine), HEAD_REVISION)
+        self.assertEqual(self.schema_diff(), [])
+        self.assertIn("alembic_version", inspect(self.engine).get_table_names())
+
+
+class TestAsyncUrl(unittest.TestCase):
+    def test_drivers(self):
+        self.assertEqual(async_url("sqlite:///./test.db"), "sqlite+aiosqlite:///./test.db")
+        self.assertEqual(async_url("postgresql://u:p@db/builder"), "postgresql+asyncpg://u:p@db/builder")
+        self.assertEqual(async_url("postgresql+psycopg2://db/builder"), "postgresql+asyncpg://db/builder")
+        with self.assertRaises(ValueError):
+            async_url("mssql://db/builder")
+
+
+if __name__ == "__main__":
+    unittest.main()
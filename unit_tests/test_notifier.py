@@ -0,0 +1,126 @@
+import hmac
+import json
+import os
+import hashlib
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
+from services.notifier import Notifier
+from schemas import BuildResponse, CallbackTarget, ResourceResult
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        with server.lock:
+            server.received.append((dict(self.headers), body))
+            status = server.statuses.pop(0) if server.statuses else 200
+        self.send_response(status)
+        self.end_headers()
+        if len(server.received) >= server.expected:
+            server.done.set()
+
+    def log_message(self, *args):
+        pass
+
+
+class UnixHTTPServer(socketserver.UnixStreamServer):
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("local", 0)
+
+
+def start_stub(server, statuses=(), expected=1):
+    server.lock = threading.Lock()
+    server.received = []
+    server.statuses = list(statuses)
+    server.expected = expected
+    server.done = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def response(status="success"):
+    return BuildResponse(component="comp", status=status, message=status, uuid="u1", results=[
+        ResourceResult(resource="res1", status="success", message="ok"),
+        ResourceResult(resource="res2", status=status, message=status)
+    ])
+
+
+class TestNotifier(unittest.TestCase):
+    def setUp(self):
+        self.notifier = Notifier(secret="shh", workers=1)
+        self.server = start_stub(HTTPServer(("127.0.0.1", 0), StubHandler))
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hooks/build"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_validate(self):
+        Notifier.validate([CallbackTarget(url=self.url), CallbackTarget(url="unix:///tmp/ci.sock")])
+        with self.assertRaises(ValueError):
+            Notifier.validate([CallbackTarget(url="ftp://host/x")])
+
+    def test_delivers_signed_event(self):
+        self.notifier.publish([CallbackTarget(url=self.url)], "build", response("error"))
+        self.assertTrue(self.server.done.wait(5))
+        headers, body = self.server.received[0]
+        event = json.loads(body)
+        self.assertEqual(event["event"], "build.failed")
+        self.assertEqual(event["summary"], {"steps": 2, "succeeded": 1, "failed": 1, "failed_resources": ["res2"]})
+        expected = hmac.new(b"shh", headers["X-Builder-Timestamp"].encode() + b"." + body, hashlib.sha256).hexdigest()
+        self.assertEqual(headers["X-Builder-Signature"], f"sha256={expected}")
+        self.assertEqual(headers["X-Builder-Event"], "build.failed")
+
+    def test_check_signing_warns_without_a_secret(self):
+        with self.assertLogs("services.notifier", "WARNING"):
+            Notifier(secret="", workers=1).check_signing()
+        with self.assertNoLogs("services.notifier", "WARNING"):
+            self.notifier.check_signing()
+
+    def test_target_secret_overrides_default(self):
+        self.notifier.publish([CallbackTarget(url=self.url, secret="mine")], "unbuild", response())
+        self.assertTrue(self.server.done.wait(5))
+        headers, body = self.server.received[0]
+        expected = hmac.new(b"mine", headers["X-Builder-Timestamp"].encode() + b"." + body, hashlib.sha256).hexdigest()
+        self.assertEqual(headers["X-Builder-Signature"], f"sha256={expected}")
+        self.assertEqual(json.loads(body)["event"], "unbuild.completed")
+
+    def test_retries_failed_delivery(self):
+        self.server.statuses = [500, 503]
+        self.server.expected = 3
+        with patch.object(Notifier, "RETRY_BASE", 0.01):
+            self.notifier.publish([CallbackTarget(url=self.url)], "build", response())
+            self.assertTrue(self.server.done.wait(5))
+        self.assertEqual(len(self.server.received), 3)
+
+    def test_publish_does_not_block(self):
+        release = threading.Event()
+        with patch.object(Notifier, "send", side_effect=lambda delivery: release.wait(5) and 200) as mock_send:
+            started = time.monotonic()
+            self.notifier.publish([CallbackTarget(url=self.url)] * 3, "build", response())
+            self.assertLess(time.monotonic() - started, 0.5)
+            release.set()
+        self.assertLessEqual(mock_send.call_count, 3)
+
+    def test_unix_socket_target(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            socket_path = os.path.join(tmp, "ci.sock")
+            server = start_stub(UnixHTTPServer(socket_path, StubHandler))
+            try:
+                self.notifier.publish([CallbackTarget(url=f"unix://{socket_path}")], "build", response())
+                self.assertTrue(server.done.wait(5))
+                self.assertEqual(json.loads(server.received[0][1])["event"], "build.completed")
+            finally:
+                server.shutdown()
+                server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from services.plan_service import PlanService
+
+TASKS = [{"name": "task1", "resource": "res1", "environment": "np",
+          "steps": [{"name": "step1", "type": "shell", "action_script": "run.sh"}]}]
+
+
+class TestPlanService(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.resource_dir = os.path.join(self.tmp.name, "resources", "res1")
+        os.makedirs(self.resource_dir)
+        self.write_template("echo {{ name }}\n")
+        PlanService.plans.clear()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_template(self, content):
+        with open(os.path.join(self.resource_dir, "run.sh.j2"), "w") as f:
+            f.write(content)
+
+    def plan(self):
+        return PlanService().plan("comp", self.tmp.name, self.tmp.name, self.tmp.name)
+
+    @patch("services.plan_service.PlanService.load_config", return_value={"name": "world"})
+    @patch("services.plan_service.PlanService.load_yaml", return_value=TASKS)
+    def test_plan_success_is_cached(self, mock_load_yaml, mock_load_config):
+        response = self.plan()
+        self.assertEqual(response.status, "success")
+        self.assertTrue(response.plan_id)
+        self.assertEqual(response.steps[0].files, [os.path.join(self.resource_dir, "run.sh")])
+        self.assertIn(response.plan_id, PlanService.plans)
+        # Same inputs, same plan id
+        self.assertEqual(self.plan().plan_id, response.plan_id)
+        self.assertEqual(len(PlanService.plans), 1)
+
+    @patch("services.plan_service.PlanService.load_config", return_value={"name": "world"})
+    @patch("services.plan_service.PlanService.load_yaml", return_value=TASKS)
+    def test_plan_reports_undeclared_variables(self, mock_load_yaml, mock_load_config):
+        self.write_template("{% set greeting = 'hi' %}echo {{ greeting }} {{ name }} {{ region }} {{ range(2) }}\n")
+        response = self.plan()
+        self.assertEqual(response.status, "error")
+        self.assertEqual(response.plan_id, "")
+        self.assertEqual(response.steps[0].missing_variables, ["region"])
+        self.assertFalse(PlanService.plans)
+
+    @patch("services.plan_service.PlanService.load_config", return_value={})
+    @patch("services.plan_service.PlanService.load_yaml", return_value=TASKS)
+    def test_plan_missing_config(self, mock_load_yaml, mock_load_config):
+        response = self.plan()
+        self.assertEqual(response.status, "error")
+        self.assertIn("Configuration for task 'task1' not found", response.steps[0].error)
+
+    @patch("services.plan_service.PlanService.load_config", return_value={"name": "world"})
+    @patch("services.plan_service.PlanService.load_yaml", return_value=TASKS)
+    def test_build_plan_uses_cached_renders(self, mock_load_yaml, mock_load_config):
+        plan_id = self.plan().plan_id
+        self.write_template("echo changed\n")
+        service = PlanService()
+        with patch.object(PlanService, "start_build") as mock_start_build:
+            service.build_plan(plan_id, "comp", MagicMock())
+        args = mock_start_build.call_args.args
+        self.assertEqual(args[2], TASKS)
+        rendered = service.render_step("res1", TASKS[0]["steps"][0], {"name": "world"})
+        self.assertEqual(list(rendered.values()), ["echo world"])
+
+    def test_build_plan_unknown(self):
+        response = PlanService().build_plan("missing", "comp", MagicMock())
+        self.assertEqual(response.status, "error")
+        self.assertEqual(response.uuid, "")
+
+    def test_plan_cache_is_bounded(self):
+        with patch.object(PlanService, "MAX_CACHED_PLANS", 2):
+            for plan_id in ("a", "b", "c"):
+                PlanService.cache_plan(MagicMock(plan_id=plan_id))
+            self.assertIsNone(PlanService.cached_plan("a"))
+            self.assertIsNotNone(PlanService.cached_plan("c"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from services.base_service import BaseService
+from services.rate_governor import RateGovernor
+
+THROTTLED = {"status": "error", "message": "An error occurred (Throttling) when calling the DescribeStacks operation: Rate exceeded"}
+
+
+class TestRateGovernor(unittest.TestCase):
+    def setUp(self):
+        self.governor = RateGovernor()
+        self.key = self.governor.key_for("acc", "ap-southeast-2")
+
+    def test_key_for_defaults(self):
+        self.assertEqual(self.governor.key_for(None, None), ("default", "default"))
+
+    def test_acquire_uses_burst_without_waiting(self):
+        for _ in range(self.governor.BURST):
+            self.assertEqual(self.governor.acquire(self.key), 0.0)
+
+    def test_acquire_waits_when_bucket_empty(self):
+        clock = [1000.0]
+        with patch("services.rate_governor.time.monotonic", side_effect=lambda: clock[0]), \
+                patch("services.rate_governor.time.sleep", side_effect=lambda s: clock.__setitem__(0, clock[0] + s)):
+            self.governor.on_throttle(self.key)
+            waited = self.governor.acquire(self.key)
+        self.assertAlmostEqual(waited, 1 / self.governor.rate(self.key))
+
+    def test_aimd_adjustment(self):
+        self.governor.on_success(self.key)
+        increased = self.governor.rate(self.key)
+        self.assertAlmostEqual(increased, self.governor.INITIAL_RATE + self.governor.ADDITIVE_INCREASE)
+        self.governor.on_throttle(self.key)
+        self.assertAlmostEqual(self.governor.rate(self.key), increased * self.governor.MULTIPLICATIVE_DECREASE)
+        # A second throttle inside the cooldown window does not halve the rate again
+        self.governor.on_throttle(self.key)
+        self.assertAlmostEqual(self.governor.rate(self.key), increased * self.governor.MULTIPLICATIVE_DECREASE)
+
+    def test_rate_is_bounded(self):
+        for _ in range(500):
+            self.governor.on_success(self.key)
+        self.assertEqual(self.governor.rate(self.key), self.governor.MAX_RATE)
+
+    def test_is_throttled(self):
+        self.assertTrue(self.governor.is_throttled(THROTTLED["message"]))
+        self.assertTrue(self.governor.is_throttled("TooManyRequestsException"))
+        self.assertFalse(self.governor.is_throttled("Stack does not exist"))
+        self.assertFalse(self.governor.is_throttled(None))
+
+    def test_backoff_is_jittered_and_capped(self):
+        for attempt in range(1, 20):
+            delay = self.governor.backoff(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, self.governor.BACKOFF_CAP)
+
+
+class TestRunScript(unittest.TestCase):
+    def setUp(self):
+        self.bs = BaseService()
+        self.bs.call_subprocess = MagicMock()
+        # Use a private governor so throttling in these tests does not slow down the shared one
+        self.governor = RateGovernor()
+        patcher = patch("services.base_service.governor", self.governor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch("services.base_service.time.sleep")
+    @patch.object(RateGovernor, "acquire", return_value=0.0)
+    def test_throttled_step_is_retried(self, mock_acquire, mock_sleep):
+        self.bs.call_subprocess.side_effect = [THROTTLED, {"status": "success", "message": "done"}]
+        result = self.bs.run_script("res", "deploy.sh", "uuid1", {"type": "cloudformation"}, {"aws_region": "r"}, {"account": "a"})
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(self.bs.call_subprocess.call_count, 2)
+        self.assertEqual(mock_acquire.call_count, 2)
+        mock_sleep.assert_called_once()
+
+    @patch("services.base_service.time.sleep")
+    @patch.object(RateGovernor, "acquire", return_value=0.0)
+    def test_throttled_step_gives_up(self, mock_acquire, mock_sleep):
+        self.bs.call_subprocess.return_value = THROTTLED
+        result = self.bs.run_script("res", "deploy.sh", "uuid1", {"type": "terraform"}, {}, None)
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(self.bs.call_subprocess.call_count, self.bs.THROTTLE_MAX_RETRIES + 1)
+
+    @patch.object(RateGovernor, "acquire")
+    def test_shell_step_is_not_governed(self, mock_acquire):
+        self.bs.call_subprocess.return_value = THROTTLED
+        result = self.bs.run_script("res", "showip.sh", "uuid1", {"type": "shell"}, {}, None)
+        self.assertEqual(result["status"], "error")
+        self.bs.call_subprocess.assert_called_once()
+        mock_acquire.assert_not_called()
+
+    @patch.object(RateGovernor, "acquire", return_value=0.0)
+    def test_step_can_opt_in(self, mock_acquire):
+        self.bs.call_subprocess.return_value = {"status": "success", "message": "ok"}
+        self.bs.run_script("res", "showip.sh", "uuid1", {"type": "shell", "throttled": "true"}, {}, None)
+        mock_acquire.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models import Resource, Step
+from services.base_service import BaseService
+from services.resource_service import ResourceService
+
+
+def row(task_name, status=ResourceService.DEPLOYED, account="111", region="eu-west-1"):
+    return dict(application_name="app", task_name=task_name, resource="vpc", step_name="apply",
+                step_type="infrastructure", environment="np", account=account, region=region, status=status,
+                uuid="b1")
+
+
+class TestResourceService(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_upsert_is_idempotent(self):
+        rows = [row(f"t{i}") for i in range(5)]
+        self.assertEqual(ResourceService.upsert(self.db, rows), 5)
+        ResourceService.upsert(self.db, rows)
+        self.db.commit()
+        self.assertEqual(self.db.query(Resource).count(), 5)
+        self.assertEqual(ResourceService.upsert(self.db, []), 0)
+
+    def test_destroy_overwrites_the_row(self):
+        ResourceService.upsert(self.db, [row("t1")])
+        ResourceService.upsert(self.db, [dict(row("t1"), status=ResourceService.DESTROYED, uuid="b2")])
+        self.db.commit()
+        resource = self.db.query(Resource).one()
+        self.assertEqual((resource.status, resource.uuid), (ResourceService.DESTROYED, "b2"))
+
+    def test_find_filters_and_pages(self):
+        ResourceService.upsert(self.db, [row(f"t{i}", account="111" if i % 2 else "222") for i in range(7)])
+        self.db.commit()
+        seen, after = [], None
+        while True:
+            items, after = ResourceService.find(self.db, {"account": "111", "region": None}, limit=2, after=after)
+            seen.extend(item.task_name for item in items)
+            if after is None:
+                break
+        self.assertEqual(seen, ["t1", "t3", "t5"])
+        items, after = ResourceService.find(self.db, {}, limit=10)
+        self.assertEqual((len(items), after), (7, None))
+
+    def test_summary_groups_and_counts(self):
+        ResourceService.upsert(self.db, [row("t1"), row("t2"), row("t3", region="us-east-1"),
+                                         row("t4", status=ResourceService.DESTROYED)])
+        self.db.commit()
+        self.assertEqual(ResourceService.summary(self.db, ["account", "region"]),
+                         [{"account": "111", "region": "eu-west-1", "count": 2},
+                          {"account": "111", "region": "us-east-1", "count": 1}])
+        self.assertEqual(ResourceService.summary(self.db, ["resource"], status=None),
+                         [{"resource": "vpc", "count": 4}])
+
+    def test_update_status_upserts_with_the_step(self):
+        service = BaseService()
+        service.application_name = "app"
+        task = {"name": "network", "resource": "vpc", "environment": "np", "account": "111"}
+        step = {"name": "apply", "type": "infrastructure"}
+        inventory = service.inventory_row(task, step, {"aws_region": "eu-west-1"}, "b1", ResourceService.DEPLOYED)
+        BaseService.update_status("vpc", "apply", {"status": "failure"}, self.db, "b1", inventory=inventory)
+        self.assertEqual(self.db.query(Resource).count(), 0)
+        BaseService.update_status("vpc", "apply", {"status": "success"}, self.db, "b1", inventory=inventory)
+        resource = self.db.query(Resource).one()
+        self.assertEqual((resource.application_name, resource.task_name, resource.region, resource.status),
+                         ("app", "network", "eu-west-1", ResourceService.DEPLOYED))
+        self.assertEqual(self.db.query(Step).count(), 2)
+        self.assertIsNone(BaseService().inventory_row(task, step, {}, "b1", ResourceService.DEPLOYED))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import gzip
+import unittest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+import responses
+from responses import CompressionMiddleware, FastJSONResponse, accepted_encodings
+
+BIG = {"steps": [{"id": i, "status": {"message": "output line\n" * 50}} for i in range(20)]}
+
+
+class TestFastJSONResponse(unittest.TestCase):
+    def test_render(self):
+        self.assertEqual(FastJSONResponse({"a": [1, None], 2: "b"}).body, b'{"a":[1,null],"2":"b"}')
+
+
+class TestCompressionMiddleware(unittest.TestCase):
+    def setUp(self):
+        app = FastAPI()
+        app.add_middleware(CompressionMiddleware, min_size=1024)
+
+        @app.get("/big")
+        def big():
+            return FastJSONResponse(BIG)
+
+        @app.get("/small")
+        def small():
+            return {"ok": True}
+
+        @app.get("/partial")
+        def partial():
+            return PlainTextResponse("x" * 5000, status_code=206, headers={"Content-Range": "bytes 0-4999/9000"})
+
+        @app.get("/stream")
+        def stream():
+            return StreamingResponse(iter([b"x" * 2000, b"y" * 2000]), media_type="application/x-ndjson")
+
+        self.client = TestClient(app)
+
+    def get(self, path, accept_encoding):
+        return self.client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings("gzip, br;q=0.5, *;q=0, x;q=bad"),
+                         {"gzip": 1.0, "br": 0.5, "*": 0.0, "x": 0.0})
+
+    def test_negotiation(self):
+        middleware = CompressionMiddleware(None)
+        with patch.object(responses, "brotli", object()):
+            self.assertEqual(middleware.choose("gzip, deflate, br"), "br")
+            self.assertEqual(middleware.choose("gzip;q=1, br;q=0.5"), "gzip")
+            self.assertEqual(middleware.choose("*"), "br")
+            self.assertIsNone(middleware.choose("identity"))
+            self.assertIsNone(middleware.choose("gzip;q=0, br;q=0"))
+        with patch.object(responses, "brotli", None):
+            self.assertEqual(middleware.choose("br, gzip"), "gzip")
+
+    @unittest.skipIf(responses.brotli is None, "brotli is not installed")
+    def test_large_json_is_brotli_compressed(self):
+        response = self.get("/big", "gzip, br")
+        self.assertEqual(response.headers["content-encoding"], "br")
+        self.assertEqual(response.json(), BIG)
+
+    def test_large_json_is_compressed(self):
+        response = self.get("/big", "gzip")
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["vary"])
+        self.assertLess(int(response.headers["content-length"]), len(FastJSONResponse(BIG).body))
+        self.assertEqual(response.json(), BIG)
+
+    def test_passthrough(self):
+        self.assertNotIn("content-encoding", self.get("/big", "identity").headers)
+        self.assertNotIn("content-encoding", self.get("/small", "br, gzip").headers)
+        partial = self.get("/partial", "gzip")
+        self.assertNotIn("content-encoding", partial.headers)
+        self.assertEqual(len(partial.content), 5000)
+        stream = self.get("/stream", "gzip")
+        self.assertNotIn("content-encoding", stream.headers)
+        self.assertEqual(len(stream.content), 4000)
+
+    def test_gzip_body(self):
+        middleware = CompressionMiddleware(None)
+        self.assertEqual(gzip.decompress(middleware.compress("gzip", b"abc" * 100)), b"abc" * 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import gzip
+import json
+import time
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models import Application, Step, BuildRollup, RetentionPolicy
+from services.base_service import BaseService
+from services.log_store import LogStore
+from services.retention_service import RetentionService
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+class TestRetentionService(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = LogStore(os.path.join(self.tmp.name, "logs"))
+        self.build_logs = os.path.join(self.tmp.name, "logs", "builds")
+        self.service = RetentionService(os.path.join(self.tmp.name, "archive"), self.store, self.build_logs)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def add_build(self, build_uuid, name="app", days_ago=0, status="success", steps=2):
+        started = NOW - timedelta(days=days_ago)
+        self.db.add(Application(uuid=build_uuid, application_name=name, action="build", status=status,
+                                timestamp=started))
+        for i in range(steps):
+            self.db.add(Step(task_name="t", step_name=f"s{i}", status={"status": "success"}, uuid=build_uuid,
+                             timestamp=started + timedelta(seconds=10 * (i + 1))))
+        self.db.commit()
+
+    def test_default_policy(self):
+        self.assertEqual(self.service.policy_for("app", self.db), (RetentionService.KEEP_BUILDS, RetentionService.KEEP_DAYS))
+        self.service.set_policy("*", 5, None, self.db)
+        self.assertEqual(self.service.policy_for("app", self.db), (5, None))
+        self.service.set_policy("app", 2, 10, self.db)
+        self.assertEqual(self.service.policy_for("app", self.db), (2, 10))
+
+    def test_expired_by_count_and_age(self):
+        self.service.set_policy("app", 2, 30, self.db)
+        self.add_build("new", days_ago=0)
+        self.add_build("old", days_ago=40)
+        self.add_build("running", days_ago=50, status="started")
+        self.add_build("mid", days_ago=1)
+        self.add_build("older", days_ago=2)
+        self.assertEqual(self.service.expired_uuids("app", self.db, NOW), ["older", "old"])
+
+    def test_newest_finished_record_is_kept_whatever_its_age(self):
+        self.service.set_policy("app", 1, 30, self.db)
+        self.add_build("running", days_ago=0, status="started")
+        self.add_build("deployed", days_ago=400)
+        self.add_build("older", days_ago=500)
+        self.assertEqual(self.service.expired_uuids("app", self.db, NOW), ["older"])
+        self.add_build("lonely", name="idle", days_ago=1000)
+        self.assertEqual(self.service.run(self.db, "idle", now=NOW).archived_builds, 0)
+        self.assertIsNotNone(self.db.get(Application, "lonely"))
+
+    def test_run_archives_rolls_up_and_deletes(self):
+        self.service.set_policy("app", 1, None, self.db)
+        self.add_build("b1", days_ago=0)
+        self.add_build("b2", days_ago=1)
+        self.add_build("b3", days_ago=2)
+        with patch.object(RetentionService, "BATCH_SIZE", 1):
+            report = self.service.run(self.db, now=NOW)
+        self.assertEqual((report.archived_builds, report.deleted_steps), (2, 4))
+        self.assertEqual(len(report.archives), 2)
+        self.assertEqual([uuid for (uuid,) in self.db.query(Application.uuid).all()], ["b1"])
+        self.assertEqual(self.db.query(Step).count(), 2)
+
+        rollup = self.db.get(BuildRollup, "b2")
+        self.assertEqual((rollup.status, rollup.step_count, rollup.duration_seconds), ("success", 2, 20.0))
+        with gzip.open(rollup.archive, "rt") as archive:
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual([row["type"] for row in rows], ["application", "step", "step"])
+
+    def test_run_deletes_unreferenced_logs(self):
+        self.service.set_policy("app", 1, None, self.db)
+        self.add_build("b1", days_ago=0)
+        self.add_build("b2", days_ago=1)
+        shared, own, recent = (self.store.put(text)[0] for text in ("shared output", "own output", "recent output"))
+        for step_uuid, step_name, ref in [("b1", "s0", shared), ("b2", "s0", shared), ("b2", "s1", own),
+                                          ("b2", "s2", recent)]:
+            self.db.add(Step(task_name="t", step_name=step_name, status={}, uuid=step_uuid, log_ref=ref,
+                             timestamp=NOW))
+        self.db.commit()
+        old = time.time() - 2 * 3600
+        for ref in (shared, own):
+            os.utime(self.store.path(ref), (old, old))
+        os.makedirs(self.build_logs)
+        for build_uuid in ("b1", "b2"):
+            open(os.path.join(self.build_logs, f"{build_uuid}.log"), "w").close()
+
+        self.assertEqual(self.service.run(self.db, now=NOW).archived_builds, 1)
+        self.assertEqual(sorted(os.listdir(self.build_logs)), ["b1.log"])
+        self.assertTrue(os.path.exists(self.store.path(shared)))  # Still referenced by b1
+        self.assertFalse(os.path.exists(self.store.path(own)))
+        # Stored within the grace period: a running build may not have committed its step yet
+        self.assertTrue(os.path.exists(self.store.path(recent)))
+
+    def test_orphaned_steps(self):
+        self.add_build("gone", days_ago=1)
+        BaseService.delete_application_record(self.db, "gone")
+        self.assertEqual(self.db.query(Step).count(), 2)
+        self.db.add(Step(task_name="t", step_name="s", status={}, uuid="fresh", timestamp=NOW))
+        self.db.commit()
+
+        report = self.service.run(self.db, now=NOW)
+        self.assertEqual(report.orphan_steps, 2)
+        # Orphans younger than the grace period are left alone
+        self.assertEqual([uuid for (uuid,) in self.db.query(Step.uuid).all()], ["fresh"])
+        rollup = self.db.get(BuildRollup, "gone")
+        self.assertEqual((rollup.application_name, rollup.step_count), ("app", 2))
+        self.assertTrue(rollup.archive)
+
+    def test_no_policy_limits_keeps_everything(self):
+        self.db.add(RetentionPolicy(application_name="app", keep_builds=None, keep_days=None))
+        self.add_build("b1", days_ago=1000)
+        self.assertEqual(self.service.run(self.db, "app", now=NOW).archived_builds, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
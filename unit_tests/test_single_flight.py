@@ -0,0 +1,54 @@
+import time
+import threading
+import unittest
+from services.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.flights = SingleFlight()
+
+    def _concurrent(self, key, fn, callers=3):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.flights.do(key, fn))) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def test_concurrent_calls_share_one_run(self):
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            release.wait(5)
+            return "result"
+
+        threads, results = self._concurrent("k", fn)
+        # Release the leader only once both followers have attached to its flight
+        deadline = time.monotonic() + 5
+        while self.flights.waiting("k") < 2 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [("result", False), ("result", True), ("result", True)])
+        self.assertFalse(self.flights.in_flight("k"))
+
+    def test_different_keys_run_separately(self):
+        self.assertEqual(self.flights.do("a", lambda: 1), (1, False))
+        self.assertEqual(self.flights.do("b", lambda: 2), (2, False))
+        self.assertEqual(self.flights.do("a", lambda: 3), (3, False))
+
+    def test_error_is_shared_and_key_cleared(self):
+        def fn():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            self.flights.do("k", fn)
+        self.assertFalse(self.flights.in_flight("k"))
+
+
+if __name__ == "__main__":
+    unittest.main()
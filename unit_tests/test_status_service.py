@@ -1,5 +1,14 @@
+import asyncio
+import os
+import tempfile
 import unittest
-from unittest.mock import MagicMock
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models import Application, Step
 from services.status_service import StatusService
 from schemas import StatusResponse
 
@@ -13,6 +22,7 @@ class TestStatusService(unittest.TestCase):
         active_app.application_name = "myapp"
         active_app.action = "build"
         active_app.status = "started"
+        active_app.planned_steps = None
         step = MagicMock()
         step.id = 1
         step.task_name = "task"
@@ -20,6 +30,10 @@ class TestStatusService(unittest.TestCase):
         step.status = {"status": "success"}  # status as dict
         step.timestamp = None
         step.uuid = "uuid1"
+        step.log_ref = None
+        step.log_size = None
+        step.step_type = "cloudformation"
+        step.duration = 12.5
         self.db.query().filter().order_by().first.side_effect = [active_app]
         self.db.query().filter().order_by().all.return_value = [step]
         response = StatusService.get_status("myapp", self.db)
@@ -28,6 +42,7 @@ class TestStatusService(unittest.TestCase):
         self.assertEqual(response.application_name, "myapp")
         self.assertEqual(len(response.steps), 1)
         self.assertEqual(response.steps[0].step_name, "step")  # fixed
+        self.assertGreater(response.change_token, 0)
 
     def test_get_status_recent_record(self):
         recent_app = MagicMock()
@@ -42,6 +57,10 @@ class TestStatusService(unittest.TestCase):
         step.status = {"status": "failed"}  # status as dict
         step.timestamp = None
         step.uuid = "uuid2"
+        step.log_ref = None
+        step.log_size = None
+        step.step_type = "cloudformation"
+        step.duration = 12.5
         self.db.query().filter().order_by().first.side_effect = [None, recent_app]
         self.db.query().filter().order_by().all.return_value = [step]
         response = StatusService.get_status("myapp", self.db)
@@ -51,6 +70,32 @@ class TestStatusService(unittest.TestCase):
         self.assertEqual(len(response.steps), 1)
         self.assertEqual(response.steps[0].step_name, "step2")  # fixed
 
+    def test_get_status_reports_progress_of_running_build(self):
+        now = datetime.now()
+        running_app = MagicMock()
+        running_app.uuid = "uuid3"
+        running_app.application_name = "myapp"
+        running_app.action = "build"
+        running_app.status = "started"
+        running_app.planned_steps = [{"task": "vpc", "step": "deploy", "type": "cloudformation"},
+                                     {"task": "app", "step": "apply", "type": "terraform"}]
+        running_app.run_started_at = now - timedelta(seconds=30)
+        old_step = MagicMock(timestamp=now - timedelta(hours=1))  # From the run before a resume
+        step = MagicMock(id=3, task_name="vpc", step_name="deploy", status={"status": "success"}, uuid="uuid3",
+                         log_ref=None, log_size=None, step_type="cloudformation", duration=20.0,
+                         timestamp=now - timedelta(seconds=10))
+        self.db.query().filter().order_by().first.side_effect = [running_app]
+        self.db.query().filter().order_by().all.return_value = [step]
+        with patch("services.status_service.duration_stats.refresh"), \
+                patch("services.status_service.duration_stats.progress", return_value=(50.0, 40.0)) as mock_progress:
+            response = StatusService.get_status("myapp", self.db)
+            self.assertEqual(StatusService.estimate_progress(running_app, [old_step, step], self.db), (50.0, 40.0))
+        self.assertEqual((response.progress_percent, response.eta_seconds), (50.0, 40.0))
+        planned, done, running_for = mock_progress.call_args[0]
+        self.assertEqual(done, 1)
+        self.assertAlmostEqual(running_for, 10.0, delta=5)
+        self.assertEqual(response.steps[0].duration, 20.0)
+
     def test_get_status_no_record(self):
         self.db.query().filter().order_by().first.side_effect = [None, None]
         response = StatusService.get_status("myapp", self.db)
@@ -59,5 +104,61 @@ class TestStatusService(unittest.TestCase):
         self.assertEqual(response.status, "error")  # expect "error"
         self.assertEqual(response.steps, [])
 
+    def test_read_step_log_inline(self):
+        step = MagicMock()
+        step.log_ref = None
+        step.status = {"status": "success", "message": "hello world"}
+        self.db.query().filter().first.return_value = step
+        self.assertEqual(StatusService.read_step_log(1, self.db, 6, 5), (b"world", 11))
+
+    def test_read_step_log_from_store(self):
+        step = MagicMock()
+        step.log_ref = "ref"
+        step.log_size = 100
+        self.db.query().filter().first.return_value = step
+        with patch("services.status_service.log_store.read", return_value=b"data") as mock_read:
+            self.assertEqual(StatusService.read_step_log(1, self.db, 10, 4), (b"data", 100))
+        mock_read.assert_called_once_with("ref", 10, 4)
+
+    def test_read_step_log_unknown_step(self):
+        self.db.query().filter().first.return_value = None
+        self.assertIsNone(StatusService.read_step_log(1, self.db))
+
+class TestStatusServiceAsync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "builder.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        db.add(Application(uuid="u1", application_name="myapp", action="build", status="success"))
+        db.add(Step(task_name="vpc", step_name="deploy", status={"status": "success"}, uuid="u1"))
+        db.commit()
+        db.close()
+        engine.dispose()
+        self.url = f"sqlite+aiosqlite:///{path}"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def get_status(self, app_name):
+        async def run():
+            engine = create_async_engine(self.url)
+            try:
+                async with async_sessionmaker(engine)() as db:
+                    return await StatusService.status_payload_async(app_name, db)
+            finally:
+                await engine.dispose()
+
+        with patch("services.status_service.duration_stats.due", return_value=False):
+            return asyncio.run(run())
+
+    def test_get_status_on_an_async_session(self):
+        payload = self.get_status("myapp")
+        self.assertEqual((payload["uuid"], payload["status"]), ("u1", "success"))
+        self.assertEqual([step["step_name"] for step in payload["steps"]], ["deploy"])
+        self.assertEqual(StatusResponse(**payload).steps[0].task_name, "vpc")
+        self.assertEqual(self.get_status("other")["uuid"], "")
+
 if __name__ == '__main__':
     unittest.main()
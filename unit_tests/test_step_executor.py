@@ -0,0 +1,90 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+from services.base_service import BaseService
+from services.step_executor import StepExecutor
+
+
+class TestStepExecutor(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.bundle = os.path.join(self.folder.name, "bundle.jsonl")
+        self.script = os.path.join(self.folder.name, "deploy.sh")
+        with open(self.script, "w") as f:
+            f.write("echo deployed\necho warning >&2\nexit 3\n")
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            StepExecutor(mode="dry-run")
+
+    def test_record_appends_the_run(self):
+        executor = StepExecutor(mode="record", bundle=self.bundle)
+        process = executor.run("vpc", self.script)
+        self.assertEqual((process.returncode, process.stdout), (3, "deployed\n"))
+        executor.run("vpc", self.script)
+        with open(self.bundle) as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(len(entries), 2)
+        self.assertEqual({key: entries[0][key] for key in ("resource", "script", "returncode", "stdout", "stderr")},
+                         {"resource": "vpc", "script": "deploy.sh", "returncode": 3, "stdout": "deployed\n",
+                          "stderr": "warning\n"})
+        self.assertGreaterEqual(entries[0]["duration"], 0)
+        self.assertEqual(executor.stats()["recorded"], 2)
+
+    def write_bundle(self, *entries):
+        with open(self.bundle, "w") as f:
+            for entry in entries:
+                f.write(json.dumps(dict({"resource": "vpc", "script": "deploy.sh", "stdout": "", "stderr": ""},
+                                        **entry)) + "\n")
+
+    def test_replay_plays_recordings_in_turn(self):
+        self.write_bundle({"returncode": 1, "stderr": "Throttling", "duration": 4.0},
+                          {"returncode": 0, "stdout": "done", "duration": 2.0})
+        executor = StepExecutor(mode="replay", bundle=self.bundle, speed=2)
+        with patch("services.step_executor.time.sleep") as sleep, \
+                patch("services.step_executor.subprocess.run") as run:
+            # The recording is found under another resources folder than the one it was made in
+            played = [executor.run("vpc", "/elsewhere/resources/vpc/deploy.sh") for _ in range(3)]
+        run.assert_not_called()
+        self.assertEqual([process.returncode for process in played], [1, 0, 1])
+        self.assertEqual(played[1].stdout, "done")
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [2.0, 1.0, 2.0])
+        self.assertEqual(executor.stats()["replayed_seconds"], 10.0)
+
+    def test_replay_prefers_recordings_of_the_same_script(self):
+        digest = StepExecutor.digest(self.script)
+        self.write_bundle({"returncode": 1, "stdout": "old script", "duration": 1.0, "sha256": "0" * 64},
+                          {"returncode": 0, "stdout": "this script", "duration": 1.0, "sha256": digest})
+        executor = StepExecutor(mode="replay", bundle=self.bundle, speed=0)
+        played = [executor.run("vpc", self.script).stdout for _ in range(2)]
+        self.assertEqual(played, ["this script", "this script"])
+        self.assertEqual(executor.stats()["mismatched"], 0)
+
+    def test_replay_of_a_changed_script_warns(self):
+        self.write_bundle({"returncode": 0, "stdout": "old script", "duration": 1.0, "sha256": "0" * 64})
+        executor = StepExecutor(mode="replay", bundle=self.bundle, speed=0)
+        with self.assertLogs("services.step_executor", "WARNING") as logs:
+            process = executor.run("vpc", self.script)
+        self.assertEqual(process.stdout, "old script")
+        self.assertIn("another version of the script", logs.output[0])
+        self.assertEqual(executor.stats()["mismatched"], 1)
+
+    def test_replay_without_recording_fails_the_step(self):
+        self.write_bundle({"returncode": 0, "duration": 1.0})
+        executor = StepExecutor(mode="replay", bundle=self.bundle, speed=0)
+        process = executor.run("subnet", self.script)
+        self.assertEqual(process.returncode, 127)
+        self.assertIn("subnet", process.stderr)
+
+    def test_call_subprocess_replays(self):
+        self.write_bundle({"returncode": 0, "stdout": "recorded output", "duration": 1.0})
+        with patch("services.base_service.step_executor", StepExecutor(mode="replay", bundle=self.bundle, speed=0)):
+            result = BaseService.call_subprocess("vpc", self.script, "u1")
+        self.assertEqual(result, {"resource": "vpc", "status": "success", "message": "recorded output", "uuid": "u1"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import json
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from routes.build import stream_build
+from routes.unbuild import stream_unbuild
+from schemas import BuildRequest, BuildResponse, UnBuildRequest
+from services.base_service import BaseService
+from services.build_service import BuildService
+from services.step_stream import StepStream
+
+
+def records(stream: StepStream) -> list:
+    return [json.loads(line) for line in stream]
+
+
+class TestStepStream(unittest.TestCase):
+    def setUp(self):
+        self.mocks = {"SessionLocal": MagicMock(), "admission": MagicMock()}
+        patcher = patch.multiple("services.step_stream", **self.mocks)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_steps_then_summary(self):
+        def target(db, step_sink):
+            for i in range(3):
+                step_sink({"resource": "vpc", "status": "success", "message": f"out {i}", "step_name": f"s{i}"})
+            return BuildResponse(component="app", status="success", message="done", uuid="u1",
+                                 results=[{"resource": "vpc", "status": "success", "message": ""}])
+
+        lines = records(StepStream().start(target))
+        self.assertEqual([line["record"] for line in lines], ["step", "step", "step", "summary"])
+        self.assertEqual([line["index"] for line in lines[:3]], [1, 2, 3])
+        self.assertEqual(lines[1]["message"], "out 1")
+        self.assertEqual(lines[-1], {"component": "app", "status": "success", "message": "done", "uuid": "u1",
+                                     "record": "summary", "steps": 3})
+        self.mocks["admission"].release.assert_called_once()
+
+    def test_failed_run_still_ends_with_a_summary(self):
+        def target(db, step_sink):
+            raise RuntimeError("boom")
+
+        lines = records(StepStream().start(target))
+        self.assertEqual(lines, [{"status": BaseService.FAILED_STATE, "message": "Internal server error",
+                                  "record": "summary", "steps": 0}])
+        self.mocks["admission"].release.assert_called_once()
+        self.mocks["SessionLocal"].return_value.close.assert_called_once()
+
+    def test_failed_streams_publish_a_failure(self):
+        cases = [("routes.build", stream_build, "BuildService.build", "build",
+                  BuildRequest(component="app", env_path="e", resource_path="r", task_path="t", stream=True)),
+                 ("routes.unbuild", stream_unbuild, "UnbuildService.unbuild", "unbuild",
+                  UnBuildRequest(component="app", task_path="t", stream=True))]
+        for module, stream, method, event, request in cases:
+            with self.subTest(event=event):
+                published = threading.Event()
+                with patch(f"{module}.admission"), patch(f"{module}.{method}", side_effect=RuntimeError("boom")), \
+                        patch(f"{module}.notifier.publish", side_effect=lambda *args: published.set()) as publish:
+                    stream(request)
+                    self.assertTrue(published.wait(5))
+                for thread in threading.enumerate():
+                    if thread.name == "step-stream":
+                        thread.join(5)  # Releases the slot on the patched admission
+                _, published_event, response = publish.call_args.args
+                self.assertEqual((published_event, response.component, response.status),
+                                 (event, "app", BaseService.FAILED_STATE))
+
+    def test_run_does_not_wait_for_a_client_that_left(self):
+        stream = StepStream()
+        stream.records.maxsize = 1
+        stream.closed.set()
+
+        def target(db, step_sink):
+            for _ in range(5):
+                step_sink({"status": "success"})
+            return BuildResponse(component="app", status="success", message="done", uuid="u1", results=[])
+
+        stream.run(target)
+        self.assertEqual(stream.steps, 5)
+        self.assertTrue(stream.records.empty())
+
+
+class TestKeepResult(unittest.TestCase):
+    def test_without_sink_keeps_the_result(self):
+        service, results = BaseService(), []
+        service.keep_result(results, {"status": "success", "message": "output"}, {"name": "t1"}, "s1")
+        self.assertEqual(results, [{"status": "success", "message": "output"}])
+
+    def test_sink_gets_the_output(self):
+        service, results, sent = BaseService(), [], []
+        service.step_sink = sent.append
+        service.keep_result(results, {"status": "success", "message": "output"}, {"name": "t1"}, "s1")
+        self.assertEqual(sent, [{"status": "success", "message": "output", "task_name": "t1", "step_name": "s1"}])
+        self.assertEqual(results, [{"status": "success", "message": ""}])
+
+    def test_streamed_builds_are_not_shared(self):
+        service = BuildService()
+        self.assertEqual(service.flight_key("k"), "k")
+        service.step_sink = print
+        self.assertNotIn(service.flight_key("k"), ("k", service.flight_key("k")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,9 @@
 import unittest
 from unittest.mock import MagicMock, patch
+from fastapi import HTTPException
+from routes.unbuild import trigger_unbuild
 from services.unbuild_service import UnbuildService
-from schemas import UnBuildResponse
+from schemas import UnBuildRequest, UnBuildResponse, TaskSelector
 
 class TestUnbuildService(unittest.TestCase):
     def setUp(self):
@@ -145,5 +147,43 @@ class TestUnbuildService(unittest.TestCase):
         self.assertEqual(response.status, self.service.FAILED_STATE)
         self.service.delete_application_record.assert_not_called()
 
+    @patch("os.path.exists")
+    @patch("services.unbuild_service.UnbuildService.load_yaml")
+    def test_unbuild_selected_tasks_keeps_record(self, mock_load_yaml, mock_exists):
+        mock_exists.return_value = True
+        self.db.query().filter().first.return_value = None
+        app = MagicMock()
+        app.uuid = "uuid10"
+        app.tasks_built = ["task1", "task2"]
+        self.db.query().filter().order_by().first.return_value = app
+        mock_load_yaml.return_value = [
+            {"type": "infrastructure", "resource": "res1", "steps": [{"name": "step1"}], "name": "task1"},
+            {"type": "infrastructure", "resource": "res2", "steps": [{"name": "step1"}], "name": "task2"},
+        ]
+        self.service.update_application_record = MagicMock()
+        self.service.delete_application_record = MagicMock()
+        self.service.execute_task = MagicMock(return_value=[
+            {"status": self.service.SUCCESS_STATE, "resource": "res2", "message": "destroyed"}
+        ])
+        response = self.service.unbuild("comp", "/tmp/task", True, self.db, selector=TaskSelector(tasks=["task2"]))
+        self.assertEqual(response.status, self.service.SUCCESS_STATE)
+        self.service.execute_task.assert_called_once()
+        self.service.delete_application_record.assert_not_called()
+        self.service.update_application_record.assert_called_with(
+            self.db, "uuid10", action="build", status=self.service.SUCCESS_STATE, tasks_built=["task1"])
+
+class TestTriggerUnbuild(unittest.TestCase):
+    @patch("routes.unbuild.notifier.publish")
+    @patch("routes.unbuild.UnbuildService.unbuild", side_effect=RuntimeError("boom"))
+    def test_failure_is_published(self, mock_unbuild, mock_publish):
+        request = UnBuildRequest(component="comp", task_path="/tmp/tasks",
+                                 callbacks=[{"url": "https://hooks.example.com/unbuild"}])
+        with self.assertRaises(HTTPException) as ctx:
+            trigger_unbuild(request, MagicMock())
+        self.assertEqual(ctx.exception.status_code, 500)
+        callbacks, event, response = mock_publish.call_args.args
+        self.assertEqual((callbacks, event), (request.callbacks, "unbuild"))
+        self.assertEqual((response.component, response.status), ("comp", UnbuildService.FAILED_STATE))
+
 if __name__ == "__main__":
     unittest.main()